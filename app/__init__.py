@@ -1 +1,6 @@
+import time
+
+# Start of the cold-start clock, taken before any app module is imported
+_import_started = time.perf_counter()
+
 __version__ = "1.0.0"
@@ -0,0 +1,134 @@
+"""Command line entry point: ``easypark serve``."""
+
+import argparse
+import importlib.util
+import logging
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from .config import (
+    SERVER_BACKLOG,
+    SERVER_GRACEFUL_SECONDS,
+    SERVER_HOST,
+    SERVER_KEEPALIVE_SECONDS,
+    SERVER_LIMIT_CONCURRENCY,
+    SERVER_PORT,
+    SERVER_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+APP_PATH = "app.main:app"
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def event_loop() -> str:
+    """uvloop when installed, else the standard asyncio loop."""
+    return "uvloop" if _installed("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    """httptools when installed, else the pure-Python h11 parser."""
+    return "httptools" if _installed("httptools") else "h11"
+
+
+def cpu_count() -> int:
+    """CPUs this process may run on, honouring affinity and container limits."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS or Windows
+        return os.cpu_count() or 1
+
+
+def worker_count(value: str) -> int:
+    """Worker processes for ``value``: a positive number or ``auto``."""
+    if value == "auto":
+        return cpu_count()
+    try:
+        workers = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("workers harus berupa angka atau 'auto'")
+    if workers < 1:
+        raise argparse.ArgumentTypeError("workers minimal 1")
+    return workers
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Argument parser for the ``easypark`` command."""
+    parser = argparse.ArgumentParser(prog="easypark", description="EasyPark API")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Run the API server")
+    serve.add_argument("--host", default=SERVER_HOST)
+    serve.add_argument("--port", type=int, default=SERVER_PORT)
+    # argparse runs string defaults through ``type`` too
+    serve.add_argument(
+        "--workers",
+        type=worker_count,
+        default=SERVER_WORKERS,
+        help="worker processes, or 'auto' for one per CPU",
+    )
+    serve.add_argument("--backlog", type=int, default=SERVER_BACKLOG)
+    serve.add_argument("--keep-alive", type=int, default=SERVER_KEEPALIVE_SECONDS)
+    serve.add_argument(
+        "--limit-concurrency",
+        type=int,
+        default=SERVER_LIMIT_CONCURRENCY,
+        help="reject work beyond this many connections and tasks; 0 for no limit",
+    )
+    serve.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=SERVER_GRACEFUL_SECONDS,
+        help="seconds in-flight requests may take to finish after SIGTERM",
+    )
+    return parser
+
+
+def server_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """uvicorn keyword arguments for parsed ``serve`` arguments."""
+    return {
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers,
+        "loop": event_loop(),
+        "http": http_protocol(),
+        "backlog": args.backlog,
+        "timeout_keep_alive": args.keep_alive,
+        "limit_concurrency": args.limit_concurrency or None,
+        "timeout_graceful_shutdown": args.graceful_timeout,
+    }
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Run the API with uvicorn.
+
+    uvicorn runs the app's lifespan startup, which constructs and pre-warms
+    the services, before it binds the socket. On SIGTERM it stops accepting
+    connections and waits up to ``--graceful-timeout`` for in-flight
+    requests before the lifespan shutdown runs.
+    """
+    import uvicorn
+
+    options = server_options(args)
+    if options["workers"] > 1:
+        logger.warning(
+            "Running %d workers: each keeps its own in-memory reservations",
+            options["workers"],
+        )
+    uvicorn.run(APP_PATH, **options)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the ``easypark`` console script."""
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        serve(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Runtime configuration read from environment variables."""
+
+import os
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Directory holding data files (users, catalog, logs)
+DATA_DIR = Path(os.getenv("EASYPARK_DATA_DIR", PROJECT_ROOT / "data"))
+
+# Pre-hashed user credentials, so startup never runs bcrypt
+USERS_FILE = Path(os.getenv("EASYPARK_USERS_FILE", DATA_DIR / "users.json"))
+
+# Mall and slot catalog, reloaded when either file changes
+MALLS_FILE = Path(os.getenv("EASYPARK_MALLS_FILE", DATA_DIR / "malls.json"))
+SLOTS_FILE = Path(os.getenv("EASYPARK_SLOTS_FILE", DATA_DIR / "slots.csv"))
+# Seconds between catalog change checks; 0 disables hot reload
+CATALOG_POLL_SECONDS = float(os.getenv("EASYPARK_CATALOG_POLL_SECONDS", "5"))
+
+# Mall shards of the parking service; 1 keeps a single unsharded service
+PARKING_SHARDS = int(os.getenv("EASYPARK_PARKING_SHARDS", "1"))
+
+# Seconds between occupied-now ticks that free and fill slots as windows
+# start and end; 0 disables the ticker
+OCCUPANCY_TICK_SECONDS = float(os.getenv("EASYPARK_OCCUPANCY_TICK_SECONDS", "15"))
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.getenv("EASYPARK_COMPRESSION_MIN_BYTES", "500"))
+
+# `easypark serve` defaults. Workers hold their own reservations in memory,
+# so more than one only suits deployments that accept per-worker state;
+# "auto" sizes the pool from the CPUs this process may run on.
+SERVER_HOST = os.getenv("EASYPARK_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("EASYPARK_SERVER_PORT", "8000"))
+SERVER_WORKERS = os.getenv("EASYPARK_SERVER_WORKERS", "1")
+SERVER_BACKLOG = int(os.getenv("EASYPARK_SERVER_BACKLOG", "2048"))
+SERVER_KEEPALIVE_SECONDS = int(os.getenv("EASYPARK_SERVER_KEEPALIVE_SECONDS", "5"))
+# Connections and tasks beyond this get 503s; 0 means unlimited
+SERVER_LIMIT_CONCURRENCY = int(os.getenv("EASYPARK_SERVER_LIMIT_CONCURRENCY", "0"))
+# Seconds in-flight requests may take to finish after SIGTERM
+SERVER_GRACEFUL_SECONDS = int(os.getenv("EASYPARK_SERVER_GRACEFUL_SECONDS", "30"))
+# Render catalog caches at startup, before the server accepts connections
+PREWARM = os.getenv("EASYPARK_PREWARM", "1") != "0"
+
+# Audit trail of reservation events, as rotating NDJSON files
+AUDIT_DIR = Path(os.getenv("EASYPARK_AUDIT_DIR", DATA_DIR / "audit"))
+AUDIT_QUEUE_SIZE = int(os.getenv("EASYPARK_AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_MAX_BYTES = int(os.getenv("EASYPARK_AUDIT_MAX_BYTES", str(10 * 1024 * 1024)))
+AUDIT_BACKUPS = int(os.getenv("EASYPARK_AUDIT_BACKUPS", "5"))
+
+# Notification outbox: mall webhooks come from an optional JSON file of
+# mall_id -> URL, SMS go to the gateway when one is configured
+WEBHOOKS_FILE = Path(os.getenv("EASYPARK_WEBHOOKS_FILE", DATA_DIR / "webhooks.json"))
+SMS_GATEWAY_URL = os.getenv("EASYPARK_SMS_GATEWAY_URL") or None
+OUTBOX_WORKERS = int(os.getenv("EASYPARK_OUTBOX_WORKERS", "4"))
+OUTBOX_BATCH_SIZE = int(os.getenv("EASYPARK_OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("EASYPARK_OUTBOX_MAX_ATTEMPTS", "8"))
+# Messages queued per destination; nothing drains them without a dispatcher
+OUTBOX_MAX_PENDING = int(os.getenv("EASYPARK_OUTBOX_MAX_PENDING", "10000"))
+
+# Reservation changes kept for GET /reservations/changes; clients further
+# behind than this must reload the full list
+CHANGELOG_CAPACITY = int(os.getenv("EASYPARK_CHANGELOG_CAPACITY", "10000"))
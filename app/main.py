@@ -1,47 +1,175 @@
 
+import asyncio
+import json
 import logging
+import threading
+import time
 from contextlib import asynccontextmanager
-from typing import Any, List
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, List, Mapping, Sequence
 
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import TypeAdapter
+
+from . import _import_started
+from .config import (
+    AUDIT_BACKUPS,
+    AUDIT_DIR,
+    AUDIT_MAX_BYTES,
+    AUDIT_QUEUE_SIZE,
+    CATALOG_POLL_SECONDS,
+    COMPRESSION_MIN_BYTES,
+    MALLS_FILE,
+    OCCUPANCY_TICK_SECONDS,
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_MAX_PENDING,
+    OUTBOX_WORKERS,
+    PARKING_SHARDS,
+    PREWARM,
+    SLOTS_FILE,
+    SMS_GATEWAY_URL,
+    WEBHOOKS_FILE,
+)
 from .models import (
     LoginIn,
     LoginResponse,
     Mall,
+    NearestMall,
+    RefreshIn,
+    RequestModifyReservasi,
+    RequestQuote,
     RequestReservasi,
+    RequestWaitlist,
     RequestWaktu,
     Reservasi,
     ResponseUser,
     SlotParkir,
+    Waitlist,
 )
 from .models.response import HealthResponse
+from .services.audit_service import AuditLog
 from .services.auth_service import AuthService
+from .services.catalog_service import CatalogWatcher
+from .services.export_service import EXPORT_FORMATS, export_chunks
+from .services.outbox_service import Outbox, OutboxDispatcher, load_webhooks
 from .services.parking_service import ParkingService
-from .utils.auth import create_access_token, get_current_user, oauth2_scheme, require_admin
+from .services.shard_service import ShardedParkingService
+from .services.snapshot_service import CacheKey, CatalogSnapshot
+from .services.versioning import VersionConflictError, format_etag, parse_if_match
+from .utils.auth import (
+    TokenError,
+    create_access_token,
+    get_current_user,
+    oauth2_scheme,
+    require_admin,
+)
+from .utils.compression import SUPPORTED_ENCODINGS, CompressionMiddleware, negotiate
+from .utils.profiling import ProfileStore, RequestProfilerMiddleware
+from .utils.rate_limit import RateLimitMiddleware, RateLimitPolicy, TokenBucketLimiter
+from .utils.server_timing import ServerTimingMiddleware, TimedRoute, timing_span
+from .utils.startup import FirstRequestTimer, startup_report
 from .utils.timestamp import get_current_timestamp
 
-# Logger setup
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
 logger = logging.getLogger(__name__)
 
+
+def configure_logging() -> None:
+    """Configure root logging; called at startup rather than at import."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+
 # Global services
 auth_service: AuthService | None = None
 parking_service: ParkingService | None = None
+audit_log: AuditLog | None = None
+outbox: Outbox | None = None
+_services_lock = threading.Lock()
+
+
+def init_services() -> None:
+    """Construct any missing services, timing each for the startup report."""
+    global auth_service, parking_service, audit_log, outbox
+    with _services_lock:
+        if auth_service is None:
+            with startup_report.measure("auth_service"):
+                auth_service = AuthService()
+        if audit_log is None:
+            audit_log = AuditLog(
+                AUDIT_DIR,
+                max_queue=AUDIT_QUEUE_SIZE,
+                max_bytes=AUDIT_MAX_BYTES,
+                backups=AUDIT_BACKUPS,
+            )
+        audit_log.start()
+        if outbox is None:
+            outbox = Outbox(
+                load_webhooks(WEBHOOKS_FILE),
+                SMS_GATEWAY_URL,
+                max_pending=OUTBOX_MAX_PENDING,
+            )
+        if parking_service is None:
+            with startup_report.measure("parking_service"):
+                if PARKING_SHARDS > 1:
+                    parking_service = ShardedParkingService(PARKING_SHARDS)
+                else:
+                    parking_service = ParkingService()
+            parking_service.add_listener(audit_log.on_reservation_event)
+            parking_service.add_listener(outbox.on_reservation_event)
+
+
+async def tick_occupancy_forever(interval: float) -> None:
+    """Keep slot status at the current minute until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            get_parking_service().tick_occupancy()
+        except Exception:
+            logger.exception("Occupancy tick failed")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for service initialization."""
-    global auth_service, parking_service
-    auth_service = AuthService()
-    parking_service = ParkingService()
+    configure_logging()
+    init_services()
+    if PREWARM:
+        with startup_report.measure("prewarm"):
+            prewarm()
     logger.info("EasyPark services initialized")
+    watcher = None
+    if CATALOG_POLL_SECONDS > 0:
+        watcher = CatalogWatcher(
+            [MALLS_FILE, SLOTS_FILE],
+            lambda: get_parking_service().reload_catalog(),
+            interval=CATALOG_POLL_SECONDS,
+        )
+        watcher.start()
+    ticker = None
+    if OCCUPANCY_TICK_SECONDS > 0:
+        ticker = asyncio.create_task(tick_occupancy_forever(OCCUPANCY_TICK_SECONDS))
+    dispatcher = OutboxDispatcher(
+        outbox,
+        workers=OUTBOX_WORKERS,
+        batch_size=OUTBOX_BATCH_SIZE,
+        max_attempts=OUTBOX_MAX_ATTEMPTS,
+    )
+    await dispatcher.start()
     yield
+    # Gives queued notifications a few seconds to go out
+    await dispatcher.stop()
+    if ticker is not None:
+        ticker.cancel()
+    if watcher is not None:
+        watcher.stop()
+    if audit_log is not None:
+        # Writes out queued audit entries before the process exits
+        audit_log.stop()
     logger.info("Shutting down EasyPark services")
 
 
@@ -52,8 +180,29 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan,
 )
+app.router.route_class = TimedRoute
+
+app.add_middleware(FirstRequestTimer)
+
+# Rate limiting: login burns a bcrypt verify, availability checks scan
+# reservations, so both get tighter budgets than the default.
+rate_limiter = TokenBucketLimiter()
+app.add_middleware(
+    RateLimitMiddleware,
+    limiter=rate_limiter,
+    rules=[
+        ("POST", "/login", RateLimitPolicy("login", 10, 60)),
+        (
+            "POST",
+            "/malls/{mall_id}/slots/{slot_id}/check-availability",
+            RateLimitPolicy("check_availability", 30, 60),
+        ),
+    ],
+    default=RateLimitPolicy("default", 300, 60),
+)
 
-# CORS middleware
+# CORS outside the limiter, so 429s carry CORS headers and preflights are
+# answered before they reach it
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -62,27 +211,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# On-demand profiling: admins send "X-Profile: <rate>" or "?profile=<rate>".
+# While a profiled request runs, every call on the loop thread goes through
+# a Python profile hook, slowing all concurrent requests; keep rates low.
+profile_store = ProfileStore()
+app.add_middleware(RequestProfilerMiddleware, store=profile_store)
+
+# Inside Server-Timing, so compression counts towards the "total" phase
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+
+# Outermost, so the "total" phase covers the whole middleware stack
+app.add_middleware(ServerTimingMiddleware)
+
 
 def get_auth_service() -> AuthService:
-    """Dependency to get auth service."""
+    """Dependency to get auth service, constructing it on first use."""
     if auth_service is None:
-        raise HTTPException(status_code=500, detail="Service not initialized")
+        init_services()
     return auth_service
 
 
 def get_parking_service() -> ParkingService:
-    """Dependency to get parking service."""
+    """Dependency to get parking service, constructing it on first use."""
     if parking_service is None:
-        raise HTTPException(status_code=500, detail="Service not initialized")
+        init_services()
     return parking_service
 
 
-def get_current_user_dependency(
+async def get_current_user_dependency(
     token: str = Depends(oauth2_scheme),
     auth_svc: AuthService = Depends(get_auth_service),
 ):
-    """Get current user with proper dependency injection."""
-    return get_current_user(token, auth_svc.get_all_users())
+    """Get current user with proper dependency injection.
+
+    Async although it never awaits: the token check is CPU-only, and a sync
+    dependency would be sent to the threadpool on every request.
+    """
+    with timing_span("auth"):
+        return get_current_user(token, auth_svc.get_all_users())
 
 
 @app.get("/")
@@ -93,19 +259,41 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs",
         "endpoints": {
-            "auth": ["POST /login"],
+            "auth": ["POST /login", "POST /token/refresh", "POST /logout"],
             "malls": [
                 "GET /malls",
+                "GET /malls/nearest",
                 "GET /malls/{mall_id}",
                 "GET /malls/{mall_id}/slots",
             ],
+            "pricing": ["POST /pricing/quotes"],
             "reservations": [
                 "POST /reservations",
                 "GET /reservations",
+                "GET /reservations/changes?since={seq}",
+                "GET /reservations/search (admin only)",
                 "GET /reservations/{reservation_id}",
+                "PATCH /reservations/{reservation_id}",
                 "PUT /reservations/{reservation_id}/cancel",
             ],
-            "admin": ["GET /admin/stats (admin only)"],
+            "waitlist": [
+                "POST /waitlist",
+                "GET /waitlist",
+                "DELETE /waitlist/{entry_id}",
+            ],
+            "admin": [
+                "GET /admin/stats (admin only)",
+                "GET /admin/analytics/occupancy (admin only)",
+                "GET /admin/revenue (admin only)",
+                "GET /admin/reservations/export (admin only)",
+                "GET /admin/startup (admin only)",
+                "GET /admin/rate-limits (admin only)",
+                "GET /admin/audit (admin only)",
+                "GET /admin/outbox (admin only)",
+                "POST /admin/outbox/retry (admin only)",
+                "GET /admin/profiles (admin only)",
+                "GET /admin/profiles/{profile_id} (admin only)",
+            ],
         },
     }
 
@@ -125,55 +313,169 @@ async def login(
     payload: LoginIn, auth_svc: AuthService = Depends(get_auth_service)
 ):
     """Login endpoint - returns JWT token."""
-    user = auth_svc.authenticate_user(payload.username, payload.password)
+    with timing_span("svc", "authenticate_user"):
+        user = auth_svc.authenticate_user(payload.username, payload.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Username atau password salah",
         )
 
+    return _login_response(user, auth_svc.issue_refresh_token(user))
+
+
+def _login_response(user: dict, refresh_token: str) -> LoginResponse:
+    """A fresh access token for ``user`` alongside its refresh token."""
     token_data = {"sub": user["username"], "role": user["role"]}
     access_token = create_access_token(token_data)
 
     return LoginResponse(
         access_token=access_token,
         token_type="bearer",
+        refresh_token=refresh_token,
         user=ResponseUser(
             username=user["username"], role=user["role"], name=user["name"]
         ),
     )
 
 
+@app.post("/token/refresh", response_model=LoginResponse)
+async def refresh_token(
+    payload: RefreshIn, auth_svc: AuthService = Depends(get_auth_service)
+):
+    """Exchange a refresh token for new access and refresh tokens, without bcrypt."""
+    try:
+        with timing_span("svc", "refresh"):
+            user, successor = auth_svc.refresh(payload.refresh_token)
+    except TokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+        )
+    return _login_response(user, successor)
+
+
+@app.post("/logout")
+async def logout(
+    payload: RefreshIn, auth_svc: AuthService = Depends(get_auth_service)
+):
+    """Revoke a refresh token and every token rotated from the same login."""
+    auth_svc.logout(payload.refresh_token)
+    return {"message": "Logout berhasil"}
+
+
+_MALL_LIST = TypeAdapter(List[Mall])
+_SLOT_LIST = TypeAdapter(List[SlotParkir])
+
+
+def _json_bytes(content: Any) -> bytes:
+    """Encode like FastAPI's default JSONResponse."""
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _cached_json(
+    snapshot: CatalogSnapshot,
+    key: CacheKey,
+    render: Callable[[], bytes],
+    accept_encoding: str | None,
+) -> Response:
+    """JSON response from the snapshot cache, pre-compressed if negotiated."""
+    body = snapshot.cached(key, render)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = negotiate(accept_encoding)
+    if encoding is not None and len(body) >= COMPRESSION_MIN_BYTES:
+        body = snapshot.cached(key, render, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def _render_malls(snapshot: CatalogSnapshot) -> bytes:
+    return _MALL_LIST.dump_json(_MALL_LIST.validate_python(snapshot.malls))
+
+
+def _render_slots(slots: Sequence[Mapping[str, Any]]) -> bytes:
+    return _SLOT_LIST.dump_json(_SLOT_LIST.validate_python(slots))
+
+
+def prewarm() -> None:
+    """Render and compress the catalog bodies the first requests would need."""
+    snapshot = get_parking_service().snapshot()
+    for encoding in SUPPORTED_ENCODINGS:
+        _cached_json(snapshot, ("malls",), lambda: _render_malls(snapshot), encoding)
+        for mall in snapshot.malls:
+            slots = snapshot.slots(mall["id"])
+            _cached_json(
+                snapshot, ("slots", mall["id"]), lambda: _render_slots(slots), encoding
+            )
+
+
 @app.get("/malls", response_model=List[Mall])
-async def get_malls(svc: ParkingService = Depends(get_parking_service)):
-    """Get all malls."""
-    return svc.get_all_malls()
+async def get_malls(
+    accept_encoding: str | None = Header(None),
+    svc: ParkingService = Depends(get_parking_service),
+):
+    """Get all malls, serialised once per catalog snapshot."""
+    with timing_span("svc", "get_all_malls"):
+        snapshot = svc.snapshot()
+        return _cached_json(
+            snapshot, ("malls",), lambda: _render_malls(snapshot), accept_encoding
+        )
+
+
+@app.get("/malls/nearest", response_model=List[NearestMall])
+async def get_nearest_malls(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=50),
+    start_time: str | None = None,
+    end_time: str | None = None,
+    max_km: float | None = Query(None, gt=0),
+    svc: ParkingService = Depends(get_parking_service),
+):
+    """Find the nearest malls with a free slot now, or for a time window."""
+    try:
+        with timing_span("svc", "find_nearest_malls"):
+            return svc.find_nearest_malls(lat, lon, k, start_time, end_time, max_km)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @app.get("/malls/{mall_id}")
 async def get_mall(
-    mall_id: str, svc: ParkingService = Depends(get_parking_service)
+    mall_id: str,
+    accept_encoding: str | None = Header(None),
+    svc: ParkingService = Depends(get_parking_service),
 ):
-    """Get mall by ID."""
-    mall = svc.get_mall_by_id(mall_id)
+    """Get mall by ID, serialised once per catalog snapshot."""
+    with timing_span("svc", "get_mall_by_id"):
+        snapshot = svc.snapshot()
+        mall = snapshot.mall(mall_id)
     if not mall:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Mall tidak ditemukan"
         )
-    return mall
+    return _cached_json(
+        snapshot, ("mall", mall_id), lambda: _json_bytes(dict(mall)), accept_encoding
+    )
 
 
 @app.get("/malls/{mall_id}/slots", response_model=List[SlotParkir])
 async def get_slots(
-    mall_id: str, svc: ParkingService = Depends(get_parking_service)
+    mall_id: str,
+    accept_encoding: str | None = Header(None),
+    svc: ParkingService = Depends(get_parking_service),
 ):
-    """Get all parking slots for a mall."""
-    slots = svc.get_slots_by_mall(mall_id)
+    """Get all parking slots for a mall, serialised once per catalog snapshot."""
+    with timing_span("svc", "get_slots_by_mall"):
+        snapshot = svc.snapshot()
+        slots = snapshot.slots(mall_id)
     if not slots:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Mall tidak ditemukan"
         )
-    return slots
+    return _cached_json(
+        snapshot, ("slots", mall_id), lambda: _render_slots(slots), accept_encoding
+    )
 
 
 @app.get("/malls/{mall_id}/slots/{slot_id}")
@@ -182,14 +484,15 @@ async def get_slot(
     slot_id: str,
     svc: ParkingService = Depends(get_parking_service),
 ):
-    """Get specific parking slot."""
-    slot = svc.get_slot_by_id(mall_id, slot_id)
+    """Get specific parking slot as of the current snapshot."""
+    with timing_span("svc", "get_slot_by_id"):
+        slot = svc.snapshot().slot(mall_id, slot_id)
     if not slot:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Slot parkir tidak ditemukan",
         )
-    return slot
+    return dict(slot)
 
 
 @app.post("/malls/{mall_id}/slots/{slot_id}/check-availability")
@@ -207,7 +510,7 @@ async def check_slot_availability(
             detail="Slot parkir tidak ditemukan",
         )
 
-    if slot["status"] != "available":
+    if not svc.is_slot_bookable(mall_id, slot_id):
         return {
             "available": False,
             "conflicts": [],
@@ -215,9 +518,10 @@ async def check_slot_availability(
         }
 
     try:
-        tersedia, conflicts = svc.check_availability(
-            mall_id, slot_id, time_slot.start_time, time_slot.end_time
-        )
+        with timing_span("svc", "check_availability"):
+            tersedia, conflicts = svc.check_availability(
+                mall_id, slot_id, time_slot.start_time, time_slot.end_time
+            )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
@@ -228,6 +532,25 @@ async def check_slot_availability(
     }
 
 
+@app.post("/pricing/quotes")
+async def get_price_quotes(
+    payload: RequestQuote, svc: ParkingService = Depends(get_parking_service)
+):
+    """Quote many time windows across malls in one call."""
+    try:
+        with timing_span("svc", "get_price_quotes"):
+            quotes = svc.get_price_quotes(
+                payload.mall_ids, [w.model_dump() for w in payload.windows]
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if quotes is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Mall tidak ditemukan"
+        )
+    return quotes
+
+
 @app.post(
     "/reservations", response_model=Reservasi, status_code=status.HTTP_201_CREATED
 )
@@ -238,9 +561,12 @@ async def create_reservation(
 ):
     """Create a new parking reservation."""
     try:
-        reservation = svc.create_reservation(
-            reservation_data.model_dump(), current_user["username"]
-        )
+        with timing_span("svc", "create_reservation"):
+            reservation = await svc.create_reservation_async(
+                reservation_data.model_dump(),
+                current_user["username"],
+                current_user["role"],
+            )
         return reservation
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -258,37 +584,120 @@ async def get_reservations(
     svc: ParkingService = Depends(get_parking_service),
 ):
     """Get all reservations."""
-    return svc.get_all_reservations()
+    with timing_span("svc", "get_all_reservations"):
+        return svc.get_all_reservations()
+
+
+@app.get("/reservations/changes")
+async def get_reservation_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    current_user: dict = Depends(get_current_user_dependency),
+    svc: ParkingService = Depends(get_parking_service),
+):
+    """Get reservation changes after sequence number ``since``, for delta sync."""
+    with timing_span("svc", "get_changes"):
+        return svc.get_changes(since, limit)
+
+
+@app.get("/reservations/search", response_model=List[Reservasi])
+async def search_reservations(
+    vehicle_number: str | None = None,
+    vehicle_prefix: str | None = None,
+    phone: str | None = None,
+    name_prefix: str | None = None,
+    status_filter: str | None = Query(None, alias="status"),
+    mall_id: str | None = None,
+    start_time: str | None = None,
+    end_time: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user_dependency),
+    svc: ParkingService = Depends(get_parking_service),
+):
+    """Search reservations by plate, phone, name prefix, status, mall and time (admin only)."""
+    require_admin(current_user)
+    try:
+        with timing_span("svc", "search_reservations"):
+            return svc.search_reservations(
+                vehicle_number=vehicle_number,
+                vehicle_prefix=vehicle_prefix,
+                phone=phone,
+                name_prefix=name_prefix,
+                status=status_filter,
+                mall_id=mall_id,
+                start_time=start_time,
+                end_time=end_time,
+                limit=limit,
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @app.get("/reservations/{reservation_id}")
 async def get_reservation(
     reservation_id: str,
+    response: Response,
     current_user: dict = Depends(get_current_user_dependency),
     svc: ParkingService = Depends(get_parking_service),
 ):
-    """Get reservation by ID."""
-    reservation = svc.get_reservation_by_id(reservation_id)
+    """Get reservation by ID; the ETag carries its version."""
+    with timing_span("svc", "get_reservation_by_id"):
+        reservation = svc.get_reservation_by_id(reservation_id)
     if not reservation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Reservasi tidak ditemukan",
         )
+    response.headers["ETag"] = format_etag(reservation["version"])
+    return reservation
+
+
+@app.patch("/reservations/{reservation_id}", response_model=Reservasi)
+async def modify_reservation(
+    reservation_id: str,
+    changes: RequestModifyReservasi,
+    response: Response,
+    if_match: str | None = Header(None),
+    current_user: dict = Depends(get_current_user_dependency),
+    svc: ParkingService = Depends(get_parking_service),
+):
+    """Change a reservation's name, plate or phone; honours If-Match."""
+    try:
+        with timing_span("svc", "modify_reservation"):
+            reservation = await svc.modify_reservation_async(
+                reservation_id,
+                changes.model_dump(),
+                current_user["username"],
+                current_user["role"],
+                parse_if_match(if_match),
+            )
+    except VersionConflictError as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    response.headers["ETag"] = format_etag(reservation["version"])
     return reservation
 
 
 @app.put("/reservations/{reservation_id}/cancel")
 async def cancel_reservation(
     reservation_id: str,
+    if_match: str | None = Header(None),
     current_user: dict = Depends(get_current_user_dependency),
     svc: ParkingService = Depends(get_parking_service),
 ):
-    """Cancel a reservation."""
+    """Cancel a reservation; honours If-Match."""
     try:
-        result = svc.cancel_reservation(
-            reservation_id, current_user["username"], current_user["role"]
-        )
+        with timing_span("svc", "cancel_reservation"):
+            result = await svc.cancel_reservation_async(
+                reservation_id,
+                current_user["username"],
+                current_user["role"],
+                parse_if_match(if_match),
+            )
         return result
+    except VersionConflictError as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -299,6 +708,54 @@ async def cancel_reservation(
         )
 
 
+@app.post("/waitlist", response_model=Waitlist, status_code=status.HTTP_201_CREATED)
+async def join_waitlist(
+    request: RequestWaitlist,
+    current_user: dict = Depends(get_current_user_dependency),
+    svc: ParkingService = Depends(get_parking_service),
+):
+    """Join the waitlist; booked at once if a slot is already free."""
+    try:
+        with timing_span("svc", "join_waitlist"):
+            return await svc.join_waitlist_async(
+                request.model_dump(), current_user["username"]
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@app.get("/waitlist", response_model=List[Waitlist])
+async def get_waitlist(
+    current_user: dict = Depends(get_current_user_dependency),
+    svc: ParkingService = Depends(get_parking_service),
+):
+    """Get own waitlist entries (all entries for admins)."""
+    with timing_span("svc", "get_waitlist"):
+        return svc.get_waitlist(current_user["username"], current_user["role"])
+
+
+@app.delete("/waitlist/{entry_id}", response_model=Waitlist)
+async def cancel_waitlist_entry(
+    entry_id: str,
+    current_user: dict = Depends(get_current_user_dependency),
+    svc: ParkingService = Depends(get_parking_service),
+):
+    """Withdraw a waiting waitlist entry."""
+    try:
+        with timing_span("svc", "cancel_waitlist_entry"):
+            entry = svc.cancel_waitlist_entry(
+                entry_id, current_user["username"], current_user["role"]
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Entri waitlist tidak ditemukan",
+        )
+    return entry
+
+
 @app.get("/admin/stats")
 async def get_admin_stats(
     current_user: dict = Depends(get_current_user_dependency),
@@ -306,10 +763,167 @@ async def get_admin_stats(
 ):
     """Get admin statistics (admin only)."""
     require_admin(current_user)
-    return svc.get_admin_stats()
+    with timing_span("svc", "get_admin_stats"):
+        return svc.get_admin_stats()
+
+
+@app.get("/admin/analytics/occupancy")
+async def get_occupancy_analytics(
+    mall_id: str | None = None,
+    current_user: dict = Depends(get_current_user_dependency),
+    svc: ParkingService = Depends(get_parking_service),
+):
+    """Get occupancy heatmap by mall, weekday and hour (admin only)."""
+    require_admin(current_user)
+    with timing_span("svc", "get_occupancy_heatmap"):
+        heatmap = svc.get_occupancy_heatmap(mall_id)
+    if heatmap is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Mall tidak ditemukan"
+        )
+    return heatmap
+
+
+@app.get("/admin/revenue")
+async def get_revenue(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    granularity: str = "hour",
+    mall_id: str | None = None,
+    current_user: dict = Depends(get_current_user_dependency),
+    svc: ParkingService = Depends(get_parking_service),
+):
+    """Get revenue rollups per mall by hour or day (admin only)."""
+    require_admin(current_user)
+    # Reservations are stamped in naive local time
+    start, end = (
+        t.astimezone().replace(tzinfo=None) if t and t.tzinfo else t
+        for t in (start, end)
+    )
+    end = end or datetime.now()
+    start = start or end - timedelta(days=30 if granularity == "day" else 1)
+    try:
+        with timing_span("svc", "get_revenue_rollup"):
+            rollup = svc.get_revenue_rollup(start, end, granularity, mall_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if rollup is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Mall tidak ditemukan"
+        )
+    return rollup
+
+
+@app.get("/admin/reservations/export")
+async def export_reservations(
+    fmt: str = Query("ndjson", alias="format"),
+    date_from: date | None = None,
+    date_to: date | None = None,
+    mall_id: str | None = None,
+    status_filter: str | None = Query(None, alias="status"),
+    gzip: bool = False,
+    current_user: dict = Depends(get_current_user_dependency),
+    svc: ParkingService = Depends(get_parking_service),
+):
+    """Stream reservations as NDJSON or CSV, optionally gzipped (admin only)."""
+    require_admin(current_user)
+    # Validate before streaming: errors cannot change the status afterwards
+    try:
+        chunks = export_chunks(
+            svc.iter_reservations(date_from, date_to, mall_id, status_filter),
+            fmt,
+            gzip,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    headers = {
+        "Content-Disposition": f'attachment; filename="reservations.{fmt}"'
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[fmt], headers=headers)
+
+
+@app.get("/admin/startup")
+async def get_startup_report(
+    current_user: dict = Depends(get_current_user_dependency),
+):
+    """Get cold-start timing breakdown (admin only)."""
+    require_admin(current_user)
+    return startup_report.as_dict()
+
+
+@app.get("/admin/rate-limits")
+async def get_rate_limit_stats(
+    current_user: dict = Depends(get_current_user_dependency),
+):
+    """Get rate limiter counters (admin only)."""
+    require_admin(current_user)
+    return rate_limiter.stats()
+
+
+@app.get("/admin/audit")
+async def get_audit_stats(
+    current_user: dict = Depends(get_current_user_dependency),
+):
+    """Get audit queue depth and backpressure counters (admin only)."""
+    require_admin(current_user)
+    if audit_log is None:
+        init_services()
+    return audit_log.stats()
+
+
+@app.get("/admin/outbox")
+async def get_outbox(
+    current_user: dict = Depends(get_current_user_dependency),
+):
+    """Get notification delivery counters and dead letters (admin only)."""
+    require_admin(current_user)
+    if outbox is None:
+        init_services()
+    return {**outbox.stats(), "dead_letter_messages": list(outbox.dead_letters)}
+
+
+@app.post("/admin/outbox/retry")
+async def retry_outbox_dead_letters(
+    current_user: dict = Depends(get_current_user_dependency),
+):
+    """Requeue dead-lettered notifications for delivery (admin only)."""
+    require_admin(current_user)
+    if outbox is None:
+        init_services()
+    return {"requeued": outbox.requeue_dead_letters()}
+
+
+@app.get("/admin/profiles")
+async def get_profiles(
+    current_user: dict = Depends(get_current_user_dependency),
+):
+    """List stored request profiles, newest first (admin only)."""
+    require_admin(current_user)
+    return profile_store.summaries()
+
+
+@app.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(
+    profile_id: str,
+    current_user: dict = Depends(get_current_user_dependency),
+):
+    """Get a request profile as collapsed stacks for flame graphs (admin only)."""
+    require_admin(current_user)
+    report = profile_store.get(profile_id)
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profil tidak ditemukan"
+        )
+    return report["collapsed"]
+
+
+startup_report.origin = _import_started
+startup_report.record("import", time.perf_counter() - _import_started)
 
 
 if __name__ == "__main__":
-    import uvicorn
+    from .cli import main
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    raise SystemExit(main(["serve"]))
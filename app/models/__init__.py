@@ -1,31 +1,45 @@
+from .enums import (
+    PeranUser,
+    StatusReservasi,
+    StatusSlot,
+    StatusWaitlist,
+)
 from .request import (
     LoginIn,
+    RefreshIn,
+    RequestModifyReservasi,
+    RequestQuote,
     RequestReservasi,
+    RequestWaitlist,
     RequestWaktu,
 )
 from .response import (
     LoginResponse,
     Mall,
+    NearestMall,
     Reservasi,
     ResponseUser,
     SlotParkir,
-)
-from .enums import (
-    PeranUser,
-    StatusReservasi,
-    StatusSlot,
+    Waitlist,
 )
 
 __all__ = [
     "LoginIn",
+    "RefreshIn",
+    "RequestModifyReservasi",
+    "RequestQuote",
     "RequestReservasi",
+    "RequestWaitlist",
     "RequestWaktu",
     "LoginResponse",
     "Mall",
+    "NearestMall",
     "Reservasi",
     "ResponseUser",
     "SlotParkir",
+    "Waitlist",
     "PeranUser",
     "StatusReservasi",
     "StatusSlot",
+    "StatusWaitlist",
 ]
@@ -20,3 +20,11 @@ class StatusReservasi(str, Enum):
     ACTIVE = "active"
     COMPLETED = "completed"
     CANCELLED = "cancelled"
+
+
+class StatusWaitlist(str, Enum):
+    """Waitlist entry status."""
+    WAITING = "waiting"
+    BOOKING = "booking"
+    FULFILLED = "fulfilled"
+    CANCELLED = "cancelled"
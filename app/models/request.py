@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -7,6 +9,11 @@ class LoginIn(BaseModel):
     password: str = Field(..., min_length=1, description="Password")
 
 
+class RefreshIn(BaseModel):
+    """Refresh or logout request model."""
+    refresh_token: str = Field(..., min_length=1, description="Refresh token")
+
+
 class RequestWaktu(BaseModel):
     """Time slot request."""
     start_time: str = Field(..., pattern=r"^([0-1][0-9]|2[0-3]):[0-5][0-9]$", description="Start time in HH:MM format")
@@ -21,3 +28,26 @@ class RequestReservasi(BaseModel):
     vehicle_number: str = Field(..., min_length=1, description="Vehicle registration number")
     phone: str = Field(..., min_length=10, description="Phone number")
     time_slot: RequestWaktu = Field(..., description="Reservation time slot")
+
+
+class RequestModifyReservasi(BaseModel):
+    """Reservation modification request; omitted fields are left unchanged."""
+    user_name: Optional[str] = Field(None, min_length=1, description="User name")
+    vehicle_number: Optional[str] = Field(None, min_length=1, description="Vehicle registration number")
+    phone: Optional[str] = Field(None, min_length=10, description="Phone number")
+
+
+class RequestQuote(BaseModel):
+    """Batch price quote request."""
+    mall_ids: Optional[List[str]] = Field(None, max_length=100, description="Mall identifiers, all malls if omitted")
+    windows: List[RequestWaktu] = Field(..., min_length=1, max_length=500, description="Time windows to price")
+
+
+class RequestWaitlist(BaseModel):
+    """Waitlist request model; omit slot_id to accept any slot of the mall."""
+    mall_id: str = Field(..., min_length=1, description="Mall identifier")
+    slot_id: Optional[str] = Field(None, min_length=1, description="Parking slot identifier, any slot if omitted")
+    user_name: str = Field(..., min_length=1, description="User name")
+    vehicle_number: str = Field(..., min_length=1, description="Vehicle registration number")
+    phone: str = Field(..., min_length=10, description="Phone number")
+    time_slot: RequestWaktu = Field(..., description="Desired time slot")
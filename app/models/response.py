@@ -1,7 +1,8 @@
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
 
-from .enums import PeranUser, StatusReservasi, StatusSlot
+from pydantic import BaseModel
+
+from .enums import PeranUser, StatusSlot, StatusWaitlist
 
 
 class ResponseUser(BaseModel):
@@ -15,6 +16,7 @@ class LoginResponse(BaseModel):
     """Login response with token."""
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
     user: ResponseUser
 
 
@@ -24,9 +26,18 @@ class Mall(BaseModel):
     name: str
     full_name: Optional[str] = None
     address: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     base_price: int
     total_slots: int
     available_slots: int
+    pricing: Optional[Dict[str, Any]] = None
+    version: int = 1
+
+
+class NearestMall(Mall):
+    """Mall found by a nearest-mall search."""
+    distance_km: float
 
 
 class SlotParkir(BaseModel):
@@ -37,6 +48,7 @@ class SlotParkir(BaseModel):
     status: StatusSlot
     location: Optional[str] = None
     slot_type: Optional[str] = "regular"
+    version: int = 1
 
 
 class Reservasi(BaseModel):
@@ -54,6 +66,23 @@ class Reservasi(BaseModel):
     status: str
     created_at: str
     created_by: Optional[str] = None
+    version: int = 1
+
+
+class Waitlist(BaseModel):
+    """Waitlist entry model."""
+    id: str
+    mall_id: str
+    slot_id: Optional[str] = None
+    user_name: str
+    vehicle_number: str
+    phone: str
+    start_time: str
+    end_time: str
+    status: StatusWaitlist
+    reservation_id: Optional[str] = None
+    created_at: str
+    username: str
 
 
 class HealthResponse(BaseModel):
@@ -0,0 +1,240 @@
+"""Columnar occupancy analytics for admin dashboards."""
+
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..models.enums import StatusReservasi
+from ..utils.time import normalize_interval, time_to_minutes
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+WEEKDAYS = [
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+]
+
+STATUS_CODES = {status.value: code for code, status in enumerate(StatusReservasi)}
+ACTIVE_STATUS_CODES = (
+    STATUS_CODES[StatusReservasi.CONFIRMED.value],
+    STATUS_CODES[StatusReservasi.ACTIVE.value],
+)
+
+
+class ReservationColumns:
+    """Columnar NumPy view of reservations, one row per reservation."""
+
+    def __init__(self, capacity: int = 1024):
+        """Allocate empty columns with the given initial capacity."""
+        self.size = 0
+        self.start = np.empty(capacity, dtype=np.int32)
+        self.end = np.empty(capacity, dtype=np.int32)
+        self.mall = np.empty(capacity, dtype=np.int32)
+        self.slot = np.empty(capacity, dtype=np.int32)
+        self.status = np.empty(capacity, dtype=np.int8)
+        self.row_by_id: Dict[str, int] = {}
+
+    def _grow(self) -> None:
+        """Double the capacity of every column."""
+        capacity = max(1, len(self.start) * 2)
+        for name in ("start", "end", "mall", "slot", "status"):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[: self.size] = column[: self.size]
+            setattr(self, name, grown)
+
+    def append(
+        self,
+        reservation_id: str,
+        start: int,
+        end: int,
+        mall_code: int,
+        slot_code: int,
+        status_code: int,
+    ) -> int:
+        """Append a row and return its index."""
+        if self.size == len(self.start):
+            self._grow()
+        row = self.size
+        self.start[row] = start
+        self.end[row] = end
+        self.mall[row] = mall_code
+        self.slot[row] = slot_code
+        self.status[row] = status_code
+        self.row_by_id[reservation_id] = row
+        self.size += 1
+        return row
+
+
+class OccupancyAnalytics:
+    """Occupancy heatmaps (mall x weekday x hour) over a columnar reservation view.
+
+    Reservations carry only ``HH:MM`` times, so the weekday is taken from the
+    ``created_at`` date. Occupancy is kept as a per-mall difference array over
+    the minutes of a week; every reservation event adjusts it in O(1) and only
+    the affected malls are re-accumulated on the next read. The array sums
+    every week of history, so reads divide each weekday by the number of
+    such days between the first and last reservation dates.
+    """
+
+    def __init__(self, mall_ids: Optional[List[str]] = None):
+        """Initialize analytics for the given malls."""
+        self._lock = threading.Lock()
+        self.mall_codes: Dict[str, int] = {}
+        self.slot_codes: Dict[str, int] = {}
+        self.columns = ReservationColumns()
+        for mall_id in mall_ids or []:
+            self.mall_codes.setdefault(mall_id, len(self.mall_codes))
+        # Rows for every known mall in one allocation; later malls grow it
+        capacity = max(len(self.mall_codes), 1)
+        self._diff = np.zeros((capacity, MINUTES_PER_WEEK + 1), dtype=np.int32)
+        self._hourly = np.zeros((capacity, 7, 24), dtype=np.float64)
+        self._dirty: set = set()
+        # Reservation dates seen, bounding the days each weekday averages over
+        self._first_day: Optional[date] = None
+        self._last_day: Optional[date] = None
+
+    def _grow(self) -> None:
+        """Double the mall capacity of the difference and hourly arrays."""
+        capacity = len(self._diff) * 2
+        diff = np.zeros((capacity, MINUTES_PER_WEEK + 1), dtype=np.int32)
+        diff[: len(self._diff)] = self._diff
+        hourly = np.zeros((capacity, 7, 24), dtype=np.float64)
+        hourly[: len(self._hourly)] = self._hourly
+        self._diff, self._hourly = diff, hourly
+
+    def register_mall(self, mall_id: str) -> int:
+        """Register a mall and return its code."""
+        code = self.mall_codes.get(mall_id)
+        if code is not None:
+            return code
+        code = len(self.mall_codes)
+        if code == len(self._diff):
+            self._grow()
+        self.mall_codes[mall_id] = code
+        return code
+
+    def _slot_code(self, mall_id: str, slot_id: str) -> int:
+        """Return the code of a slot, registering it if needed."""
+        key = f"{mall_id}/{slot_id}"
+        code = self.slot_codes.get(key)
+        if code is None:
+            code = len(self.slot_codes)
+            self.slot_codes[key] = code
+        return code
+
+    def _apply(self, row: int, delta: int) -> None:
+        """Add ``delta`` over the week interval of a row, wrapping at week end."""
+        columns = self.columns
+        mall = int(columns.mall[row])
+        start = int(columns.start[row])
+        end = int(columns.end[row])
+        diff = self._diff[mall]
+        if end <= MINUTES_PER_WEEK:
+            diff[start] += delta
+            diff[end] -= delta
+        else:
+            diff[start] += delta
+            diff[MINUTES_PER_WEEK] -= delta
+            diff[0] += delta
+            diff[end - MINUTES_PER_WEEK] -= delta
+        self._dirty.add(mall)
+
+    def record(self, reservation: Dict[str, Any]) -> None:
+        """Add a new reservation to the columnar view."""
+        start, end = normalize_interval(
+            time_to_minutes(reservation["start_time"]),
+            time_to_minutes(reservation["end_time"]),
+        )
+        day = datetime.fromisoformat(reservation["created_at"]).date()
+        offset = day.weekday() * MINUTES_PER_DAY
+        status_code = STATUS_CODES[reservation["status"]]
+        with self._lock:
+            if self._first_day is None or day < self._first_day:
+                self._first_day = day
+            if self._last_day is None or day > self._last_day:
+                self._last_day = day
+            mall_code = self.register_mall(reservation["mall_id"])
+            row = self.columns.append(
+                reservation["id"],
+                offset + start,
+                offset + end,
+                mall_code,
+                self._slot_code(reservation["mall_id"], reservation["slot_id"]),
+                status_code,
+            )
+            if status_code in ACTIVE_STATUS_CODES:
+                self._apply(row, 1)
+
+    def update_status(self, reservation_id: str, status: str) -> None:
+        """Update the status of a reservation already in the view."""
+        with self._lock:
+            row = self.columns.row_by_id.get(reservation_id)
+            if row is None:
+                return
+            was_active = int(self.columns.status[row]) in ACTIVE_STATUS_CODES
+            status_code = STATUS_CODES[status]
+            self.columns.status[row] = status_code
+            is_active = status_code in ACTIVE_STATUS_CODES
+            if was_active and not is_active:
+                self._apply(row, -1)
+            elif is_active and not was_active:
+                self._apply(row, 1)
+
+    def on_reservation_event(
+        self, event: str, reservation: Dict[str, Any], actor: Dict[str, Any]
+    ) -> None:
+        """ParkingService listener keeping the view in sync."""
+        if event == "created":
+            self.record(reservation)
+        else:
+            self.update_status(reservation["id"], reservation["status"])
+
+    def _weekday_counts(self) -> np.ndarray:
+        """Days of each weekday in the recorded date range, at least 1."""
+        counts = np.ones(7)
+        if self._first_day is not None:
+            days = (self._last_day - self._first_day).days + 1
+            weeks, extra = divmod(days, 7)
+            first = self._first_day.weekday()
+            for weekday in range(7):
+                counts[weekday] = max(weeks + ((weekday - first) % 7 < extra), 1)
+        return counts
+
+    def _refresh(self) -> None:
+        """Re-accumulate hourly averages for malls touched since the last read."""
+        if not self._dirty:
+            return
+        rows = np.fromiter(sorted(self._dirty), dtype=np.intp)
+        occupancy = np.cumsum(self._diff[rows, :MINUTES_PER_WEEK], axis=1)
+        self._hourly[rows] = occupancy.reshape(len(rows), 7, 24, 60).mean(axis=3)
+        self._dirty.clear()
+
+    def heatmap(
+        self,
+        mall_id: Optional[str] = None,
+        capacities: Optional[Dict[str, int]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Average occupied slots per mall, weekday and hour of day."""
+        with self._lock:
+            if mall_id is not None and mall_id not in self.mall_codes:
+                return None
+            self._refresh()
+            mall_ids = [mall_id] if mall_id is not None else list(self.mall_codes)
+            counts = self._weekday_counts()[:, np.newaxis]
+            malls = {}
+            for mid in mall_ids:
+                hourly = self._hourly[self.mall_codes[mid]] / counts
+                entry: Dict[str, Any] = {"occupied_slots": np.round(hourly, 3).tolist()}
+                capacity = (capacities or {}).get(mid)
+                if capacity:
+                    entry["occupancy_rate"] = np.round(hourly / capacity, 4).tolist()
+                malls[mid] = entry
+        return {"weekdays": WEEKDAYS, "hours": list(range(24)), "malls": malls}
@@ -0,0 +1,199 @@
+"""Audit trail of reservation events written off the request path."""
+
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+AUDIT_FIELDS = ("id", "mall_id", "slot_id", "status", "version", "created_by")
+
+
+def audit_entry(
+    event: str, reservation: Dict[str, Any], actor: Dict[str, Any]
+) -> Dict[str, Any]:
+    """One audit line for a reservation event."""
+    return {
+        "ts": datetime.now(UTC).isoformat(timespec="milliseconds"),
+        "event": event,
+        "actor": actor.get("username"),
+        "role": actor.get("role"),
+        **{
+            ("reservation_id" if field == "id" else field): reservation.get(field)
+            for field in AUDIT_FIELDS
+        },
+    }
+
+
+class AuditLog:
+    """Bounded queue of audit entries drained by a writer thread.
+
+    Listeners only enqueue, so a booking never waits on disk. The writer
+    takes up to ``batch_size`` entries at a time and appends them to
+    ``audit.ndjson`` with one write and one fsync. The file rolls over to
+    ``audit.ndjson.1`` .. ``.{backups}`` past ``max_bytes``. When the queue
+    is full the entry is dropped and counted at once, so a stalled disk
+    loses audit lines rather than holding up bookings.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 5,
+    ):
+        self.directory = Path(directory)
+        self.path = self.directory / "audit.ndjson"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: queue.Queue[Optional[Dict[str, Any]]] = queue.Queue(max_queue)
+        self._write_lock = threading.Lock()
+        # Guards the counters producers and the writer both update
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rotations = 0
+        self.high_water = 0
+
+    def record(self, entry: Dict[str, Any]) -> bool:
+        """Queue an entry without waiting; False if it was dropped as the queue is full."""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            logger.warning("Audit queue full, dropped %s event", entry.get("event"))
+            return False
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self.enqueued += 1
+            self.high_water = max(self.high_water, depth)
+        return True
+
+    def on_reservation_event(
+        self, event: str, reservation: Dict[str, Any], actor: Dict[str, Any]
+    ) -> None:
+        """ParkingService listener queueing an audit entry."""
+        self.record(audit_entry(event, reservation, actor))
+
+    def _take_batch(self, timeout: Optional[float]) -> List[Dict[str, Any]]:
+        """Up to ``batch_size`` queued entries, waiting up to ``timeout`` for the first."""
+        try:
+            if timeout is None:
+                first = self._queue.get_nowait()
+            else:
+                first = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        # None only wakes the writer on stop
+        return [entry for entry in batch if entry is not None]
+
+    def _rotate(self) -> None:
+        """Shift ``audit.ndjson.N`` up by one and start a new file."""
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self.rotations += 1
+
+    def write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Append entries to the current file, rolling it over first if full."""
+        if not batch:
+            return
+        data = "".join(
+            json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for entry in batch
+        ).encode("utf-8")
+        with self._write_lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            try:
+                size = self.path.stat().st_size
+            except FileNotFoundError:
+                size = 0
+            if size and size + len(data) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "ab") as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            self.written += len(batch)
+            self.batches += 1
+
+    def _write_or_drop(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self.write_batch(batch)
+        except OSError:
+            with self._stats_lock:
+                self.dropped += len(batch)
+            logger.exception("Audit write failed, dropped %d entries", len(batch))
+
+    def flush(self) -> None:
+        """Write everything queued so far from the calling thread."""
+        while True:
+            batch = self._take_batch(None)
+            if not batch:
+                return
+            self._write_or_drop(batch)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._write_or_drop(self._take_batch(self.flush_interval))
+
+    def start(self) -> None:
+        """Start the writer thread unless it is running."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer thread and write out whatever is still queued."""
+        self._stop.set()
+        if self._thread is not None:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass  # the writer is busy draining and sees the stop flag next
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, throughput and backpressure counters."""
+        with self._stats_lock:
+            high_water, enqueued, dropped = self.high_water, self.enqueued, self.dropped
+        return {
+            "queued": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "high_water": high_water,
+            "enqueued": enqueued,
+            "written": self.written,
+            "dropped": dropped,
+            "batches": self.batches,
+            "rotations": self.rotations,
+            "writer_running": self._thread is not None,
+        }
@@ -1,15 +1,33 @@
-from typing import Any, Dict, Optional
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
+from ..config import USERS_FILE
 from ..models.enums import PeranUser
-from ..utils.auth import hash_password, verify_password
+from ..utils.auth import TokenError, hash_password, verify_password
+from .refresh_token_service import RefreshTokenStore
+
+logger = logging.getLogger(__name__)
 
 
 class AuthService:
     """Service for managing authentication."""
 
-    def __init__(self):
-        """Initialize auth service with demo users."""
-        self.users_db = [
+    def __init__(self, users_file: Optional[Path] = None):
+        """Initialize auth service with pre-hashed users from the data directory."""
+        self.users_db = self._load_users(users_file or USERS_FILE)
+        self.refresh_tokens = RefreshTokenStore()
+
+    @staticmethod
+    def _load_users(users_file: Path) -> List[Dict[str, Any]]:
+        """Load users with bcrypt hashes, falling back to hashing demo users."""
+        try:
+            with open(users_file, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            logger.warning(f"{users_file} not found, hashing demo users at startup")
+        return [
             {
                 "username": "user",
                 "password": hash_password("12345"),
@@ -42,6 +60,27 @@ class AuthService:
             return None
         return user
 
+    def issue_refresh_token(self, user: Dict[str, Any]) -> str:
+        """Open a refresh session for a user who just logged in."""
+        return self.refresh_tokens.issue(user["username"])
+
+    def refresh(self, refresh_token: str) -> Tuple[Dict[str, Any], str]:
+        """Rotate a refresh token, returning the user and the next token.
+
+        No password check is involved; a user removed since login can no
+        longer refresh.
+        """
+        successor, username = self.refresh_tokens.rotate(refresh_token)
+        user = self.get_user(username)
+        if user is None:
+            self.refresh_tokens.revoke(successor)
+            raise TokenError("Pengguna tidak ditemukan")
+        return user, successor
+
+    def logout(self, refresh_token: str) -> bool:
+        """Revoke the refresh session of ``refresh_token``."""
+        return self.refresh_tokens.revoke(refresh_token)
+
     def get_all_users(self):
         """Get all users (for internal use)."""
         return self.users_db
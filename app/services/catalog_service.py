@@ -0,0 +1,229 @@
+"""Mall and slot catalog loaded from data files, with change-detection reload."""
+
+import csv
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from ..config import MALLS_FILE, SLOTS_FILE
+from ..models.enums import StatusSlot
+
+logger = logging.getLogger(__name__)
+
+SlotKey = Tuple[str, str]
+SLOT_STATUSES = {status.value for status in StatusSlot}
+_OPTIONAL_SLOT_FIELDS = ("location", "slot_type")
+
+
+class Catalog:
+    """Malls and slots with lookup indexes, built once per file version.
+
+    The mall and slot dicts also carry live state (``available_slots`` and
+    slot ``status``). Once published, records are never changed in place:
+    writers swap a new copy into every index. The values read from the
+    files are remembered separately so a reload can tell which live values
+    still apply.
+    """
+
+    def __init__(self, malls: List[Dict[str, Any]], slots: Iterable[Dict[str, Any]]):
+        """Index malls and slots; every slot must reference a known mall."""
+        for mall in malls:
+            mall.setdefault("version", 1)
+        self.malls = malls
+        self.mall_by_id: Dict[str, Dict[str, Any]] = {m["id"]: m for m in malls}
+        self.slots_by_mall: Dict[str, List[Dict[str, Any]]] = {
+            m["id"]: [] for m in malls
+        }
+        self.slot_by_key: Dict[SlotKey, Dict[str, Any]] = {}
+        slots_by_mall = self.slots_by_mall
+        slot_by_key = self.slot_by_key
+        for slot in slots:
+            mall_slots = slots_by_mall.get(slot["mall_id"])
+            if mall_slots is None:
+                raise ValueError(
+                    f"Slot {slot['id']} merujuk mall tidak dikenal: {slot['mall_id']}"
+                )
+            if slot["status"] not in SLOT_STATUSES:
+                raise ValueError(f"Status slot {slot['id']} tidak valid: {slot['status']}")
+            slot.setdefault("version", 1)
+            mall_slots.append(slot)
+            slot_by_key[(slot["mall_id"], slot["id"])] = slot
+        self.configured_available = {m["id"]: m["available_slots"] for m in malls}
+        self.configured_status = {key: s["status"] for key, s in slot_by_key.items()}
+        # List positions, so a replaced record is swapped in without a scan
+        self._mall_pos = {m["id"]: i for i, m in enumerate(malls)}
+        self._slot_pos = {
+            (s["mall_id"], s["id"]): i
+            for mall_slots in slots_by_mall.values()
+            for i, s in enumerate(mall_slots)
+        }
+
+    def replace_mall(self, mall: Dict[str, Any]) -> None:
+        """Swap a new copy of a mall record into every index."""
+        self.malls[self._mall_pos[mall["id"]]] = mall
+        self.mall_by_id[mall["id"]] = mall
+
+    def replace_slot(self, slot: Dict[str, Any]) -> None:
+        """Swap a new copy of a slot record into every index."""
+        key = (slot["mall_id"], slot["id"])
+        self.slots_by_mall[slot["mall_id"]][self._slot_pos[key]] = slot
+        self.slot_by_key[key] = slot
+
+    @property
+    def slot_count(self) -> int:
+        """Number of slots across all malls."""
+        return len(self.slot_by_key)
+
+
+def read_malls(path: Path) -> List[Dict[str, Any]]:
+    """Read the mall list from a JSON file."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_slots(path: Path) -> Iterator[Dict[str, Any]]:
+    """Read slots from a CSV file with a header row."""
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        optional = [header.index(name) for name in _OPTIONAL_SLOT_FIELDS if name in header]
+        for row in reader:
+            for index in optional:
+                if not row[index]:
+                    row[index] = None
+            yield dict(zip(header, row))
+
+
+def load_catalog(
+    malls_file: Optional[Path] = None, slots_file: Optional[Path] = None
+) -> Catalog:
+    """Parse the catalog files into a new Catalog."""
+    return Catalog(
+        read_malls(malls_file or MALLS_FILE), read_slots(slots_file or SLOTS_FILE)
+    )
+
+
+def carry_over(old: Catalog, new: Catalog, keys: Optional[Iterable[SlotKey]] = None) -> None:
+    """Copy live state from ``old`` into ``new`` where the files left it unchanged.
+
+    A slot keeps its live status unless the file changed its configured
+    status. A mall's available count moves by the change of its configured
+    count, clamped to its new total. Carried records continue from their
+    old version plus one. ``keys`` limits the slots (and their malls)
+    considered; by default everything is.
+    """
+    if keys is None:
+        slot_keys: Iterable[SlotKey] = new.slot_by_key
+        mall_ids: Iterable[str] = new.mall_by_id
+    else:
+        slot_keys = list(keys)
+        mall_ids = {mall_id for mall_id, _ in slot_keys}
+
+    old_slots, new_slots = old.slot_by_key, new.slot_by_key
+    old_status, new_status = old.configured_status, new.configured_status
+    for key in slot_keys:
+        old_slot = old_slots.get(key)
+        new_slot = new_slots.get(key)
+        if old_slot is None or new_slot is None:
+            continue
+        if old_status[key] == new_status[key]:
+            new_slot["status"] = old_slot["status"]
+        new_slot["version"] = old_slot["version"] + 1
+
+    for mall_id in mall_ids:
+        old_mall = old.mall_by_id.get(mall_id)
+        new_mall = new.mall_by_id.get(mall_id)
+        if old_mall is None or new_mall is None:
+            continue
+        change = new.configured_available[mall_id] - old.configured_available[mall_id]
+        new_mall["available_slots"] = min(
+            max(old_mall["available_slots"] + change, 0), new_mall["total_slots"]
+        )
+        new_mall["version"] = old_mall["version"] + 1
+
+
+class CatalogWatcher:
+    """Daemon thread polling file signatures and calling back on change.
+
+    The signature is each file's modification time and size, so a check is
+    a couple of ``stat`` calls. A new signature only triggers the callback
+    once it is seen unchanged on the next poll, so a file still being
+    written is not loaded half-way; writers that cannot pause for a poll
+    interval should write elsewhere and rename the file into place. Errors
+    from the callback are logged and the watcher keeps the new signature,
+    so a broken file is not retried until it changes again.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[Path],
+        on_change: Callable[[], None],
+        interval: float = 5.0,
+    ):
+        self.paths = list(paths)
+        self.on_change = on_change
+        self.interval = interval
+        self._signature = self._current_signature()
+        # Changed signature waiting to be seen again before reloading
+        self._pending: Optional[Tuple[Optional[Tuple[int, int]], ...]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _current_signature(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        signature = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def poll(self) -> bool:
+        """Check the files once; return True if the callback ran successfully."""
+        signature = self._current_signature()
+        if signature == self._signature:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            # Changed since the last poll; the writer may not be done yet
+            self._pending = signature
+            return False
+        self._signature = signature
+        self._pending = None
+        try:
+            self.on_change()
+        except Exception:
+            logger.exception("Catalog reload failed, keeping the current catalog")
+            return False
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def start(self) -> None:
+        """Start polling in a daemon thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop polling and wait for the thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
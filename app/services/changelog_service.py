@@ -0,0 +1,70 @@
+"""Sequence-numbered ring buffer of reservation changes for delta sync."""
+
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..config import CHANGELOG_CAPACITY
+
+
+class Changelog:
+    """The last ``capacity`` reservation changes, numbered from 1.
+
+    A ParkingService listener stamps every create, cancel and modify with
+    the next sequence number and keeps a copy of the reservation as it was
+    then. Change ``seq`` lives at ``seq % capacity``, so reading the changes
+    after a given number costs only the changes returned. A client whose
+    position was overwritten, or who is ahead of the log after a restart,
+    is told to resync.
+    """
+
+    def __init__(self, capacity: int = CHANGELOG_CAPACITY):
+        if capacity < 1:
+            raise ValueError("Kapasitas changelog minimal 1")
+        self.capacity = capacity
+        self._buffer: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._lock = threading.Lock()
+        self.last_seq = 0
+
+    def record(self, event: str, reservation: Dict[str, Any]) -> int:
+        """Append a change and return its sequence number."""
+        with self._lock:
+            self.last_seq += 1
+            self._buffer[self.last_seq % self.capacity] = {
+                "seq": self.last_seq,
+                "event": event,
+                "reservation": dict(reservation),
+            }
+            return self.last_seq
+
+    def on_reservation_event(
+        self, event: str, reservation: Dict[str, Any], actor: Dict[str, Any]
+    ) -> None:
+        """ParkingService listener recording the change."""
+        self.record(event, reservation)
+
+    def since(self, seq: int, limit: int = 500) -> Dict[str, Any]:
+        """Up to ``limit`` changes after ``seq``, oldest first.
+
+        ``next`` is the position to ask from next time. ``resync_required``
+        means the changes after ``seq`` are no longer all held; the client
+        should note ``last_seq``, reload every reservation, then continue
+        from that ``last_seq``.
+        """
+        with self._lock:
+            last = self.last_seq
+            oldest = max(last - self.capacity + 1, 1)
+            if seq < 0 or seq > last or seq < oldest - 1:
+                return {
+                    "changes": [],
+                    "next": last,
+                    "last_seq": last,
+                    "resync_required": True,
+                }
+            end = min(last, seq + limit)
+            changes = [self._buffer[s % self.capacity] for s in range(seq + 1, end + 1)]
+        return {
+            "changes": changes,
+            "next": end,
+            "last_seq": last,
+            "resync_required": False,
+        }
@@ -0,0 +1,71 @@
+"""Chunked NDJSON and CSV export of reservations."""
+
+import csv
+import io
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator
+
+from ..models.response import Reservasi
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_FIELDS = list(Reservasi.model_fields)
+CHUNK_SIZE = 64 * 1024
+
+
+def ndjson_chunks(
+    rows: Iterable[Dict[str, Any]], chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Encode rows as NDJSON, yielding about ``chunk_size`` bytes at a time."""
+    buffer = []
+    size = 0
+    for row in rows:
+        line = json.dumps(
+            {field: row.get(field) for field in EXPORT_FIELDS}, ensure_ascii=False
+        )
+        buffer.append(line)
+        size += len(line) + 1
+        if size >= chunk_size:
+            yield ("\n".join(buffer) + "\n").encode("utf-8")
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode("utf-8")
+
+
+def csv_chunks(
+    rows: Iterable[Dict[str, Any]], chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Encode rows as CSV with a header line, yielding about ``chunk_size`` bytes at a time."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a byte stream on the fly."""
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_chunks(
+    rows: Iterable[Dict[str, Any]], fmt: str, gzip: bool = False
+) -> Iterator[bytes]:
+    """Encoded export stream of ``rows`` in ``fmt``, optionally gzipped."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError("Format harus 'ndjson' atau 'csv'")
+    chunks = ndjson_chunks(rows) if fmt == "ndjson" else csv_chunks(rows)
+    return gzip_chunks(chunks) if gzip else chunks
@@ -0,0 +1,119 @@
+"""Grid spatial index answering k-nearest-mall queries."""
+
+import heapq
+import itertools
+import math
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Longitude cells shrink towards the poles; bounds use this latitude at most
+MAX_BOUND_LATITUDE = 89.0
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """Malls bucketed into square lat/lon cells of ``cell_degrees``.
+
+    A query scans rings of cells outwards from the query cell, clipped to
+    the extent of occupied cells, so a query far from every mall visits no
+    more cells than one inside the extent. After each ring, every mall not
+    yet seen is at least the distance to the scanned block's edge away.
+    Candidates closer than that are checked in distance order, so the
+    (possibly expensive) availability predicate only runs on the nearest
+    malls.
+    """
+
+    def __init__(self, malls: Iterable[Dict[str, Any]], cell_degrees: float = 0.1):
+        """Index every mall that has coordinates."""
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, Dict[str, Any]]]] = {}
+        for mall in malls:
+            lat, lon = mall.get("latitude"), mall.get("longitude")
+            if lat is None or lon is None:
+                continue
+            self._cells.setdefault(self._cell(lat, lon), []).append((lat, lon, mall))
+        rows = [i for i, _ in self._cells] or [0]
+        cols = [j for _, j in self._cells] or [0]
+        self._extent = (min(rows), max(rows), min(cols), max(cols))
+
+    def __len__(self) -> int:
+        return sum(len(cell) for cell in self._cells.values())
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (
+            math.floor(lat / self.cell_degrees),
+            math.floor(lon / self.cell_degrees),
+        )
+
+    def _ring(self, ci: int, cj: int, r: int) -> Iterable[Tuple[int, int]]:
+        """Cells at Chebyshev distance ``r`` from ``(ci, cj)`` inside the occupied extent."""
+        min_i, max_i, min_j, max_j = self._extent
+        if r == 0:
+            yield ci, cj
+            return
+        cols = range(max(cj - r, min_j), min(cj + r, max_j) + 1)
+        for i in (ci - r, ci + r):
+            if min_i <= i <= max_i:
+                for j in cols:
+                    yield i, j
+        rows = range(max(ci - r + 1, min_i), min(ci + r - 1, max_i) + 1)
+        for j in (cj - r, cj + r):
+            if min_j <= j <= max_j:
+                for i in rows:
+                    yield i, j
+
+    def _unseen_bound_km(self, lat: float, lon: float, ci: int, cj: int, r: int) -> float:
+        """Lower bound on the distance to any mall outside rings ``0..r``."""
+        size = self.cell_degrees
+        lat_gap = min(lat - (ci - r) * size, (ci + r + 1) * size - lat)
+        lon_gap = min(lon - (cj - r) * size, (cj + r + 1) * size - lon)
+        band = min(abs(lat) + lat_gap, MAX_BOUND_LATITUDE)
+        return min(
+            lat_gap * KM_PER_DEGREE,
+            lon_gap * KM_PER_DEGREE * math.cos(math.radians(band)),
+        )
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 5,
+        accept: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        max_km: Optional[float] = None,
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """Up to ``k`` ``(distance_km, mall)`` pairs passing ``accept``, nearest first."""
+        ci, cj = self._cell(lat, lon)
+        min_i, max_i, min_j, max_j = self._extent
+        last_ring = max(ci - min_i, max_i - ci, cj - min_j, max_j - cj, 0)
+        order = itertools.count()
+        pending: List[Tuple[float, int, Dict[str, Any]]] = []
+        results: List[Tuple[float, Dict[str, Any]]] = []
+        # Rings closer than the occupied extent hold no malls, so start at its edge
+        r = max(min_i - ci, ci - max_i, min_j - cj, cj - max_j, 0)
+        while True:
+            for cell in self._ring(ci, cj, r):
+                for mall_lat, mall_lon, mall in self._cells.get(cell, ()):
+                    distance = haversine_km(lat, lon, mall_lat, mall_lon)
+                    heapq.heappush(pending, (distance, next(order), mall))
+            bound = math.inf if r >= last_ring else self._unseen_bound_km(lat, lon, ci, cj, r)
+            while pending and pending[0][0] <= bound:
+                distance, _, mall = heapq.heappop(pending)
+                if max_km is not None and distance > max_km:
+                    return results
+                if accept is None or accept(mall):
+                    results.append((distance, mall))
+                    if len(results) == k:
+                        return results
+            if r >= last_ring or (max_km is not None and bound > max_km):
+                return results
+            r += 1
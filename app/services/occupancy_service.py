@@ -0,0 +1,167 @@
+"""Materialised view of the slots occupied at the current minute."""
+
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from ..models.enums import StatusReservasi
+from ..utils.time import normalize_interval, time_to_minutes
+
+MINUTES_PER_DAY = 24 * 60
+ACTIVE_STATUSES = {StatusReservasi.CONFIRMED.value, StatusReservasi.ACTIVE.value}
+
+SlotKey = Tuple[str, str]
+# Called with (mall_id, slot_id, occupied) when a slot turns occupied or free
+OccupancyCallback = Callable[[str, str, bool], None]
+
+
+def _wall_clock() -> datetime:
+    return datetime.now()
+
+
+class OccupancyNowView:
+    """Slots covered by an active reservation at the current minute.
+
+    Reservation windows recur daily on the minute-of-day circle, as in the
+    availability check. Each window puts a start and an end event into a
+    1440-bucket schedule; ``advance`` replays the buckets between the last
+    processed minute and now, so a tick costs the events passed rather than
+    the number of reservations. Bookings and cancellations that cover the
+    current minute apply immediately.
+    """
+
+    def __init__(
+        self,
+        on_change: Optional[OccupancyCallback] = None,
+        clock: Optional[Callable[[], datetime]] = None,
+    ):
+        """Start an empty view at the current minute."""
+        self._lock = threading.Lock()
+        self._on_change = on_change
+        self._clock = clock
+        self._slots: Dict[str, SlotKey] = {}
+        self._windows: Dict[str, Tuple[int, int]] = {}
+        self._starts: List[Set[str]] = [set() for _ in range(MINUTES_PER_DAY)]
+        self._ends: List[Set[str]] = [set() for _ in range(MINUTES_PER_DAY)]
+        self._covering: Set[str] = set()
+        self._counts: Dict[SlotKey, int] = {}
+        # Occupied slots per mall, i.e. the keys of _counts grouped by mall
+        self._mall_counts: Dict[str, int] = {}
+        self.minute = self._now_minute()
+
+    def _now_minute(self) -> int:
+        now = self._clock() if self._clock is not None else _wall_clock()
+        return now.hour * 60 + now.minute
+
+    @staticmethod
+    def _covers(window: Tuple[int, int], minute: int) -> bool:
+        start, end = window
+        return start <= minute < end or start <= minute + MINUTES_PER_DAY < end
+
+    def _cover(self, reservation_id: str, before: Dict[SlotKey, bool]) -> None:
+        """Count a reservation as covering now; the caller holds the lock."""
+        self._covering.add(reservation_id)
+        key = self._slots[reservation_id]
+        before.setdefault(key, key in self._counts)
+        if key not in self._counts:
+            self._mall_counts[key[0]] = self._mall_counts.get(key[0], 0) + 1
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def _uncover(self, reservation_id: str, before: Dict[SlotKey, bool]) -> None:
+        """Stop counting a covering reservation; the caller holds the lock."""
+        self._covering.discard(reservation_id)
+        key = self._slots[reservation_id]
+        before.setdefault(key, True)
+        self._counts[key] -= 1
+        if not self._counts[key]:
+            del self._counts[key]
+            self._mall_counts[key[0]] -= 1
+            if not self._mall_counts[key[0]]:
+                del self._mall_counts[key[0]]
+
+    def _publish(self, before: Dict[SlotKey, bool]) -> None:
+        """Report slots whose occupancy differs from ``before``; under the lock."""
+        if self._on_change is None:
+            return
+        for key, was_occupied in before.items():
+            occupied = key in self._counts
+            if occupied != was_occupied:
+                self._on_change(key[0], key[1], occupied)
+
+    def add(self, reservation: Dict[str, Any]) -> None:
+        """Schedule an active reservation's window."""
+        if reservation["status"] not in ACTIVE_STATUSES:
+            return
+        reservation_id = reservation["id"]
+        window = normalize_interval(
+            time_to_minutes(reservation["start_time"]),
+            time_to_minutes(reservation["end_time"]),
+        )
+        with self._lock:
+            if reservation_id in self._windows:
+                return
+            self._slots[reservation_id] = (reservation["mall_id"], reservation["slot_id"])
+            self._windows[reservation_id] = window
+            self._starts[window[0] % MINUTES_PER_DAY].add(reservation_id)
+            self._ends[window[1] % MINUTES_PER_DAY].add(reservation_id)
+            if self._covers(window, self.minute):
+                before: Dict[SlotKey, bool] = {}
+                self._cover(reservation_id, before)
+                self._publish(before)
+
+    def remove(self, reservation_id: str) -> None:
+        """Unschedule a reservation, freeing its slot if it covers now."""
+        with self._lock:
+            window = self._windows.pop(reservation_id, None)
+            if window is None:
+                return
+            self._starts[window[0] % MINUTES_PER_DAY].discard(reservation_id)
+            self._ends[window[1] % MINUTES_PER_DAY].discard(reservation_id)
+            if reservation_id in self._covering:
+                before: Dict[SlotKey, bool] = {}
+                self._uncover(reservation_id, before)
+                self._publish(before)
+            del self._slots[reservation_id]
+
+    def advance(self, minute: Optional[int] = None) -> None:
+        """Replay the schedule up to ``minute`` (default: now).
+
+        Callbacks fire once per slot with its net change, so a window ending
+        where the next one starts keeps the slot occupied throughout.
+        """
+        target = self._now_minute() if minute is None else minute % MINUTES_PER_DAY
+        with self._lock:
+            before: Dict[SlotKey, bool] = {}
+            steps = (target - self.minute) % MINUTES_PER_DAY
+            for step in range(1, steps + 1):
+                current = (self.minute + step) % MINUTES_PER_DAY
+                for reservation_id in self._ends[current]:
+                    if reservation_id in self._covering:
+                        self._uncover(reservation_id, before)
+                for reservation_id in self._starts[current]:
+                    if reservation_id not in self._covering:
+                        self._cover(reservation_id, before)
+            self.minute = target
+            self._publish(before)
+
+    def occupied(self, mall_id: str) -> Set[str]:
+        """IDs of a mall's slots occupied now."""
+        with self._lock:
+            return {slot_id for (mid, slot_id) in self._counts if mid == mall_id}
+
+    def occupied_count(self, mall_id: str) -> int:
+        """Number of a mall's slots occupied now.
+
+        Reads one counter without the lock, so change callbacks, which run
+        under it, may call this.
+        """
+        return self._mall_counts.get(mall_id, 0)
+
+    def on_reservation_event(
+        self, event: str, reservation: Dict[str, Any], actor: Dict[str, Any]
+    ) -> None:
+        """ParkingService listener keeping the schedule in sync."""
+        if event == "created":
+            self.add(reservation)
+        elif reservation["status"] not in ACTIVE_STATUSES:
+            self.remove(reservation["id"])
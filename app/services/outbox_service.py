@@ -0,0 +1,374 @@
+"""Outbox of reservation notifications delivered by asyncio workers."""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Reservation fields sent to mall webhooks; the phone number stays private
+WEBHOOK_FIELDS = (
+    "id",
+    "mall_id",
+    "slot_id",
+    "vehicle_number",
+    "start_time",
+    "end_time",
+    "status",
+    "version",
+    "created_at",
+)
+SMS_TEMPLATES = {
+    "created": "Reservasi {id} di {mall_id} slot {slot_id} {start_time}-{end_time} dikonfirmasi.",
+    "cancelled": "Reservasi {id} di {mall_id} slot {slot_id} {start_time}-{end_time} dibatalkan.",
+}
+
+
+def load_webhooks(path: Path) -> Dict[str, str]:
+    """Mall ID -> webhook URL from a JSON file; empty if the file is missing."""
+    try:
+        webhooks = json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    if not isinstance(webhooks, dict):
+        raise ValueError("File webhook harus berisi objek mall_id -> URL")
+    return {str(mall_id): str(url) for mall_id, url in webhooks.items()}
+
+
+class _Destination:
+    """Pending messages for one URL, delivered in order."""
+
+    __slots__ = ("url", "pending", "retry_at", "in_flight", "sending")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.pending: Deque[Dict[str, Any]] = deque()
+        self.retry_at = 0.0
+        self.in_flight = False
+        # Messages at the head of ``pending`` in the batch being sent
+        self.sending = 0
+
+
+class Outbox:
+    """Messages recorded in the same step as the reservation change.
+
+    A ParkingService listener turns each event into messages: one for the
+    mall's webhook and, for bookings and cancellations, one SMS for the
+    gateway. Messages queue per destination URL until a dispatcher
+    delivers them; messages that run out of attempts move to a bounded
+    dead-letter queue, from which an admin can requeue them. At most
+    ``max_pending`` messages queue per destination, so nothing piles up
+    when no dispatcher runs (as on serverless); new messages beyond that
+    go straight to the dead-letter queue.
+    """
+
+    def __init__(
+        self,
+        webhooks: Optional[Dict[str, str]] = None,
+        sms_gateway_url: Optional[str] = None,
+        dead_letter_limit: int = 1000,
+        max_pending: int = 10000,
+    ):
+        self.webhooks = dict(webhooks or {})
+        self.sms_gateway_url = sms_gateway_url
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._destinations: Dict[str, _Destination] = {}
+        self.dead_letters: Deque[Dict[str, Any]] = deque(maxlen=dead_letter_limit)
+        self._wakeup: Optional[Callable[[], None]] = None
+        self.recorded = 0
+        self.delivered = 0
+        self.retried = 0
+
+    def messages_for(
+        self, event: str, reservation: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """The webhook and SMS messages an event sends, not yet queued."""
+        messages = []
+        url = self.webhooks.get(reservation["mall_id"])
+        if url:
+            messages.append(
+                (url, {
+                    "event": event,
+                    "reservation": {field: reservation.get(field) for field in WEBHOOK_FIELDS},
+                })
+            )
+        template = SMS_TEMPLATES.get(event)
+        if self.sms_gateway_url and template and reservation.get("phone"):
+            messages.append(
+                (self.sms_gateway_url, {
+                    "to": reservation["phone"],
+                    "message": template.format(**reservation),
+                })
+            )
+        return [
+            {
+                "id": str(uuid.uuid4()),
+                "destination": destination,
+                "payload": payload,
+                "attempts": 0,
+                "created_at": time.time(),
+                "last_error": None,
+            }
+            for destination, payload in messages
+        ]
+
+    def _destination(self, url: str) -> _Destination:
+        """The queue of a destination URL, created on first use; call under the lock."""
+        destination = self._destinations.get(url)
+        if destination is None:
+            destination = self._destinations[url] = _Destination(url)
+        return destination
+
+    def add(self, messages: List[Dict[str, Any]]) -> None:
+        """Queue messages behind any pending for the same destination."""
+        if not messages:
+            return
+        with self._lock:
+            for message in messages:
+                # Recording order, which requeued dead letters are sorted back into
+                message["seq"] = self.recorded
+                self.recorded += 1
+                destination = self._destination(message["destination"])
+                if len(destination.pending) >= self.max_pending:
+                    message["last_error"] = "Antrean tujuan penuh"
+                    self.dead_letters.append(message)
+                else:
+                    destination.pending.append(message)
+        if self._wakeup is not None:
+            self._wakeup()
+
+    def on_reservation_event(
+        self, event: str, reservation: Dict[str, Any], actor: Dict[str, Any]
+    ) -> None:
+        """ParkingService listener recording the event's messages."""
+        self.add(self.messages_for(event, reservation))
+
+    def take_ready(self, now: float) -> List[_Destination]:
+        """Destinations that may send now, marked in flight."""
+        ready = []
+        with self._lock:
+            for destination in self._destinations.values():
+                if destination.pending and not destination.in_flight and destination.retry_at <= now:
+                    destination.in_flight = True
+                    ready.append(destination)
+        return ready
+
+    def next_retry(self) -> Optional[float]:
+        """Earliest time a waiting destination may be retried."""
+        with self._lock:
+            times = [
+                d.retry_at
+                for d in self._destinations.values()
+                if d.pending and not d.in_flight
+            ]
+        return min(times) if times else None
+
+    def batch(self, destination: _Destination, batch_size: int) -> List[Dict[str, Any]]:
+        """The oldest messages of a destination, left queued until acknowledged."""
+        with self._lock:
+            destination.sending = min(batch_size, len(destination.pending))
+            return [destination.pending[i] for i in range(destination.sending)]
+
+    def acknowledge(self, destination: _Destination, count: int) -> None:
+        """Drop the first ``count`` messages of a delivered batch."""
+        with self._lock:
+            for _ in range(count):
+                destination.pending.popleft()
+            destination.retry_at = 0.0
+            destination.in_flight = False
+            destination.sending = 0
+            self.delivered += count
+
+    def fail(
+        self,
+        destination: _Destination,
+        batch: List[Dict[str, Any]],
+        error: str,
+        max_attempts: int,
+        delay: float,
+    ) -> None:
+        """Record a failed batch; dead-letter messages out of attempts."""
+        with self._lock:
+            for message in batch:
+                message["attempts"] += 1
+                message["last_error"] = error
+            while destination.pending and destination.pending[0]["attempts"] >= max_attempts:
+                self.dead_letters.append(destination.pending.popleft())
+            destination.retry_at = time.monotonic() + delay if destination.pending else 0.0
+            destination.in_flight = False
+            destination.sending = 0
+            self.retried += 1
+
+    def requeue_dead_letters(self) -> int:
+        """Move every dead letter back to its destination with fresh attempts.
+
+        Requeued messages are sorted back into recording order among the
+        pending ones, behind only a batch already being sent, and are not
+        held to ``max_pending``.
+        """
+        with self._lock:
+            messages = list(self.dead_letters)
+            self.dead_letters.clear()
+            by_url: Dict[str, List[Dict[str, Any]]] = {}
+            for message in messages:
+                message["attempts"] = 0
+                by_url.setdefault(message["destination"], []).append(message)
+            for url, requeued in by_url.items():
+                destination = self._destination(url)
+                pending = list(destination.pending)
+                sending = pending[: destination.sending]
+                waiting = sorted(
+                    pending[destination.sending :] + requeued,
+                    key=lambda message: message["seq"],
+                )
+                destination.pending = deque(sending + waiting)
+        if messages and self._wakeup is not None:
+            self._wakeup()
+        return len(messages)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pending, delivered and dead-lettered counts."""
+        with self._lock:
+            pending = {
+                url: len(d.pending) for url, d in self._destinations.items() if d.pending
+            }
+            return {
+                "recorded": self.recorded,
+                "delivered": self.delivered,
+                "retried": self.retried,
+                "pending": pending,
+                "dead_letters": len(self.dead_letters),
+            }
+
+
+class OutboxDispatcher:
+    """Delivers outbox batches with a bounded pool of asyncio workers.
+
+    Each ready destination gets one POST of up to ``batch_size`` messages
+    as ``{"messages": [...]}``; at most ``workers`` posts run at once over
+    one pooled ``httpx.AsyncClient``. A 2xx response acknowledges the whole
+    batch. Anything else retries the batch after an exponential backoff
+    with jitter, and a destination sends nothing newer until its head batch
+    is through, so receivers see messages in order.
+    """
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        workers: int = 4,
+        batch_size: int = 50,
+        max_attempts: int = 8,
+        base_delay: float = 0.5,
+        max_delay: float = 60.0,
+        timeout: float = 10.0,
+        client: Any = None,
+    ):
+        self.outbox = outbox
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._client = client
+        self._owns_client = client is None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._deliveries: set = set()
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before retry number ``attempts``, with up to 50% jitter."""
+        delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+        return delay * (0.5 + random.random() / 2)
+
+    async def start(self) -> None:
+        """Start dispatching on the running event loop."""
+        if self._client is None:
+            # httpx is only needed once notifications are delivered
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.workers,
+                    max_keepalive_connections=self.workers,
+                ),
+            )
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        wake = self._wake
+        self.outbox._wakeup = lambda: loop.call_soon_threadsafe(wake.set)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        pool = asyncio.Semaphore(self.workers)
+        while True:
+            self._wake.clear()
+            for destination in self.outbox.take_ready(time.monotonic()):
+                await pool.acquire()
+                task = asyncio.create_task(self._deliver(destination))
+                self._deliveries.add(task)
+                task.add_done_callback(self._deliveries.discard)
+                task.add_done_callback(lambda _: pool.release())
+            retry_at = self.outbox.next_retry()
+            timeout = None if retry_at is None else max(retry_at - time.monotonic(), 0)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except TimeoutError:
+                pass
+
+    async def _deliver(self, destination: _Destination) -> None:
+        """POST one batch to a destination and settle it."""
+        batch = self.outbox.batch(destination, self.batch_size)
+        body = {
+            "messages": [
+                {"id": message["id"], **message["payload"]} for message in batch
+            ]
+        }
+        try:
+            response = await self._client.post(destination.url, json=body)
+            error = None if 200 <= response.status_code < 300 else f"HTTP {response.status_code}"
+        except Exception as exc:  # network errors, timeouts, bad URLs
+            error = f"{type(exc).__name__}: {exc}"
+        if error is None:
+            self.outbox.acknowledge(destination, len(batch))
+        else:
+            logger.warning("Delivery to %s failed: %s", destination.url, error)
+            self.outbox.fail(
+                destination,
+                batch,
+                error,
+                self.max_attempts,
+                self.backoff(batch[0]["attempts"] + 1),
+            )
+        # The destination is free again, for its next batch or a retry
+        self._wake.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait until nothing is pending or in flight; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self.outbox.stats()["pending"] or self._deliveries:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Give pending messages ``timeout`` seconds, then stop."""
+        await self.drain(timeout)
+        self.outbox._wakeup = None
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, *self._deliveries, return_exceptions=True)
+            self._task = None
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -1,192 +1,355 @@
+import asyncio
+import logging
+import threading
 import uuid
-from datetime import datetime
-from typing import Any, Dict, List, Optional
-
-from ..models.enums import StatusReservasi, StatusSlot
-from ..utils.time import cek_ketersediaan_waktu, hitung_durasi
+from datetime import date, datetime
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from ..models.enums import StatusReservasi, StatusSlot, StatusWaitlist
+from ..utils.time import cek_ketersediaan_waktu, hitung_durasi, time_to_minutes
+from .catalog_service import Catalog, carry_over, load_catalog
+from .changelog_service import Changelog
+from .geo_service import GeoIndex
+from .occupancy_service import OccupancyNowView
+from .revenue_service import RevenueRollup
+from .search_service import ReservationIndex
+from .snapshot_service import CatalogSnapshot
+from .storage import ReservationStorage
+from .versioning import MAX_CAS_RETRIES, VersionConflictError, try_commit
+from .waitlist_service import Waitlist
+
+logger = logging.getLogger(__name__)
+
+# Listener signature: (event, reservation, actor) where event is "created",
+# "cancelled" or "modified" and actor holds the acting "username" and "role".
+ReservationListener = Callable[[str, Dict[str, Any], Dict[str, Any]], None]
+
+# Reservation fields a PATCH may change; times and slot need a new booking
+MODIFIABLE_FIELDS = ("user_name", "vehicle_number", "phone")
+
+# Most prices (malls x windows) one quote request may ask for
+MAX_PRICE_QUOTES = 5000
+
+
+def check_quote_size(mall_count: int, window_count: int) -> None:
+    """Reject quote requests pricing more than ``MAX_PRICE_QUOTES`` cells."""
+    if mall_count * window_count > MAX_PRICE_QUOTES:
+        raise ValueError(
+            f"Terlalu banyak harga diminta: maksimal {MAX_PRICE_QUOTES} "
+            "(jumlah mall x jumlah rentang waktu)"
+        )
 
 
 class ParkingService:
     """Service for managing parking operations."""
 
-    def __init__(self):
-        """Initialize parking service with in-memory data."""
-        self.malls_db = [
-            {
-                "id": "pvj",
-                "name": "PVJ",
-                "full_name": "Paris Van Java",
-                "address": "Jl. Sukajadi, Bandung",
-                "base_price": 5000,
-                "total_slots": 200,
-                "available_slots": 12,
-            },
-            {
-                "id": "paskal",
-                "name": "Paskal 23",
-                "full_name": "Paskal Hyper Square",
-                "address": "Jl. Pasirkaliki, Bandung",
-                "base_price": 5000,
-                "total_slots": 150,
-                "available_slots": 8,
-            },
-            {
-                "id": "sumaba",
-                "name": "Sumaba",
-                "full_name": "Summarecon Mall Bandung",
-                "address": "Jl. Raya Kopo, Bandung",
-                "base_price": 5000,
-                "total_slots": 300,
-                "available_slots": 15,
-            },
-        ]
-
-        self.slots_db = {
-            "pvj": [
-                {
-                    "id": "pvj-1",
-                    "mall_id": "pvj",
-                    "name": "A-101",
-                    "status": StatusSlot.AVAILABLE.value,
-                    "location": "Lantai 2, Area A",
-                },
-                {
-                    "id": "pvj-2",
-                    "mall_id": "pvj",
-                    "name": "A-102",
-                    "status": StatusSlot.AVAILABLE.value,
-                    "location": "Lantai 2, Area A",
-                },
-                {
-                    "id": "pvj-3",
-                    "mall_id": "pvj",
-                    "name": "B-201",
-                    "status": StatusSlot.OCCUPIED.value,
-                    "location": "Lantai 2, Area B",
-                },
-                {
-                    "id": "pvj-4",
-                    "mall_id": "pvj",
-                    "name": "C-301",
-                    "status": StatusSlot.AVAILABLE.value,
-                    "location": "Lantai 3, Area C",
-                },
-                {
-                    "id": "pvj-5",
-                    "mall_id": "pvj",
-                    "name": "D-401",
-                    "status": StatusSlot.AVAILABLE.value,
-                    "location": "Lantai 4, Area D",
-                },
-            ],
-            "paskal": [
-                {
-                    "id": "paskal-1",
-                    "mall_id": "paskal",
-                    "name": "A-101",
-                    "status": StatusSlot.AVAILABLE.value,
-                    "location": "Lantai 1, Area A",
-                },
-                {
-                    "id": "paskal-2",
-                    "mall_id": "paskal",
-                    "name": "A-102",
-                    "status": StatusSlot.OCCUPIED.value,
-                    "location": "Lantai 1, Area A",
-                },
-                {
-                    "id": "paskal-3",
-                    "mall_id": "paskal",
-                    "name": "B-201",
-                    "status": StatusSlot.AVAILABLE.value,
-                    "location": "Lantai 2, Area B",
-                },
-                {
-                    "id": "paskal-4",
-                    "mall_id": "paskal",
-                    "name": "C-301",
-                    "status": StatusSlot.AVAILABLE.value,
-                    "location": "Lantai 3, Area C",
-                },
-            ],
-            "sumaba": [
-                {
-                    "id": "sumaba-1",
-                    "mall_id": "sumaba",
-                    "name": "A-101",
-                    "status": StatusSlot.AVAILABLE.value,
-                    "location": "Lantai 1, Area A",
-                },
-                {
-                    "id": "sumaba-2",
-                    "mall_id": "sumaba",
-                    "name": "A-102",
-                    "status": StatusSlot.AVAILABLE.value,
-                    "location": "Lantai 1, Area A",
-                },
-                {
-                    "id": "sumaba-3",
-                    "mall_id": "sumaba",
-                    "name": "B-201",
-                    "status": StatusSlot.OCCUPIED.value,
-                    "location": "Lantai 2, Area B",
-                },
-                {
-                    "id": "sumaba-4",
-                    "mall_id": "sumaba",
-                    "name": "C-301",
-                    "status": StatusSlot.AVAILABLE.value,
-                    "location": "Lantai 3, Area C",
-                },
-                {
-                    "id": "sumaba-5",
-                    "mall_id": "sumaba",
-                    "name": "D-401",
-                    "status": StatusSlot.AVAILABLE.value,
-                    "location": "Lantai 4, Area D",
-                },
-            ],
-        }
+    def __init__(
+        self,
+        storage: Optional[ReservationStorage] = None,
+        catalog: Optional[Catalog] = None,
+        changelog: Optional[Changelog] = None,
+    ):
+        """Initialize parking service with the catalog from the data files."""
+        self.catalog = catalog or load_catalog()
+        # Writer lock for catalog swaps and version commits; readers never take it
+        self._catalog_lock = threading.Lock()
+        # Slots changed while a reload carries live state over, else None
+        self._touched: Optional[Set[Tuple[str, str]]] = None
+        # Read-only view for readers, replaced whole after every write
+        self._snapshot = CatalogSnapshot.build(self.catalog)
 
         self.reservations_db: List[Dict[str, Any]] = []
-
-    def get_all_malls(self) -> List[Dict[str, Any]]:
-        """Get all malls."""
-        return self.malls_db
+        self._reservations_by_id: Dict[str, Dict[str, Any]] = {}
+        self._reservations_by_slot: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        # Position of each reservation in reservations_db
+        self._reservation_pos: Dict[str, int] = {}
+
+        self.storage = storage or ReservationStorage()
+        self._slot_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._listeners: List[ReservationListener] = []
+        self._analytics = None
+        self._pricing = None
+        self._geo: Optional[GeoIndex] = None
+        # First listener, so every change is numbered before others see it
+        self.changelog = changelog or Changelog()
+        self.add_listener(self.changelog.on_reservation_event)
+        self.revenue = RevenueRollup()
+        self.add_listener(self.revenue.on_reservation_event)
+        self.search_index = ReservationIndex()
+        self.add_listener(self.search_index.on_reservation_event)
+        self.waitlist = Waitlist()
+        # Slot status and available counts follow the reservations covering now
+        self.occupancy = OccupancyNowView(self._on_occupancy_change)
+        # Slots whose occupancy change lost every compare-and-swap; the next
+        # tick recounts them
+        self._stale_slots: Set[Tuple[str, str]] = set()
+        self.add_listener(self.occupancy.on_reservation_event)
+
+    @property
+    def analytics(self):
+        """Occupancy analytics, built from the reservation history on first use."""
+        if self._analytics is None:
+            # NumPy is only needed by the admin analytics endpoints
+            from .analytics_service import OccupancyAnalytics
+
+            analytics = OccupancyAnalytics([m["id"] for m in self.malls_db])
+            for reservation in self.reservations_db:
+                analytics.record(reservation)
+            self.add_listener(analytics.on_reservation_event)
+            self._analytics = analytics
+        return self._analytics
+
+    @property
+    def pricing(self):
+        """Dynamic pricing engine, built on first use."""
+        if self._pricing is None:
+            # NumPy is only needed once a mall opts into dynamic pricing
+            from .pricing_service import PricingEngine
+
+            pricing = PricingEngine(self.malls_db)
+            self.add_listener(pricing.on_reservation_event)
+            self._pricing = pricing
+        return self._pricing
+
+    @property
+    def geo(self) -> GeoIndex:
+        """Spatial index over the catalog's mall coordinates, built on first use."""
+        geo = self._geo
+        if geo is None:
+            geo = self._geo = GeoIndex(self.catalog.malls)
+        return geo
+
+    def add_listener(self, listener: ReservationListener) -> None:
+        """Register a callback for reservation events."""
+        self._listeners.append(listener)
+
+    def _notify(
+        self, event: str, reservation: Dict[str, Any], actor: Dict[str, Any]
+    ) -> None:
+        """Dispatch a reservation event to all listeners."""
+        for listener in self._listeners:
+            listener(event, reservation, actor)
+
+    @property
+    def malls_db(self) -> List[Dict[str, Any]]:
+        """Malls of the current catalog."""
+        return self.catalog.malls
+
+    @property
+    def slots_db(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Slots of the current catalog grouped by mall."""
+        return self.catalog.slots_by_mall
+
+    def reload_catalog(
+        self, malls_file: Optional[Path] = None, slots_file: Optional[Path] = None
+    ) -> Catalog:
+        """Load the catalog files again and swap the result in."""
+        catalog = load_catalog(malls_file, slots_file)
+        self.replace_catalog(catalog)
+        return catalog
+
+    def replace_catalog(self, catalog: Catalog) -> None:
+        """Atomically swap in a new catalog, carrying live state over.
+
+        The bulk carry-over and snapshot run without the catalog lock, so
+        bookings keep going; slots they touch meanwhile are carried over and
+        re-snapshotted under the lock right before the swap.
+        """
+        with self._catalog_lock:
+            self._touched = set()
+        try:
+            carry_over(self.catalog, catalog)
+            snapshot = CatalogSnapshot.build(catalog)
+        except BaseException:
+            with self._catalog_lock:
+                self._touched = None
+            raise
+        with self._catalog_lock:
+            touched = self._touched
+            carry_over(self.catalog, catalog, touched)
+            snapshot.version = self._snapshot.version + 1
+            for mall_id, slot_id in touched:
+                snapshot = snapshot.with_records(
+                    catalog.mall_by_id.get(mall_id),
+                    catalog.slot_by_key.get((mall_id, slot_id)),
+                )
+            self._touched = None
+            self.catalog = catalog
+            self._snapshot = snapshot
+            self._geo = None
+        if self._pricing is not None:
+            for mall in catalog.malls:
+                self._pricing.register_mall(mall)
+        if self._analytics is not None:
+            for mall in catalog.malls:
+                self._analytics.register_mall(mall["id"])
+
+    def snapshot(self) -> CatalogSnapshot:
+        """The current read-only catalog snapshot."""
+        return self._snapshot
+
+    def get_all_malls(self) -> Sequence[Mapping[str, Any]]:
+        """Get all malls as of the current snapshot."""
+        return self._snapshot.malls
 
     def get_mall_by_id(self, mall_id: str) -> Optional[Dict[str, Any]]:
         """Get mall by ID."""
-        for mall in self.malls_db:
-            if mall["id"] == mall_id:
-                return mall
-        return None
+        return self.catalog.mall_by_id.get(mall_id)
 
-    def get_slots_by_mall(self, mall_id: str) -> List[Dict[str, Any]]:
-        """Get all slots for a mall."""
-        return self.slots_db.get(mall_id, [])
+    def get_slots_by_mall(self, mall_id: str) -> Sequence[Mapping[str, Any]]:
+        """Get all slots for a mall as of the current snapshot."""
+        return self._snapshot.slots(mall_id)
 
     def get_slot_by_id(
         self, mall_id: str, slot_id: str
     ) -> Optional[Dict[str, Any]]:
         """Get specific slot by ID."""
-        if mall_id in self.slots_db:
-            for slot in self.slots_db[mall_id]:
-                if slot["id"] == slot_id:
-                    return slot
-        return None
+        return self.catalog.slot_by_key.get((mall_id, slot_id))
+
+    def _set_slot_state(
+        self, mall_id: str, slot_id: str, status: Optional[str]
+    ) -> None:
+        """Set a slot's status and recount its mall's available slots.
+
+        The available count is the configured count less the slots the
+        occupancy view holds occupied now, so it never drifts from it. The
+        new values are committed with a compare-and-swap on both versions,
+        retried if another writer or a catalog swap got in first. Committed
+        records are new copies swapped into the catalog, as reservations
+        are. A ``status`` of None leaves the slot as is.
+        """
+        key = (mall_id, slot_id)
+        for _ in range(MAX_CAS_RETRIES):
+            catalog = self.catalog
+            slot = catalog.slot_by_key.get(key) if status is not None else None
+            mall = catalog.mall_by_id.get(mall_id)
+            if mall is not None:
+                available = catalog.configured_available[mall_id]
+                available -= self.occupancy.occupied_count(mall_id)
+                available = min(max(available, 0), mall["total_slots"])
+            with self._catalog_lock:
+                # Records may have been replaced since the read; check the current ones
+                updates = []
+                if slot is not None:
+                    updates.append(
+                        (catalog.slot_by_key[key], slot["version"], {"status": status})
+                    )
+                if mall is not None:
+                    updates.append(
+                        (
+                            catalog.mall_by_id[mall_id],
+                            mall["version"],
+                            {"available_slots": available},
+                        )
+                    )
+                committed = try_commit(updates) if self.catalog is catalog else None
+                if committed is not None:
+                    new_slot = committed[0] if slot is not None else None
+                    new_mall = committed[-1] if mall is not None else None
+                    if new_slot is not None:
+                        catalog.replace_slot(new_slot)
+                    if new_mall is not None:
+                        catalog.replace_mall(new_mall)
+                    self._snapshot = self._snapshot.with_records(new_mall, new_slot)
+                    if self._touched is not None:
+                        self._touched.add(key)
+                    return
+        record, version, _ = updates[-1]
+        raise VersionConflictError(version, record["version"])
+
+    def _on_occupancy_change(self, mall_id: str, slot_id: str, occupied: bool) -> None:
+        """Mark a slot occupied or free as reservations start and end.
+
+        Runs inside reservation listeners, after the reservation is
+        committed, so a lost compare-and-swap is logged and left to the
+        next ``tick_occupancy`` rather than raised.
+        """
+        status: Optional[str] = None
+        if self.is_slot_bookable(mall_id, slot_id):
+            # Slots the catalog puts out of service keep their status
+            status = (StatusSlot.OCCUPIED if occupied else StatusSlot.AVAILABLE).value
+        try:
+            self._set_slot_state(mall_id, slot_id, status)
+        except VersionConflictError:
+            logger.warning("Slot %s/%s left for the next occupancy tick", mall_id, slot_id)
+            with self._catalog_lock:
+                self._stale_slots.add((mall_id, slot_id))
+            return
+        if self._pricing is not None:
+            self._pricing.refresh_occupancy(mall_id, self.catalog.mall_by_id.get(mall_id))
+
+    def tick_occupancy(self) -> None:
+        """Bring slot status up to the current minute and retry stale slots."""
+        self.occupancy.advance()
+        with self._catalog_lock:
+            stale, self._stale_slots = self._stale_slots, set()
+        for mall_id, slot_id in stale:
+            occupied = slot_id in self.occupancy.occupied(mall_id)
+            self._on_occupancy_change(mall_id, slot_id, occupied)
+
+    def is_slot_bookable(self, mall_id: str, slot_id: str) -> bool:
+        """Whether the catalog offers the slot for booking at all."""
+        return (
+            self.catalog.configured_status.get((mall_id, slot_id))
+            == StatusSlot.AVAILABLE.value
+        )
 
     def check_availability(
         self, mall_id: str, slot_id: str, start_time: str, end_time: str
     ) -> tuple[bool, List[str]]:
         """Check slot availability for time period."""
         return cek_ketersediaan_waktu(
-            mall_id, slot_id, start_time, end_time, self.reservations_db
+            mall_id,
+            slot_id,
+            start_time,
+            end_time,
+            self._reservations_by_slot.get((mall_id, slot_id), []),
         )
 
+    def _slot_lock(self, mall_id: str, slot_id: str) -> asyncio.Lock:
+        """Lock serialising async writers of one slot."""
+        key = (mall_id, slot_id)
+        lock = self._slot_locks.get(key)
+        if lock is None:
+            lock = self._slot_locks[key] = asyncio.Lock()
+        return lock
+
     def create_reservation(
-        self, reservation_data: dict, username: str
+        self, reservation_data: dict, username: str, user_role: Optional[str] = None
     ) -> Dict[str, Any]:
         """Create a new reservation."""
+        reservasi_baru = self._build_reservation(reservation_data, username)
+        self._commit_reservation(reservasi_baru, username, user_role)
+        return reservasi_baru
+
+    async def create_reservation_async(
+        self, reservation_data: dict, username: str, user_role: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Create a new reservation, persisting it through the storage hook."""
+        async with self._slot_lock(
+            reservation_data["mall_id"], reservation_data["slot_id"]
+        ):
+            reservasi_baru = self._build_reservation(reservation_data, username)
+            await self.storage.save_reservation(reservasi_baru)
+            self._commit_reservation(reservasi_baru, username, user_role)
+        return reservasi_baru
+
+    def _build_reservation(
+        self, reservation_data: dict, username: str
+    ) -> Dict[str, Any]:
+        """Validate a reservation request and build the new record."""
         mall = self.get_mall_by_id(reservation_data["mall_id"])
         if not mall:
             raise ValueError("Mall tidak ditemukan")
@@ -197,7 +360,7 @@ class ParkingService:
         if not slot:
             raise ValueError("Slot parkir tidak ditemukan")
 
-        if slot["status"] != StatusSlot.AVAILABLE.value:
+        if not self.is_slot_bookable(slot["mall_id"], slot["id"]):
             raise ValueError("Slot saat ini tidak tersedia")
 
         # Check availability
@@ -216,7 +379,14 @@ class ParkingService:
             reservation_data["time_slot"]["start_time"],
             reservation_data["time_slot"]["end_time"],
         )
-        total_harga = mall["base_price"] * durasi
+        if mall.get("pricing"):
+            total_harga = self.pricing.quote(
+                mall["id"],
+                time_to_minutes(reservation_data["time_slot"]["start_time"]),
+                durasi * 60,
+            )
+        else:
+            total_harga = mall["base_price"] * durasi
 
         # Create reservation
         reservation_id = str(uuid.uuid4())
@@ -234,42 +404,146 @@ class ParkingService:
             "status": StatusReservasi.CONFIRMED.value,
             "created_at": datetime.now().isoformat(),
             "created_by": username,
+            "version": 1,
         }
+        return reservasi_baru
 
-        # Update slot status and available count
-        for s in self.slots_db[reservation_data["mall_id"]]:
-            if s["id"] == reservation_data["slot_id"]:
-                s["status"] = StatusSlot.OCCUPIED.value
-                break
-
-        for m in self.malls_db:
-            if m["id"] == reservation_data["mall_id"]:
-                m["available_slots"] = max(0, m["available_slots"] - 1)
-                break
-
+    def _commit_reservation(
+        self,
+        reservasi_baru: Dict[str, Any],
+        username: str,
+        user_role: Optional[str] = None,
+    ) -> None:
+        """Apply a built reservation to the in-memory state."""
+        self._reservation_pos[reservasi_baru["id"]] = len(self.reservations_db)
         self.reservations_db.append(reservasi_baru)
-        return reservasi_baru
+        self._reservations_by_id[reservasi_baru["id"]] = reservasi_baru
+        self._reservations_by_slot.setdefault(
+            (reservasi_baru["mall_id"], reservasi_baru["slot_id"]), []
+        ).append(reservasi_baru)
+        self._notify(
+            "created", reservasi_baru, {"username": username, "role": user_role}
+        )
 
     def get_all_reservations(self) -> List[Dict[str, Any]]:
         """Get all reservations."""
         return self.reservations_db
 
+    def get_changes(self, since: int, limit: int = 500) -> Dict[str, Any]:
+        """Reservation changes after sequence number ``since``."""
+        return self.changelog.since(since, limit)
+
     def get_reservation_by_id(
         self, reservation_id: str
     ) -> Optional[Dict[str, Any]]:
         """Get reservation by ID."""
-        for reservation in self.reservations_db:
-            if reservation["id"] == reservation_id:
-                return reservation
-        return None
+        return self._reservations_by_id.get(reservation_id)
+
+    def iter_reservations(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        mall_id: Optional[str] = None,
+        status: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield reservations matching the filters without copying the store.
+
+        Dates are inclusive and compared with the ``created_at`` date.
+        Reservations added after iteration starts are not included.
+        """
+        first = date_from.isoformat() if date_from else None
+        last = date_to.isoformat() if date_to else None
+        reservations = self.reservations_db
+        for index in range(len(reservations)):
+            reservation = reservations[index]
+            created = reservation["created_at"][:10]
+            if first and created < first or last and created > last:
+                continue
+            if mall_id and reservation["mall_id"] != mall_id:
+                continue
+            if status and reservation["status"] != status:
+                continue
+            yield reservation
+
+    def search_reservations(self, **filters: Any) -> List[Dict[str, Any]]:
+        """Search reservations through the secondary indexes."""
+        return self.search_index.search(**filters)
 
     def cancel_reservation(
-        self, reservation_id: str, username: str, user_role: str
+        self,
+        reservation_id: str,
+        username: str,
+        user_role: str,
+        expected_version: Optional[int] = None,
+    ) -> Dict[str, str]:
+        """Cancel a reservation, only at ``expected_version`` if one is given."""
+        for _ in range(MAX_CAS_RETRIES):
+            reservation, version = self._check_cancellable(
+                reservation_id, username, user_role, expected_version
+            )
+            if self._apply_cancellation(reservation, version, username, user_role):
+                break
+        else:
+            raise VersionConflictError(version, self._current_version(reservation))
+        self._fill_waitlist(reservation)
+        return {"message": "Reservasi berhasil dibatalkan"}
+
+    async def cancel_reservation_async(
+        self,
+        reservation_id: str,
+        username: str,
+        user_role: str,
+        expected_version: Optional[int] = None,
     ) -> Dict[str, str]:
-        """Cancel a reservation."""
+        """Cancel a reservation, persisting it through the storage hook."""
+        reservation, _ = self._check_cancellable(
+            reservation_id, username, user_role, expected_version
+        )
+        async with self._slot_lock(reservation["mall_id"], reservation["slot_id"]):
+            for _ in range(MAX_CAS_RETRIES):
+                # Re-check: another writer may have changed it while we waited
+                reservation, version = self._check_cancellable(
+                    reservation_id, username, user_role, expected_version
+                )
+                updated = self._updated_reservation(
+                    reservation, version, {"status": StatusReservasi.CANCELLED.value}
+                )
+                if updated is None:
+                    continue
+                # Persist first, so a failing hook leaves memory untouched
+                await self.storage.update_reservation(updated)
+                if self._apply_cancellation(reservation, version, username, user_role):
+                    break
+            else:
+                raise VersionConflictError(version, self._current_version(reservation))
+        await self._fill_waitlist_async(reservation)
+        return {"message": "Reservasi berhasil dibatalkan"}
+
+    def _read_versioned(
+        self, reservation_id: str, expected_version: Optional[int]
+    ) -> Tuple[Dict[str, Any], int]:
+        """The reservation and the version it was read at.
+
+        Reservation records are never changed in place, so every field
+        checked afterwards belongs to that version.
+        """
         reservation = self.get_reservation_by_id(reservation_id)
         if not reservation:
             raise ValueError("Reservasi tidak ditemukan")
+        version = reservation["version"]
+        if expected_version is not None and version != expected_version:
+            raise VersionConflictError(expected_version, version)
+        return reservation, version
+
+    def _check_cancellable(
+        self,
+        reservation_id: str,
+        username: str,
+        user_role: str,
+        expected_version: Optional[int] = None,
+    ) -> Tuple[Dict[str, Any], int]:
+        """Return the reservation and its version if ``username`` may cancel it now."""
+        reservation, version = self._read_versioned(reservation_id, expected_version)
 
         if reservation["status"] != StatusReservasi.CONFIRMED.value:
             raise ValueError(
@@ -279,25 +553,294 @@ class ParkingService:
         # Check authorization
         if reservation.get("created_by") != username and user_role != "admin":
             raise ValueError("Hanya pemilik atau admin yang bisa membatalkan")
+        return reservation, version
 
-        # Update status
-        reservation["status"] = StatusReservasi.CANCELLED.value
+    def _current_version(self, reservation: Dict[str, Any]) -> int:
+        """Version of the stored record ``reservation`` was read from."""
+        return self._reservations_by_id[reservation["id"]]["version"]
 
-        # Rollback slot status
-        for slot_item in self.slots_db[reservation["mall_id"]]:
-            if slot_item["id"] == reservation["slot_id"]:
-                slot_item["status"] = StatusSlot.AVAILABLE.value
-                break
+    def _updated_reservation(
+        self, reservation: Dict[str, Any], version: int, changes: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """The changed copy ``_replace_reservation`` would swap in.
+
+        None if the stored record is no longer at ``version``.
+        """
+        current = self._reservations_by_id.get(reservation["id"])
+        if current is None or current["version"] != version:
+            return None
+        return {**current, **changes, "version": version + 1}
 
-        # Rollback mall available count
-        for mall_item in self.malls_db:
-            if mall_item["id"] == reservation["mall_id"]:
-                mall_item["available_slots"] = min(
-                    mall_item["total_slots"], mall_item["available_slots"] + 1
+    def _replace_reservation(
+        self, reservation: Dict[str, Any], version: int, changes: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Swap in a changed copy of a reservation at the next version.
+
+        The copy is built whole and replaces the record in every lookup
+        under the writer lock, so readers see the old record or the new one,
+        never new fields with the old version. None if the stored record is
+        no longer at ``version``.
+        """
+        key = reservation["id"]
+        with self._catalog_lock:
+            updated = self._updated_reservation(reservation, version, changes)
+            if updated is None:
+                return None
+            current = self._reservations_by_id[key]
+            self.reservations_db[self._reservation_pos[key]] = updated
+            self._reservations_by_id[key] = updated
+            same_slot = self._reservations_by_slot[(current["mall_id"], current["slot_id"])]
+            for index, other in enumerate(same_slot):
+                if other is current:
+                    same_slot[index] = updated
+                    break
+        return updated
+
+    def _apply_cancellation(
+        self, reservation: Dict[str, Any], version: int, username: str, user_role: str
+    ) -> Optional[Dict[str, Any]]:
+        """Apply a cancellation to the in-memory state; None on a version conflict."""
+        updated = self._replace_reservation(
+            reservation, version, {"status": StatusReservasi.CANCELLED.value}
+        )
+        if updated is not None:
+            self._notify(
+                "cancelled", updated, {"username": username, "role": user_role}
+            )
+        return updated
+
+    @staticmethod
+    def _modifiable_changes(changes: Dict[str, Any]) -> Dict[str, Any]:
+        """The given modifiable fields of a PATCH body."""
+        changes = {
+            field: changes[field]
+            for field in MODIFIABLE_FIELDS
+            if changes.get(field) is not None
+        }
+        if not changes:
+            raise ValueError("Minimal satu data reservasi harus diubah")
+        return changes
+
+    def _check_modifiable(
+        self,
+        reservation_id: str,
+        username: str,
+        user_role: str,
+        expected_version: Optional[int] = None,
+    ) -> Tuple[Dict[str, Any], int]:
+        """Return the reservation and its version if ``username`` may modify it now."""
+        reservation, version = self._read_versioned(reservation_id, expected_version)
+        if reservation["status"] != StatusReservasi.CONFIRMED.value:
+            raise ValueError("Hanya reservasi yang masih confirmed yang bisa diubah")
+        if reservation.get("created_by") != username and user_role != "admin":
+            raise ValueError("Hanya pemilik atau admin yang bisa mengubah")
+        return reservation, version
+
+    def _apply_modification(
+        self,
+        reservation: Dict[str, Any],
+        version: int,
+        changes: Dict[str, Any],
+        username: str,
+        user_role: str,
+    ) -> Optional[Dict[str, Any]]:
+        """Apply a modification to the in-memory state; None on a version conflict."""
+        updated = self._replace_reservation(reservation, version, changes)
+        if updated is not None:
+            self._notify("modified", updated, {"username": username, "role": user_role})
+        return updated
+
+    def modify_reservation(
+        self,
+        reservation_id: str,
+        changes: Dict[str, Any],
+        username: str,
+        user_role: str,
+        expected_version: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Change a reservation's contact details, only at ``expected_version`` if given."""
+        changes = self._modifiable_changes(changes)
+        for _ in range(MAX_CAS_RETRIES):
+            reservation, version = self._check_modifiable(
+                reservation_id, username, user_role, expected_version
+            )
+            updated = self._apply_modification(
+                reservation, version, changes, username, user_role
+            )
+            if updated is not None:
+                return updated
+        raise VersionConflictError(version, self._current_version(reservation))
+
+    async def modify_reservation_async(
+        self,
+        reservation_id: str,
+        changes: Dict[str, Any],
+        username: str,
+        user_role: str,
+        expected_version: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Async variant of ``modify_reservation`` persisting through the storage hook."""
+        changes = self._modifiable_changes(changes)
+        reservation, _ = self._check_modifiable(
+            reservation_id, username, user_role, expected_version
+        )
+        async with self._slot_lock(reservation["mall_id"], reservation["slot_id"]):
+            for _ in range(MAX_CAS_RETRIES):
+                reservation, version = self._check_modifiable(
+                    reservation_id, username, user_role, expected_version
                 )
+                updated = self._updated_reservation(reservation, version, changes)
+                if updated is None:
+                    continue
+                # Persist first, so a failing hook leaves memory untouched
+                await self.storage.update_reservation(updated)
+                updated = self._apply_modification(
+                    reservation, version, changes, username, user_role
+                )
+                if updated is not None:
+                    return updated
+        raise VersionConflictError(version, self._current_version(reservation))
+
+    def _waitlist_slots(self, request: dict) -> List[str]:
+        """Slots a waitlist request may be booked into, validating the request."""
+        if not self.get_mall_by_id(request["mall_id"]):
+            raise ValueError("Mall tidak ditemukan")
+        if request.get("slot_id"):
+            if not self.get_slot_by_id(request["mall_id"], request["slot_id"]):
+                raise ValueError("Slot parkir tidak ditemukan")
+            return [request["slot_id"]]
+        return [slot["id"] for slot in self.get_slots_by_mall(request["mall_id"])]
+
+    @staticmethod
+    def _waitlist_booking(entry: Dict[str, Any], slot_id: str) -> Dict[str, Any]:
+        """Reservation request booking a waitlist entry into ``slot_id``."""
+        return {
+            "mall_id": entry["mall_id"],
+            "slot_id": slot_id,
+            "user_name": entry["user_name"],
+            "vehicle_number": entry["vehicle_number"],
+            "phone": entry["phone"],
+            "time_slot": {
+                "start_time": entry["start_time"],
+                "end_time": entry["end_time"],
+            },
+        }
+
+    def join_waitlist(self, request: dict, username: str) -> Dict[str, Any]:
+        """Book the request now if a slot is free, otherwise queue it."""
+        slot_ids = self._waitlist_slots(request)
+        entry = self.waitlist.add(request, username)
+        # A freed slot may already be booking the new entry
+        if not self.waitlist.claim(entry):
+            return entry
+        reservation = None
+        try:
+            for slot_id in slot_ids:
+                try:
+                    reservation = self.create_reservation(
+                        self._waitlist_booking(entry, slot_id), username
+                    )
+                except ValueError:
+                    continue
                 break
+        finally:
+            if reservation is None:
+                self.waitlist.release(entry)
+        if reservation is not None:
+            self.waitlist.fulfil(entry, reservation["id"])
+        return entry
+
+    async def join_waitlist_async(
+        self, request: dict, username: str
+    ) -> Dict[str, Any]:
+        """Async variant of ``join_waitlist`` booking through the storage hook."""
+        slot_ids = self._waitlist_slots(request)
+        entry = self.waitlist.add(request, username)
+        if not self.waitlist.claim(entry):
+            return entry
+        reservation = None
+        try:
+            for slot_id in slot_ids:
+                try:
+                    reservation = await self.create_reservation_async(
+                        self._waitlist_booking(entry, slot_id), username
+                    )
+                except ValueError:
+                    continue
+                break
+        finally:
+            if reservation is None:
+                self.waitlist.release(entry)
+        if reservation is not None:
+            self.waitlist.fulfil(entry, reservation["id"])
+        return entry
+
+    def _waitlist_candidates(self, freed: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Waiting entries that may fit the window freed by cancelling ``freed``."""
+        return self.waitlist.candidates(
+            freed["mall_id"], freed["slot_id"], freed["start_time"], freed["end_time"]
+        )
 
-        return {"message": "Reservasi berhasil dibatalkan"}
+    def _fill_waitlist(self, freed: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Book waiting entries into the slot freed by cancelling ``freed``."""
+        booked = []
+        for entry in self._waitlist_candidates(freed):
+            # Skip entries another freed slot is booking or has booked
+            if not self.waitlist.claim(entry):
+                continue
+            reservation = None
+            try:
+                reservation = self.create_reservation(
+                    self._waitlist_booking(entry, freed["slot_id"]), entry["username"]
+                )
+            except ValueError:
+                continue
+            finally:
+                if reservation is None:
+                    self.waitlist.release(entry)
+            self.waitlist.fulfil(entry, reservation["id"])
+            booked.append(reservation)
+        return booked
+
+    async def _fill_waitlist_async(
+        self, freed: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Async variant of ``_fill_waitlist`` booking through the storage hook."""
+        booked = []
+        for entry in self._waitlist_candidates(freed):
+            if not self.waitlist.claim(entry):
+                continue
+            reservation = None
+            try:
+                reservation = await self.create_reservation_async(
+                    self._waitlist_booking(entry, freed["slot_id"]), entry["username"]
+                )
+            except ValueError:
+                continue
+            finally:
+                if reservation is None:
+                    self.waitlist.release(entry)
+            self.waitlist.fulfil(entry, reservation["id"])
+            booked.append(reservation)
+        return booked
+
+    def get_waitlist(self, username: str, user_role: str) -> List[Dict[str, Any]]:
+        """Waitlist entries of a user, or every entry for admins."""
+        return self.waitlist.entries(None if user_role == "admin" else username)
+
+    def cancel_waitlist_entry(
+        self, entry_id: str, username: str, user_role: str
+    ) -> Optional[Dict[str, Any]]:
+        """Withdraw a waiting entry; None if it does not exist."""
+        entry = self.waitlist.get(entry_id)
+        if entry is None:
+            return None
+        if entry["username"] != username and user_role != "admin":
+            raise ValueError("Hanya pemilik atau admin yang bisa membatalkan")
+        if entry["status"] != StatusWaitlist.WAITING.value:
+            raise ValueError("Hanya antrean yang masih waiting yang bisa dibatalkan")
+        self.waitlist.cancel(entry)
+        return entry
 
     def get_admin_stats(self) -> Dict[str, Any]:
         """Get admin statistics."""
@@ -321,6 +864,101 @@ class ParkingService:
             "total_slots": sum(len(slots) for slots in self.slots_db.values()),
         }
 
+    def get_occupancy_heatmap(
+        self, mall_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Get occupancy heatmap by mall, weekday and hour of day."""
+        capacities = {mid: len(slots) for mid, slots in self.slots_db.items()}
+        return self.analytics.heatmap(mall_id, capacities)
+
+    def get_revenue_rollup(
+        self,
+        start: datetime,
+        end: datetime,
+        granularity: str = "hour",
+        mall_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Get revenue per mall in hourly or daily buckets."""
+        if mall_id is not None and not self.get_mall_by_id(mall_id):
+            return None
+        mall_ids = [mall_id] if mall_id else [m["id"] for m in self.malls_db]
+        return self.revenue.query(start, end, granularity, mall_ids)
+
+    def get_price_quotes(
+        self, mall_ids: Optional[List[str]], windows: List[Dict[str, str]]
+    ) -> Optional[Dict[str, Any]]:
+        """Quote every time window at every mall in one vectorised lookup.
+
+        Raises ``ValueError`` past ``MAX_PRICE_QUOTES`` prices, which
+        omitting ``mall_ids`` on a large catalog can reach.
+        """
+        if mall_ids is None:
+            mall_ids = [m["id"] for m in self.malls_db]
+        check_quote_size(len(mall_ids), len(windows))
+        if any(not self.get_mall_by_id(mall_id) for mall_id in mall_ids):
+            return None
+        durations = [hitung_durasi(w["start_time"], w["end_time"]) for w in windows]
+        prices = self.pricing.quote_batch(
+            mall_ids,
+            [time_to_minutes(w["start_time"]) for w in windows],
+            [durasi * 60 for durasi in durations],
+        )
+        surge = self.pricing.surge_factors()
+        return {
+            "windows": [
+                {**window, "duration": durasi}
+                for window, durasi in zip(windows, durations)
+            ],
+            "quotes": {
+                mall_id: row for mall_id, row in zip(mall_ids, prices.tolist())
+            },
+            "surge": {mall_id: surge[mall_id] for mall_id in mall_ids},
+        }
+
+    def _has_free_slot(
+        self, mall: Dict[str, Any], start_time: Optional[str], end_time: Optional[str]
+    ) -> bool:
+        """Whether a mall has a free slot now, or for the window if one is given."""
+        if start_time is None:
+            return mall["available_slots"] > 0
+        return any(
+            self.is_slot_bookable(mall["id"], slot["id"])
+            and self.check_slot_availability(mall["id"], slot["id"], start_time, end_time)
+            for slot in self.catalog.slots_by_mall.get(mall["id"], [])
+        )
+
+    def find_nearest_malls(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 5,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        max_km: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Nearest malls with a free slot, each with its ``distance_km``."""
+        if (start_time is None) != (end_time is None):
+            raise ValueError("start_time dan end_time harus diisi bersamaan")
+        if start_time is not None:
+            time_to_minutes(start_time)
+            time_to_minutes(end_time)
+        # The index keeps the records it was built from; read live state
+        # from the ones the catalog holds now
+        mall_by_id = self.catalog.mall_by_id
+        nearest = self.geo.nearest(
+            lat,
+            lon,
+            k,
+            accept=lambda mall: self._has_free_slot(
+                mall_by_id.get(mall["id"], mall), start_time, end_time
+            ),
+            max_km=max_km,
+        )
+        return [
+            {**mall_by_id.get(mall["id"], mall), "distance_km": round(distance, 3)}
+            for distance, mall in nearest
+        ]
+
     def check_slot_availability(
         self, mall_id: str, slot_id: str, start_time: str, end_time: str
     ) -> bool:
@@ -0,0 +1,151 @@
+"""Demand-based dynamic pricing over precomputed per-minute price tables."""
+
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+# Windows may wrap past midnight and last up to a full day
+TABLE_MINUTES = 2 * MINUTES_PER_DAY
+
+
+class PricingEngine:
+    """Per-mall price tables answering quotes with two prefix-sum lookups.
+
+    A mall's optional ``pricing`` config holds ``hourly_multipliers`` (24
+    factors applied to ``base_price``) and ``surge`` (``threshold`` and
+    ``max_multiplier``): above ``threshold`` occupancy the price ramps
+    linearly up to ``max_multiplier`` at full occupancy. Malls without a
+    config are priced flat at ``base_price`` per hour.
+
+    Each mall has one row of cumulative per-minute prices over two days, so
+    the price of a window is ``cum[start + minutes] - cum[start]`` times the
+    mall's surge factor. Occupancy changes only touch that one factor.
+    """
+
+    def __init__(self, malls: Sequence[Dict[str, Any]]):
+        """Build price tables for the given malls."""
+        self._lock = threading.Lock()
+        self.mall_codes: Dict[str, int] = {}
+        self._malls: List[Dict[str, Any]] = []
+        for mall in malls:
+            code = self.mall_codes.setdefault(mall["id"], len(self._malls))
+            if code == len(self._malls):
+                self._malls.append(mall)
+            else:
+                self._malls[code] = mall
+        # Rows for every known mall in one allocation; later malls grow it
+        capacity = max(len(self._malls), 1)
+        self._cumulative = np.zeros((capacity, TABLE_MINUTES + 1), dtype=np.float64)
+        self._surge = np.ones(capacity, dtype=np.float64)
+        for code, mall in enumerate(self._malls):
+            self._cumulative[code] = self._price_row(mall)
+            self._surge[code] = self._surge_factor(mall)
+
+    @staticmethod
+    def _price_row(mall: Dict[str, Any]) -> np.ndarray:
+        """Cumulative per-minute prices of a mall over two days."""
+        hourly = np.asarray(
+            (mall.get("pricing") or {}).get("hourly_multipliers", [1.0] * 24),
+            dtype=np.float64,
+        )
+        if hourly.shape != (24,):
+            raise ValueError("hourly_multipliers harus berisi 24 nilai")
+        per_minute = np.repeat(hourly * (mall["base_price"] / 60), 60)
+        row = np.zeros(TABLE_MINUTES + 1, dtype=np.float64)
+        np.cumsum(np.tile(per_minute, 2), out=row[1:])
+        return row
+
+    @staticmethod
+    def _surge_factor(mall: Dict[str, Any]) -> float:
+        """Occupancy multiplier of a mall from its live slot counts."""
+        surge = (mall.get("pricing") or {}).get("surge")
+        if not surge or not mall.get("total_slots"):
+            return 1.0
+        occupancy = 1 - mall["available_slots"] / mall["total_slots"]
+        threshold = surge.get("threshold", 0.8)
+        if occupancy <= threshold:
+            return 1.0
+        ramp = min((occupancy - threshold) / (1 - threshold), 1.0)
+        return 1 + (surge.get("max_multiplier", 1.5) - 1) * ramp
+
+    def _grow(self) -> None:
+        """Double the mall capacity of the price and surge arrays."""
+        capacity = len(self._surge) * 2
+        cumulative = np.zeros((capacity, TABLE_MINUTES + 1), dtype=np.float64)
+        cumulative[: len(self._cumulative)] = self._cumulative
+        surge = np.ones(capacity, dtype=np.float64)
+        surge[: len(self._surge)] = self._surge
+        self._cumulative, self._surge = cumulative, surge
+
+    def register_mall(self, mall: Dict[str, Any]) -> int:
+        """Add or rebuild the price table of a mall and return its code."""
+        row = self._price_row(mall)
+        with self._lock:
+            code = self.mall_codes.get(mall["id"])
+            if code is None:
+                code = len(self._malls)
+                if code == len(self._surge):
+                    self._grow()
+                self._malls.append(mall)
+            else:
+                self._malls[code] = mall
+            self._cumulative[code] = row
+            self._surge[code] = self._surge_factor(mall)
+            # Published last, so quotes never see a code without its row
+            self.mall_codes[mall["id"]] = code
+        return code
+
+    def refresh_occupancy(
+        self, mall_id: str, mall: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Recompute a mall's surge factor from its current occupancy.
+
+        Catalog writes replace mall records rather than change them, so
+        callers pass the new ``mall`` record when they have one.
+        """
+        with self._lock:
+            code = self.mall_codes.get(mall_id)
+            if code is not None:
+                if mall is not None:
+                    self._malls[code] = mall
+                self._surge[code] = self._surge_factor(self._malls[code])
+
+    def on_reservation_event(
+        self, event: str, reservation: Dict[str, Any], actor: Dict[str, Any]
+    ) -> None:
+        """ParkingService listener refreshing surge factors."""
+        self.refresh_occupancy(reservation["mall_id"])
+
+    def quote(self, mall_id: str, start_minute: int, minutes: int) -> int:
+        """Price of ``minutes`` starting at minute-of-day ``start_minute``."""
+        code = self.mall_codes[mall_id]
+        row = self._cumulative[code]
+        price = (row[start_minute + minutes] - row[start_minute]) * self._surge[code]
+        return int(round(price))
+
+    def quote_batch(
+        self,
+        mall_ids: Sequence[str],
+        start_minutes: Sequence[int],
+        minutes: Sequence[int],
+    ) -> np.ndarray:
+        """Prices of every window for every mall as a (malls, windows) array."""
+        codes = np.fromiter(
+            (self.mall_codes[mall_id] for mall_id in mall_ids), dtype=np.intp
+        )
+        starts = np.asarray(start_minutes, dtype=np.intp)
+        ends = starts + np.asarray(minutes, dtype=np.intp)
+        if starts.size and (starts.min() < 0 or ends.max() > TABLE_MINUTES):
+            raise ValueError("Jendela waktu di luar jangkauan tabel harga")
+        rows = self._cumulative[codes]
+        prices = (rows[:, ends] - rows[:, starts]) * self._surge[codes, None]
+        return np.rint(prices).astype(np.int64)
+
+    def surge_factors(self) -> Dict[str, float]:
+        """Current surge factor per mall."""
+        return {
+            mall_id: round(float(self._surge[code]), 4)
+            for mall_id, code in self.mall_codes.items()
+        }
@@ -0,0 +1,107 @@
+"""Opaque, rotating refresh tokens kept as HMAC digests."""
+
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from typing import Any, Dict, Set, Tuple
+
+from ..utils.auth import REFRESH_TOKEN_EXPIRE_DAYS, SECRET_KEY, TokenError
+
+
+class RefreshTokenStore:
+    """Refresh tokens indexed by their HMAC-SHA256 digest.
+
+    Tokens are random strings; only their keyed digest is stored, so a
+    leaked store cannot be replayed, and checking a token costs one HMAC
+    and one dict lookup. Each refresh rotates the token: the old one is
+    spent and a new one of the same family is issued. Presenting a spent
+    token means it was copied, so the whole family is revoked. Families
+    expire ``ttl`` seconds after login, not after the latest refresh.
+    """
+
+    def __init__(
+        self,
+        secret: str = SECRET_KEY,
+        ttl: float = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600,
+    ):
+        self._mac = hmac.new(
+            b"refresh-token:" + secret.encode("utf-8"), digestmod=hashlib.sha256
+        )
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # digest -> {"username", "family", "expires_at", "spent"}
+        self._tokens: Dict[str, Dict[str, Any]] = {}
+        self._families: Dict[str, Set[str]] = {}
+        self._next_purge = 1024
+        self.reuse_detected = 0
+
+    def _digest(self, token: str) -> str:
+        mac = self._mac.copy()
+        mac.update(token.encode("utf-8"))
+        return mac.hexdigest()
+
+    def _add(self, username: str, family: str, expires_at: float) -> str:
+        token = secrets.token_urlsafe(32)
+        digest = self._digest(token)
+        self._tokens[digest] = {
+            "username": username,
+            "family": family,
+            "expires_at": expires_at,
+            "spent": False,
+        }
+        self._families.setdefault(family, set()).add(digest)
+        return token
+
+    def _revoke_family(self, family: str) -> None:
+        for digest in self._families.pop(family, ()):
+            self._tokens.pop(digest, None)
+
+    def _purge(self, now: float) -> None:
+        """Drop expired families once the store has doubled since the last sweep."""
+        if len(self._tokens) < self._next_purge:
+            return
+        expired = {
+            record["family"]
+            for record in self._tokens.values()
+            if record["expires_at"] <= now
+        }
+        for family in expired:
+            self._revoke_family(family)
+        self._next_purge = max(1024, 2 * len(self._tokens))
+
+    def issue(self, username: str) -> str:
+        """Start a new token family for a fresh login."""
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            return self._add(username, secrets.token_hex(8), now + self.ttl)
+
+    def rotate(self, token: str) -> Tuple[str, str]:
+        """Spend ``token``; returns its successor and the username it belongs to."""
+        digest = self._digest(token)
+        with self._lock:
+            record = self._tokens.get(digest)
+            if record is None:
+                raise TokenError("Refresh token tidak valid")
+            if record["spent"]:
+                self.reuse_detected += 1
+                self._revoke_family(record["family"])
+                raise TokenError("Refresh token sudah dipakai, sesi dicabut")
+            if record["expires_at"] <= time.time():
+                self._revoke_family(record["family"])
+                raise TokenError("Refresh token kadaluwarsa")
+            record["spent"] = True
+            successor = self._add(record["username"], record["family"], record["expires_at"])
+            return successor, record["username"]
+
+    def revoke(self, token: str) -> bool:
+        """Revoke the family ``token`` belongs to; False if it is unknown."""
+        digest = self._digest(token)
+        with self._lock:
+            record = self._tokens.get(digest)
+            if record is None:
+                return False
+            self._revoke_family(record["family"])
+            return True
@@ -0,0 +1,158 @@
+"""Incremental revenue rollups per mall, hour and day."""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.fenwick import FenwickTree
+
+GRANULARITY_HOURS = {"hour": 1, "day": 24}
+MAX_BUCKETS = 10_000
+# Most buckets (malls x buckets) one query may sum, as for batch quotes
+MAX_REVENUE_CELLS = 50_000
+INITIAL_HOURS = 24 * 32
+
+
+def _floor_hour(moment: datetime) -> datetime:
+    """Truncate a datetime to the start of its hour."""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def bucket_range(
+    start: datetime, end: datetime, granularity: str
+) -> Tuple[datetime, timedelta, int]:
+    """Aligned start, bucket width and bucket count of a query range."""
+    if granularity not in GRANULARITY_HOURS:
+        raise ValueError("Granularity harus 'hour' atau 'day'")
+    step = timedelta(hours=GRANULARITY_HOURS[granularity])
+    if granularity == "day":
+        start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        start = _floor_hour(start)
+    if end <= start:
+        raise ValueError("Waktu akhir harus setelah waktu mulai")
+    count = -(-(end - start) // step)
+    if count > MAX_BUCKETS:
+        raise ValueError(f"Rentang terlalu besar (maksimal {MAX_BUCKETS} bucket)")
+    return start, step, count
+
+
+def check_rollup_size(mall_count: int, bucket_count: int) -> None:
+    """Reject queries summing more than ``MAX_REVENUE_CELLS`` buckets."""
+    if mall_count * bucket_count > MAX_REVENUE_CELLS:
+        raise ValueError(
+            f"Terlalu banyak bucket diminta: maksimal {MAX_REVENUE_CELLS} "
+            "(jumlah mall x jumlah bucket)"
+        )
+
+
+class RevenueRollup:
+    """Hourly revenue per mall kept in Fenwick trees.
+
+    Bucket 0 is midnight of the earliest day seen. Each create adds
+    ``total_price`` to the hour of ``created_at`` and each cancel subtracts it
+    again, so any hour or day range is answered with two O(log n) prefix sums.
+    """
+
+    def __init__(self):
+        """Initialize empty rollup tables."""
+        self._lock = threading.Lock()
+        self.origin: Optional[datetime] = None
+        self._capacity = INITIAL_HOURS
+        self._hours: Dict[str, List[int]] = {}
+        self._trees: Dict[str, FenwickTree] = {}
+
+    def _rebuild(self, capacity: int, shift: int = 0) -> None:
+        """Resize every table, shifting existing buckets right by ``shift``."""
+        for mall_id, hours in self._hours.items():
+            resized = [0] * capacity
+            resized[shift : shift + len(hours)] = hours
+            self._hours[mall_id] = resized
+            self._trees[mall_id] = FenwickTree.from_values(resized)
+        self._capacity = capacity
+
+    def _index(self, moment: datetime) -> int:
+        """Bucket index of a moment, growing or rebasing tables as needed."""
+        if self.origin is None:
+            self.origin = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        if moment < self.origin:
+            midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+            days = (self.origin - midnight).days
+            self.origin = midnight
+            self._rebuild(self._capacity + days * 24, shift=days * 24)
+        index = int((moment - self.origin).total_seconds() // 3600)
+        if index >= self._capacity:
+            capacity = self._capacity
+            while index >= capacity:
+                capacity *= 2
+            self._rebuild(capacity)
+        return index
+
+    def add(self, mall_id: str, created_at: datetime, amount: int) -> None:
+        """Add ``amount`` (negative for refunds) to the hour of ``created_at``."""
+        with self._lock:
+            index = self._index(created_at)
+            if mall_id not in self._trees:
+                self._hours[mall_id] = [0] * self._capacity
+                self._trees[mall_id] = FenwickTree(self._capacity)
+            self._hours[mall_id][index] += amount
+            self._trees[mall_id].add(index, amount)
+
+    def on_reservation_event(
+        self, event: str, reservation: Dict[str, Any], actor: Dict[str, Any]
+    ) -> None:
+        """ParkingService listener booking revenue on create and cancel."""
+        sign = 1 if event == "created" else -1 if event == "cancelled" else 0
+        if sign:
+            self.add(
+                reservation["mall_id"],
+                datetime.fromisoformat(reservation["created_at"]),
+                sign * reservation["total_price"],
+            )
+
+    def _sum(self, mall_id: str, start: datetime, end: datetime) -> int:
+        """Revenue of one mall over ``[start, end)`` aligned to hours."""
+        tree = self._trees.get(mall_id)
+        if tree is None or self.origin is None:
+            return 0
+        first = int((start - self.origin).total_seconds() // 3600)
+        last = int((end - self.origin).total_seconds() // 3600)
+        return tree.range_sum(max(first, 0), last)
+
+    def query(
+        self,
+        start: datetime,
+        end: datetime,
+        granularity: str = "hour",
+        mall_ids: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Revenue buckets per mall between ``start`` and ``end``."""
+        start, step, count = bucket_range(start, end, granularity)
+        with self._lock:
+            if mall_ids is None:
+                mall_ids = list(self._trees)
+            check_rollup_size(len(mall_ids), count)
+            malls = {}
+            for mall_id in mall_ids:
+                buckets = []
+                for i in range(count):
+                    bucket_start = start + i * step
+                    buckets.append(
+                        {
+                            "start": bucket_start.isoformat(),
+                            "revenue": self._sum(
+                                mall_id, bucket_start, bucket_start + step
+                            ),
+                        }
+                    )
+                malls[mall_id] = {
+                    "total": self._sum(mall_id, start, start + count * step),
+                    "buckets": buckets,
+                }
+        return {
+            "granularity": granularity,
+            "start": start.isoformat(),
+            "end": (start + count * step).isoformat(),
+            "total": sum(entry["total"] for entry in malls.values()),
+            "malls": malls,
+        }
@@ -0,0 +1,212 @@
+"""Secondary indexes for searching reservations."""
+
+import bisect
+import re
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..utils.time import normalize_interval, time_to_minutes
+
+MAX_RESULTS = 1000
+
+
+def normalize_plate(plate: str) -> str:
+    """Uppercase a plate and drop spaces and punctuation: ``d 1234-abc`` -> ``D1234ABC``."""
+    return re.sub(r"[^0-9A-Z]", "", plate.upper())
+
+
+def normalize_name(name: str) -> str:
+    """Casefold a name and collapse whitespace."""
+    return " ".join(name.casefold().split())
+
+
+def normalize_phone(phone: str) -> str:
+    """Keep digits only, writing the ``62`` country code as a leading ``0``."""
+    digits = re.sub(r"\D", "", phone)
+    return "0" + digits[2:] if digits.startswith("62") else digits
+
+
+class _PrefixIndex:
+    """Sorted ``(key, id)`` pairs answering prefix queries with bisect."""
+
+    def __init__(self):
+        self._entries: List[Tuple[str, str]] = []
+
+    def add(self, key: str, reservation_id: str) -> None:
+        bisect.insort(self._entries, (key, reservation_id))
+
+    def remove(self, key: str, reservation_id: str) -> None:
+        index = bisect.bisect_left(self._entries, (key, reservation_id))
+        if index < len(self._entries) and self._entries[index] == (key, reservation_id):
+            del self._entries[index]
+
+    def match(self, prefix: str) -> Set[str]:
+        """IDs whose key starts with ``prefix``."""
+        entries = self._entries
+        # "\uffff" sorts after every character that can follow the prefix
+        lo = bisect.bisect_left(entries, (prefix,))
+        hi = bisect.bisect_left(entries, (prefix + "\uffff",), lo)
+        return {reservation_id for _, reservation_id in entries[lo:hi]}
+
+
+class ReservationIndex:
+    """Hash, prefix and status indexes over reservations.
+
+    Exact fields (normalised plate, phone, mall) map to ID sets, plates and
+    names are also kept in sorted lists for prefix search, and every status
+    has its own set. A search intersects the candidate sets of its filters,
+    smallest first, so the cost follows the most selective filter rather
+    than the number of reservations.
+    """
+
+    def __init__(self):
+        """Initialize empty indexes."""
+        self._lock = threading.Lock()
+        self._reservations: Dict[str, Dict[str, Any]] = {}
+        self._sequence: Dict[str, int] = {}
+        self._by_plate: Dict[str, Set[str]] = {}
+        self._by_phone: Dict[str, Set[str]] = {}
+        self._by_mall: Dict[str, Set[str]] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        self._status: Dict[str, str] = {}
+        # Normalised (plate, phone, name) each reservation is indexed under
+        self._keys: Dict[str, Tuple[str, str, str]] = {}
+        self._plate_prefix = _PrefixIndex()
+        self._name_prefix = _PrefixIndex()
+
+    def add(self, reservation: Dict[str, Any]) -> None:
+        """Index a new reservation."""
+        reservation_id = reservation["id"]
+        with self._lock:
+            self._reservations[reservation_id] = reservation
+            self._sequence[reservation_id] = len(self._sequence)
+            self._index_details(reservation)
+            self._by_mall.setdefault(reservation["mall_id"], set()).add(reservation_id)
+            self._by_status.setdefault(reservation["status"], set()).add(
+                reservation_id
+            )
+            self._status[reservation_id] = reservation["status"]
+
+    def _index_details(self, reservation: Dict[str, Any]) -> None:
+        """Index plate, phone and name; the caller holds the lock."""
+        reservation_id = reservation["id"]
+        plate = normalize_plate(reservation["vehicle_number"])
+        phone = normalize_phone(reservation["phone"])
+        name = normalize_name(reservation["user_name"])
+        self._by_plate.setdefault(plate, set()).add(reservation_id)
+        self._by_phone.setdefault(phone, set()).add(reservation_id)
+        self._plate_prefix.add(plate, reservation_id)
+        self._name_prefix.add(name, reservation_id)
+        self._keys[reservation_id] = (plate, phone, name)
+
+    def update_details(self, reservation: Dict[str, Any]) -> None:
+        """Re-index a reservation whose plate, phone or name changed."""
+        reservation_id = reservation["id"]
+        with self._lock:
+            keys = self._keys.get(reservation_id)
+            if keys is None:
+                return
+            self._reservations[reservation_id] = reservation
+            plate, phone, name = keys
+            self._by_plate[plate].discard(reservation_id)
+            self._by_phone[phone].discard(reservation_id)
+            self._plate_prefix.remove(plate, reservation_id)
+            self._name_prefix.remove(name, reservation_id)
+            self._index_details(reservation)
+
+    def update_status(self, reservation: Dict[str, Any]) -> None:
+        """Move a reservation to the set of its new status."""
+        reservation_id, status = reservation["id"], reservation["status"]
+        with self._lock:
+            old = self._status.get(reservation_id)
+            if old is None:
+                return
+            self._reservations[reservation_id] = reservation
+            if old == status:
+                return
+            self._by_status[old].discard(reservation_id)
+            self._by_status.setdefault(status, set()).add(reservation_id)
+            self._status[reservation_id] = status
+
+    def on_reservation_event(
+        self, event: str, reservation: Dict[str, Any], actor: Dict[str, Any]
+    ) -> None:
+        """ParkingService listener keeping the indexes in sync."""
+        if event == "created":
+            self.add(reservation)
+        elif event == "modified":
+            self.update_details(reservation)
+        else:
+            self.update_status(reservation)
+
+    def search(
+        self,
+        vehicle_number: Optional[str] = None,
+        vehicle_prefix: Optional[str] = None,
+        phone: Optional[str] = None,
+        name_prefix: Optional[str] = None,
+        status: Optional[str] = None,
+        mall_id: Optional[str] = None,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Reservations matching every given filter, oldest first.
+
+        ``start_time``/``end_time`` select reservations whose window overlaps
+        the given one; they are checked on the intersected candidates.
+        """
+        if (start_time is None) != (end_time is None):
+            raise ValueError("start_time dan end_time harus diisi bersamaan")
+        window = None
+        if start_time is not None:
+            window = normalize_interval(time_to_minutes(start_time), time_to_minutes(end_time))
+        limit = min(max(limit, 1), MAX_RESULTS)
+
+        with self._lock:
+            candidates: List[Set[str]] = []
+            if vehicle_number:
+                candidates.append(self._by_plate.get(normalize_plate(vehicle_number), set()))
+            if vehicle_prefix:
+                candidates.append(self._plate_prefix.match(normalize_plate(vehicle_prefix)))
+            if phone:
+                candidates.append(self._by_phone.get(normalize_phone(phone), set()))
+            if name_prefix:
+                candidates.append(self._name_prefix.match(normalize_name(name_prefix)))
+            if status:
+                candidates.append(self._by_status.get(status, set()))
+            if mall_id:
+                candidates.append(self._by_mall.get(mall_id, set()))
+            if not candidates and window is None:
+                raise ValueError("Minimal satu filter pencarian diperlukan")
+
+            if candidates:
+                candidates.sort(key=len)
+                ids = set(candidates[0])
+                for other in candidates[1:]:
+                    if not ids:
+                        break
+                    ids.intersection_update(other)
+            else:
+                ids = set(self._reservations)
+            ordered = sorted(ids, key=self._sequence.__getitem__)
+            reservations = self._reservations
+
+        results = []
+        for reservation_id in ordered:
+            reservation = reservations[reservation_id]
+            if window is not None and not _overlaps(reservation, window):
+                continue
+            results.append(reservation)
+            if len(results) == limit:
+                break
+        return results
+
+
+def _overlaps(reservation: Dict[str, Any], window: Tuple[int, int]) -> bool:
+    """Whether a reservation's time window overlaps ``window``."""
+    start, end = normalize_interval(
+        time_to_minutes(reservation["start_time"]),
+        time_to_minutes(reservation["end_time"]),
+    )
+    return not (window[1] <= start or window[0] >= end)
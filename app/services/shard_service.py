@@ -0,0 +1,416 @@
+"""Mall-sharded parking service behind a consistent-hash router."""
+
+import bisect
+import hashlib
+import heapq
+import itertools
+from datetime import date, datetime
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .catalog_service import Catalog, load_catalog
+from .changelog_service import Changelog
+from .parking_service import ParkingService, ReservationListener, check_quote_size
+from .revenue_service import bucket_range, check_rollup_size
+from .search_service import MAX_RESULTS
+from .snapshot_service import CatalogSnapshot
+from .storage import ReservationStorage
+
+_by_created = itemgetter("created_at")
+_by_distance = itemgetter("distance_km")
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to shard numbers.
+
+    Every shard owns ``replicas`` points on the ring; a key belongs to the
+    first point at or after its hash. Growing from n to n + 1 shards moves
+    only about 1/(n + 1) of the keys.
+    """
+
+    def __init__(self, shards: int, replicas: int = 64):
+        """Place ``replicas`` points per shard on the ring."""
+        if shards < 1:
+            raise ValueError("Jumlah shard minimal 1")
+        points = sorted(
+            (_hash(f"shard-{shard}-{replica}"), shard)
+            for shard in range(shards)
+            for replica in range(replicas)
+        )
+        self.shards = shards
+        self._hashes = [h for h, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        """Shard number owning ``key``."""
+        index = bisect.bisect_left(self._hashes, _hash(key))
+        return self._owners[index % len(self._owners)]
+
+
+class ShardedParkingService:
+    """ParkingService partitioned by mall into independent shards.
+
+    Each shard is a full ParkingService over the malls the ring assigns it,
+    with its own reservations, indexes, waitlist and locks, so busy malls
+    only contend with the malls sharing their shard. Mall-local calls are
+    routed to one shard; cross-mall admin queries scatter to every shard and
+    merge the results. The per-user waitlist limit applies per shard.
+    """
+
+    def __init__(
+        self,
+        shards: int = 4,
+        storage: Optional[ReservationStorage] = None,
+        catalog: Optional[Catalog] = None,
+    ):
+        """Split the catalog across ``shards`` services."""
+        self.ring = HashRing(shards)
+        self.storage = storage or ReservationStorage()
+        catalog = catalog or load_catalog()
+        # Records live in the shard catalogs; only the mall order is kept here
+        self.mall_ids = [m["id"] for m in catalog.malls]
+        # One sequence across shards, so clients sync from a single position
+        self.changelog = Changelog()
+        self.shards = [
+            ParkingService(self.storage, part, self.changelog)
+            for part in self._split(catalog)
+        ]
+        self._reservation_shard: Dict[str, ParkingService] = {}
+        self._merged: Tuple[Tuple[CatalogSnapshot, ...], Optional[CatalogSnapshot]] = ((), None)
+        for shard in self.shards:
+            shard.add_listener(self._route_listener(shard))
+
+    def _route_listener(self, shard: ParkingService) -> ReservationListener:
+        """Listener remembering which shard holds each new reservation."""
+
+        def remember(event: str, reservation: Dict[str, Any], actor: Dict[str, Any]) -> None:
+            if event == "created":
+                self._reservation_shard[reservation["id"]] = shard
+
+        return remember
+
+    def _split(self, catalog: Catalog) -> List[Catalog]:
+        """Per-shard catalogs sharing the mall and slot dicts of ``catalog``."""
+        malls: List[List[Dict[str, Any]]] = [[] for _ in range(self.ring.shards)]
+        slots: List[List[Dict[str, Any]]] = [[] for _ in range(self.ring.shards)]
+        for mall in catalog.malls:
+            malls[self.ring.shard_for(mall["id"])].append(mall)
+        for (mall_id, _), slot in catalog.slot_by_key.items():
+            slots[self.ring.shard_for(mall_id)].append(slot)
+        return [Catalog(m, s) for m, s in zip(malls, slots)]
+
+    def shard_for(self, mall_id: str) -> ParkingService:
+        """Shard serving ``mall_id``."""
+        return self.shards[self.ring.shard_for(mall_id)]
+
+    def add_listener(self, listener: ReservationListener) -> None:
+        """Register a callback for reservation events on every shard."""
+        for shard in self.shards:
+            shard.add_listener(listener)
+
+    @property
+    def malls_db(self) -> List[Dict[str, Any]]:
+        """Malls of the current shard catalogs, in catalog order."""
+        return [self.shard_for(mid).catalog.mall_by_id[mid] for mid in self.mall_ids]
+
+    @property
+    def slots_db(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Slots of the current shard catalogs grouped by mall."""
+        return {mid: self.shard_for(mid).catalog.slots_by_mall[mid] for mid in self.mall_ids}
+
+    def reload_catalog(
+        self, malls_file: Optional[Path] = None, slots_file: Optional[Path] = None
+    ) -> Catalog:
+        """Load the catalog files again and swap the result in."""
+        catalog = load_catalog(malls_file, slots_file)
+        self.replace_catalog(catalog)
+        return catalog
+
+    def replace_catalog(self, catalog: Catalog) -> None:
+        """Swap a new catalog into every shard, carrying live state over."""
+        for shard, part in zip(self.shards, self._split(catalog)):
+            shard.replace_catalog(part)
+        self.mall_ids = [m["id"] for m in catalog.malls]
+
+    # Mall-local operations, routed to one shard
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Snapshot over all shards, merged again only after a shard publishes."""
+        parts = tuple(shard.snapshot() for shard in self.shards)
+        merged_from, merged = self._merged
+        if merged is None or any(a is not b for a, b in zip(parts, merged_from)):
+            merged = CatalogSnapshot.merge(parts, self.mall_ids, merged)
+            self._merged = (parts, merged)
+        return merged
+
+    def get_all_malls(self) -> Sequence[Mapping[str, Any]]:
+        """Get all malls as of the current snapshot."""
+        return self.snapshot().malls
+
+    def get_mall_by_id(self, mall_id: str) -> Optional[Dict[str, Any]]:
+        """Get mall by ID."""
+        return self.shard_for(mall_id).get_mall_by_id(mall_id)
+
+    def get_slots_by_mall(self, mall_id: str) -> Sequence[Mapping[str, Any]]:
+        """Get all slots for a mall as of the current snapshot."""
+        return self.shard_for(mall_id).get_slots_by_mall(mall_id)
+
+    def get_slot_by_id(self, mall_id: str, slot_id: str) -> Optional[Dict[str, Any]]:
+        """Get specific slot by ID."""
+        return self.shard_for(mall_id).get_slot_by_id(mall_id, slot_id)
+
+    def is_slot_bookable(self, mall_id: str, slot_id: str) -> bool:
+        """Whether the catalog offers the slot for booking at all."""
+        return self.shard_for(mall_id).is_slot_bookable(mall_id, slot_id)
+
+    def tick_occupancy(self) -> None:
+        """Bring slot status on every shard up to the current minute."""
+        for shard in self.shards:
+            shard.tick_occupancy()
+
+    def check_availability(
+        self, mall_id: str, slot_id: str, start_time: str, end_time: str
+    ) -> tuple[bool, List[str]]:
+        """Check slot availability for time period."""
+        return self.shard_for(mall_id).check_availability(
+            mall_id, slot_id, start_time, end_time
+        )
+
+    def check_slot_availability(
+        self, mall_id: str, slot_id: str, start_time: str, end_time: str
+    ) -> bool:
+        """Check if slot is available for given time range."""
+        return self.shard_for(mall_id).check_slot_availability(
+            mall_id, slot_id, start_time, end_time
+        )
+
+    def create_reservation(
+        self, reservation_data: dict, username: str, user_role: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Create a new reservation in the mall's shard."""
+        return self.shard_for(reservation_data["mall_id"]).create_reservation(
+            reservation_data, username, user_role
+        )
+
+    async def create_reservation_async(
+        self, reservation_data: dict, username: str, user_role: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Create a new reservation in the mall's shard through the storage hook."""
+        return await self.shard_for(reservation_data["mall_id"]).create_reservation_async(
+            reservation_data, username, user_role
+        )
+
+    def get_reservation_by_id(self, reservation_id: str) -> Optional[Dict[str, Any]]:
+        """Get reservation by ID."""
+        shard = self._reservation_shard.get(reservation_id)
+        return shard.get_reservation_by_id(reservation_id) if shard else None
+
+    def _reservation_owner(self, reservation_id: str) -> ParkingService:
+        shard = self._reservation_shard.get(reservation_id)
+        if shard is None:
+            raise ValueError("Reservasi tidak ditemukan")
+        return shard
+
+    def cancel_reservation(
+        self,
+        reservation_id: str,
+        username: str,
+        user_role: str,
+        expected_version: Optional[int] = None,
+    ) -> Dict[str, str]:
+        """Cancel a reservation in its shard."""
+        return self._reservation_owner(reservation_id).cancel_reservation(
+            reservation_id, username, user_role, expected_version
+        )
+
+    async def cancel_reservation_async(
+        self,
+        reservation_id: str,
+        username: str,
+        user_role: str,
+        expected_version: Optional[int] = None,
+    ) -> Dict[str, str]:
+        """Cancel a reservation in its shard through the storage hook."""
+        return await self._reservation_owner(reservation_id).cancel_reservation_async(
+            reservation_id, username, user_role, expected_version
+        )
+
+    def modify_reservation(
+        self,
+        reservation_id: str,
+        changes: Dict[str, Any],
+        username: str,
+        user_role: str,
+        expected_version: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Change a reservation's contact details in its shard."""
+        return self._reservation_owner(reservation_id).modify_reservation(
+            reservation_id, changes, username, user_role, expected_version
+        )
+
+    async def modify_reservation_async(
+        self,
+        reservation_id: str,
+        changes: Dict[str, Any],
+        username: str,
+        user_role: str,
+        expected_version: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Change a reservation's contact details in its shard through the storage hook."""
+        return await self._reservation_owner(reservation_id).modify_reservation_async(
+            reservation_id, changes, username, user_role, expected_version
+        )
+
+    def join_waitlist(self, request: dict, username: str) -> Dict[str, Any]:
+        """Book the request now if a slot is free, otherwise queue it."""
+        return self.shard_for(request["mall_id"]).join_waitlist(request, username)
+
+    async def join_waitlist_async(self, request: dict, username: str) -> Dict[str, Any]:
+        """Async variant of ``join_waitlist`` booking through the storage hook."""
+        return await self.shard_for(request["mall_id"]).join_waitlist_async(
+            request, username
+        )
+
+    # Cross-mall queries, scattered to every shard and merged
+
+    def get_all_reservations(self) -> List[Dict[str, Any]]:
+        """Get all reservations, oldest first."""
+        return list(
+            heapq.merge(*(s.get_all_reservations() for s in self.shards), key=_by_created)
+        )
+
+    def get_changes(self, since: int, limit: int = 500) -> Dict[str, Any]:
+        """Reservation changes on any shard after sequence number ``since``."""
+        return self.changelog.since(since, limit)
+
+    def iter_reservations(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        mall_id: Optional[str] = None,
+        status: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield reservations matching the filters, oldest first."""
+        shards = [self.shard_for(mall_id)] if mall_id else self.shards
+        return heapq.merge(
+            *(s.iter_reservations(date_from, date_to, mall_id, status) for s in shards),
+            key=_by_created,
+        )
+
+    def search_reservations(self, **filters: Any) -> List[Dict[str, Any]]:
+        """Search reservations through every shard's secondary indexes."""
+        if filters.get("mall_id"):
+            return self.shard_for(filters["mall_id"]).search_reservations(**filters)
+        limit = min(max(filters.get("limit", 100), 1), MAX_RESULTS)
+        results = [s.search_reservations(**filters) for s in self.shards]
+        return list(itertools.islice(heapq.merge(*results, key=_by_created), limit))
+
+    def get_waitlist(self, username: str, user_role: str) -> List[Dict[str, Any]]:
+        """Waitlist entries of a user, or every entry for admins."""
+        return list(
+            heapq.merge(
+                *(s.get_waitlist(username, user_role) for s in self.shards),
+                key=_by_created,
+            )
+        )
+
+    def cancel_waitlist_entry(
+        self, entry_id: str, username: str, user_role: str
+    ) -> Optional[Dict[str, Any]]:
+        """Withdraw a waiting entry; None if it does not exist."""
+        for shard in self.shards:
+            if shard.waitlist.get(entry_id) is not None:
+                return shard.cancel_waitlist_entry(entry_id, username, user_role)
+        return None
+
+    def get_admin_stats(self) -> Dict[str, Any]:
+        """Get admin statistics summed over all shards."""
+        totals: Dict[str, Any] = {}
+        for shard in self.shards:
+            for key, value in shard.get_admin_stats().items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def _ordered(self, malls: Dict[str, Any]) -> Dict[str, Any]:
+        """Per-mall results in catalog order."""
+        return {mid: malls[mid] for mid in self.mall_ids if mid in malls}
+
+    def get_occupancy_heatmap(
+        self, mall_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Get occupancy heatmap by mall, weekday and hour of day."""
+        if mall_id is not None:
+            return self.shard_for(mall_id).get_occupancy_heatmap(mall_id)
+        parts = [s.get_occupancy_heatmap() for s in self.shards]
+        malls = {mid: entry for part in parts for mid, entry in part["malls"].items()}
+        return {**parts[0], "malls": self._ordered(malls)}
+
+    def get_revenue_rollup(
+        self,
+        start: datetime,
+        end: datetime,
+        granularity: str = "hour",
+        mall_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Get revenue per mall in hourly or daily buckets."""
+        if mall_id is not None:
+            return self.shard_for(mall_id).get_revenue_rollup(
+                start, end, granularity, mall_id
+            )
+        # Each shard caps its own malls; cap the whole fan-out too
+        _, _, count = bucket_range(start, end, granularity)
+        check_rollup_size(len(self.mall_ids), count)
+        parts = [s.get_revenue_rollup(start, end, granularity) for s in self.shards]
+        malls = {mid: entry for part in parts for mid, entry in part["malls"].items()}
+        return {
+            **parts[0],
+            "total": sum(part["total"] for part in parts),
+            "malls": self._ordered(malls),
+        }
+
+    def get_price_quotes(
+        self, mall_ids: Optional[List[str]], windows: List[Dict[str, str]]
+    ) -> Optional[Dict[str, Any]]:
+        """Quote every time window at every mall, one batch per shard."""
+        if mall_ids is None:
+            mall_ids = self.mall_ids
+        check_quote_size(len(mall_ids), len(windows))
+        grouped: Dict[int, List[str]] = {}
+        for mall_id in mall_ids:
+            grouped.setdefault(self.ring.shard_for(mall_id), []).append(mall_id)
+        parts = []
+        for shard, ids in grouped.items():
+            part = self.shards[shard].get_price_quotes(ids, windows)
+            if part is None:
+                return None
+            parts.append(part)
+        if not parts:
+            return self.shards[0].get_price_quotes([], windows)
+        quotes = {mid: row for part in parts for mid, row in part["quotes"].items()}
+        surge = {mid: factor for part in parts for mid, factor in part["surge"].items()}
+        return {
+            "windows": parts[0]["windows"],
+            "quotes": {mid: quotes[mid] for mid in mall_ids},
+            "surge": {mid: surge[mid] for mid in mall_ids},
+        }
+
+    def find_nearest_malls(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 5,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        max_km: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Nearest malls with a free slot across all shards."""
+        results = [
+            s.find_nearest_malls(lat, lon, k, start_time, end_time, max_km)
+            for s in self.shards
+        ]
+        return list(itertools.islice(heapq.merge(*results, key=_by_distance), k))
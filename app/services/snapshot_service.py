@@ -0,0 +1,171 @@
+"""Immutable catalog snapshots published by reference swap."""
+
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from ..utils.compression import compress
+from .catalog_service import Catalog
+
+Record = Mapping[str, Any]
+CacheKey = Tuple[str, ...]
+# Encoding name -> body; "identity" is the uncompressed body
+Variants = Dict[str, bytes]
+IDENTITY = "identity"
+_MALLS_KEY: CacheKey = ("malls",)
+
+
+def freeze(record: Dict[str, Any]) -> Record:
+    """Read-only copy of a record."""
+    return MappingProxyType(dict(record))
+
+
+class CatalogSnapshot:
+    """Read-only malls and slots as of one catalog version.
+
+    Writers never modify a snapshot. After committing a change they build a
+    successor that copies only the changed mall and slot and shares every
+    other record, then publish it by assigning one attribute. Readers take
+    that reference once and see a consistent catalog without locking.
+    Serialised responses are cached on the snapshot, next to their
+    compressed variants; a successor keeps the cached entries its change
+    did not touch.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        malls: Tuple[Record, ...],
+        slots_by_mall: Dict[str, Tuple[Record, ...]],
+        mall_positions: Mapping[str, int],
+        slot_positions: Mapping[Tuple[str, str], int],
+        cache: Optional[Dict[CacheKey, Variants]] = None,
+    ):
+        self.version = version
+        self.malls = malls
+        self._slots_by_mall = slots_by_mall
+        # Positions are fixed for a catalog and shared by all its snapshots
+        self._mall_positions = mall_positions
+        self._slot_positions = slot_positions
+        self._cache: Dict[CacheKey, Variants] = cache if cache is not None else {}
+
+    @classmethod
+    def build(cls, catalog: Catalog, version: int = 1) -> "CatalogSnapshot":
+        """Snapshot every mall and slot of ``catalog``."""
+        slots_by_mall = {
+            mall_id: tuple(freeze(slot) for slot in slots)
+            for mall_id, slots in catalog.slots_by_mall.items()
+        }
+        slot_positions = {
+            (mall_id, slot["id"]): index
+            for mall_id, slots in slots_by_mall.items()
+            for index, slot in enumerate(slots)
+        }
+        return cls(
+            version,
+            tuple(freeze(mall) for mall in catalog.malls),
+            slots_by_mall,
+            {mall["id"]: index for index, mall in enumerate(catalog.malls)},
+            slot_positions,
+        )
+
+    @classmethod
+    def merge(
+        cls,
+        parts: Sequence["CatalogSnapshot"],
+        mall_ids: Sequence[str],
+        previous: Optional["CatalogSnapshot"] = None,
+    ) -> "CatalogSnapshot":
+        """One snapshot over disjoint ``parts``, malls in ``mall_ids`` order.
+
+        Cached entries of ``previous`` whose records are all unchanged are
+        kept, so a write to one shard does not re-render the others.
+        """
+        owner = {mall_id: part for part in parts for mall_id in part._mall_positions}
+        malls = tuple(owner[mall_id].mall(mall_id) for mall_id in mall_ids)
+        slots_by_mall = {
+            mall_id: slots for part in parts for mall_id, slots in part._slots_by_mall.items()
+        }
+        slot_positions = {
+            key: index for part in parts for key, index in part._slot_positions.items()
+        }
+        merged = cls(
+            sum(part.version for part in parts),
+            malls,
+            slots_by_mall,
+            {mall_id: index for index, mall_id in enumerate(mall_ids)},
+            slot_positions,
+        )
+        if previous is not None:
+            merged._cache = {
+                key: body
+                for key, body in previous._cache.items()
+                if merged._same_records(previous, key)
+            }
+        return merged
+
+    def _same_records(self, other: "CatalogSnapshot", key: CacheKey) -> bool:
+        """Whether the records cached under ``key`` are shared with ``other``."""
+        if key == _MALLS_KEY:
+            return len(self.malls) == len(other.malls) and all(
+                a is b for a, b in zip(self.malls, other.malls)
+            )
+        kind, mall_id = key
+        if kind == "mall":
+            return self.mall(mall_id) is other.mall(mall_id)
+        return self.slots(mall_id) is other.slots(mall_id)
+
+    def mall(self, mall_id: str) -> Optional[Record]:
+        """Mall by ID."""
+        index = self._mall_positions.get(mall_id)
+        return None if index is None else self.malls[index]
+
+    def slots(self, mall_id: str) -> Tuple[Record, ...]:
+        """Slots of a mall, empty if the mall is unknown."""
+        return self._slots_by_mall.get(mall_id, ())
+
+    def slot(self, mall_id: str, slot_id: str) -> Optional[Record]:
+        """Slot by mall and slot ID."""
+        index = self._slot_positions.get((mall_id, slot_id))
+        return None if index is None else self._slots_by_mall[mall_id][index]
+
+    def with_records(
+        self, mall: Optional[Dict[str, Any]], slot: Optional[Dict[str, Any]]
+    ) -> "CatalogSnapshot":
+        """Successor with fresh copies of ``mall`` and/or one of its slots."""
+        malls = self.malls
+        slots_by_mall = self._slots_by_mall
+        stale: List[CacheKey] = []
+        if mall is not None:
+            index = self._mall_positions[mall["id"]]
+            malls = malls[:index] + (freeze(mall),) + malls[index + 1:]
+            stale += [_MALLS_KEY, ("mall", mall["id"])]
+        if slot is not None:
+            mall_id = slot["mall_id"]
+            index = self._slot_positions[(mall_id, slot["id"])]
+            slots = slots_by_mall[mall_id]
+            slots_by_mall = {
+                **slots_by_mall,
+                mall_id: slots[:index] + (freeze(slot),) + slots[index + 1:],
+            }
+            stale.append(("slots", mall_id))
+        cache = {key: body for key, body in self._cache.items() if key not in stale}
+        return CatalogSnapshot(
+            self.version + 1,
+            malls,
+            slots_by_mall,
+            self._mall_positions,
+            self._slot_positions,
+            cache,
+        )
+
+    def cached(
+        self, key: CacheKey, render: Callable[[], bytes], encoding: str = IDENTITY
+    ) -> bytes:
+        """Body for ``key`` in ``encoding``, rendered and compressed once per snapshot."""
+        variants = self._cache.get(key)
+        if variants is None:
+            variants = self._cache[key] = {IDENTITY: render()}
+        body = variants.get(encoding)
+        if body is None:
+            body = variants[encoding] = compress(variants[IDENTITY], encoding)
+        return body
@@ -0,0 +1,18 @@
+"""Async storage hooks for reservation persistence."""
+
+from typing import Any, Dict
+
+
+class ReservationStorage:
+    """Async persistence hooks called by ``ParkingService`` on every mutation.
+
+    The in-memory service is the source of truth for reads; a backend only
+    needs to make writes durable. Hooks run before the change is applied in
+    memory, so an exception aborts the mutation. The default does nothing.
+    """
+
+    async def save_reservation(self, reservation: Dict[str, Any]) -> None:
+        """Persist a newly created reservation."""
+
+    async def update_reservation(self, reservation: Dict[str, Any]) -> None:
+        """Persist the new state of an existing reservation."""
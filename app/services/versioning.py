@@ -0,0 +1,55 @@
+"""Version counters and compare-and-swap commits for shared records."""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# A writer re-reads and retries this many times before giving up
+MAX_CAS_RETRIES = 16
+
+# (record, version the writer read, fields to set)
+Update = Tuple[Dict[str, Any], int, Dict[str, Any]]
+
+
+class VersionConflictError(ValueError):
+    """The record moved past the version the caller expected."""
+
+    def __init__(self, expected: int, current: int):
+        super().__init__(
+            f"Versi tidak cocok: diharapkan {expected}, saat ini {current}"
+        )
+        self.expected = expected
+        self.current = current
+
+
+def try_commit(updates: Iterable[Update]) -> Optional[List[Dict[str, Any]]]:
+    """New copies of the records if none changed since it was read, else None.
+
+    Each copy has the changes applied and its version bumped; the records
+    passed in are left as they are. The caller holds the writer lock and
+    swaps the copies in, so lock-free readers see a whole old record or a
+    whole new one.
+    """
+    updates = list(updates)
+    if any(record["version"] != expected for record, expected, _ in updates):
+        return None
+    return [
+        {**record, **changes, "version": expected + 1}
+        for record, expected, changes in updates
+    ]
+
+
+def format_etag(version: int) -> str:
+    """Strong ETag for a record version."""
+    return f'"{version}"'
+
+
+def parse_if_match(value: Optional[str]) -> Optional[int]:
+    """Version named by an ``If-Match`` header; None if absent or ``*``."""
+    if value is None or value.strip() == "*":
+        return None
+    tag = value.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise ValueError("Header If-Match harus berisi versi, misalnya \"3\"")
@@ -0,0 +1,241 @@
+"""Waitlist of reservation requests matched when slots are freed."""
+
+import bisect
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..models.enums import StatusWaitlist
+from ..utils.time import normalize_interval, time_to_minutes
+
+MAX_WAITING_PER_USER = 10
+# How long fulfilled and cancelled entries stay listed before they are dropped
+CLOSED_RETENTION_SECONDS = 24 * 60 * 60
+MINUTES_PER_DAY = 24 * 60
+# Entries still queued; a booking one is claimed by a booking attempt
+OPEN_STATUSES = (StatusWaitlist.WAITING.value, StatusWaitlist.BOOKING.value)
+
+# Bucket key: (mall_id, slot_id), with slot_id None for "any slot" entries
+BucketKey = Tuple[str, Optional[str]]
+
+
+class _IntervalBucket:
+    """Waiting entries of one slot (or one mall's any-slot queue) sorted by start.
+
+    Entries overlapping ``[start, end)`` have ``entry_start < end`` and
+    ``entry_start > start - max_length``, so a lookup bisects to that range
+    instead of scanning the whole queue.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[int, int]] = []
+        self._entries: List[Dict[str, Any]] = []
+        self.max_length = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        key = (entry["_start"], entry["_seq"])
+        index = bisect.bisect_left(self._keys, key)
+        self._keys.insert(index, key)
+        self._entries.insert(index, entry)
+        self.max_length = max(self.max_length, entry["_end"] - entry["_start"])
+
+    def remove(self, entry: Dict[str, Any]) -> None:
+        index = bisect.bisect_left(self._keys, (entry["_start"], entry["_seq"]))
+        if index < len(self._keys) and self._entries[index] is entry:
+            del self._keys[index]
+            del self._entries[index]
+
+    def entries(self) -> List[Dict[str, Any]]:
+        return list(self._entries)
+
+    def overlapping(self, start: int, end: int) -> List[Dict[str, Any]]:
+        """Entries whose window overlaps ``[start, end)`` on the daily circle.
+
+        Windows past midnight end above 1440, so the range is also matched a
+        day later (a 23:00-01:00 entry against a freed 00:00-01:00) and a day
+        earlier (a freed 23:00-01:00 against a 00:30-02:00 entry).
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        for shift in (-MINUTES_PER_DAY, 0, MINUTES_PER_DAY):
+            low, high = start + shift, end + shift
+            lo = bisect.bisect_right(self._keys, (low - self.max_length, float("inf")))
+            hi = bisect.bisect_left(self._keys, (high, -1))
+            for entry in self._entries[lo:hi]:
+                if entry["_end"] > low:
+                    found.setdefault(entry["id"], entry)
+        return list(found.values())
+
+
+class Waitlist:
+    """Priority queues of waiting reservation requests per slot and per mall.
+
+    Priority is registration order. When a slot frees up, the entries that
+    want that slot and the entries that accept any slot of its mall are
+    looked up by interval overlap and returned earliest-registered first.
+    Closed entries leave the queues at once and stay listed for
+    ``closed_retention`` seconds, after which they are forgotten.
+    """
+
+    def __init__(
+        self,
+        closed_retention: float = CLOSED_RETENTION_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize an empty waitlist."""
+        self.closed_retention = closed_retention
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._buckets: Dict[BucketKey, _IntervalBucket] = {}
+        # Entries per user by ID, and how many of them are still open
+        self._user_entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._open_count: Dict[str, int] = {}
+        # (closed_at, entry) in closing order, expired from the left
+        self._closed: deque[Tuple[float, Dict[str, Any]]] = deque()
+
+    def add(self, request: Dict[str, Any], username: str) -> Dict[str, Any]:
+        """Register a waiting request and return its entry."""
+        start, end = normalize_interval(
+            time_to_minutes(request["time_slot"]["start_time"]),
+            time_to_minutes(request["time_slot"]["end_time"]),
+        )
+        with self._lock:
+            self._expire_closed()
+            if self._open_count.get(username, 0) >= MAX_WAITING_PER_USER:
+                raise ValueError(
+                    f"Maksimal {MAX_WAITING_PER_USER} antrean aktif per pengguna"
+                )
+            entry = {
+                "id": str(uuid.uuid4()),
+                "mall_id": request["mall_id"],
+                "slot_id": request.get("slot_id"),
+                "user_name": request["user_name"],
+                "vehicle_number": request["vehicle_number"],
+                "phone": request["phone"],
+                "start_time": request["time_slot"]["start_time"],
+                "end_time": request["time_slot"]["end_time"],
+                "status": StatusWaitlist.WAITING.value,
+                "reservation_id": None,
+                "created_at": datetime.now().isoformat(),
+                "username": username,
+                "_start": start,
+                "_end": end,
+                "_seq": next(self._sequence),
+            }
+            self._entries[entry["id"]] = entry
+            self._user_entries.setdefault(username, {})[entry["id"]] = entry
+            self._open_count[username] = self._open_count.get(username, 0) + 1
+            key = (entry["mall_id"], entry["slot_id"])
+            self._buckets.setdefault(key, _IntervalBucket()).add(entry)
+        return entry
+
+    def get(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        """Get an entry by ID."""
+        with self._lock:
+            self._expire_closed()
+            return self._entries.get(entry_id)
+
+    def entries(self, username: Optional[str] = None) -> List[Dict[str, Any]]:
+        """All entries, or those of ``username``, oldest first."""
+        with self._lock:
+            self._expire_closed()
+            if username is None:
+                return list(self._entries.values())
+            return list(self._user_entries.get(username, {}).values())
+
+    def _expire_closed(self) -> None:
+        """Forget entries closed longer than ``closed_retention`` ago; caller locks."""
+        cutoff = self._clock() - self.closed_retention
+        closed = self._closed
+        while closed and closed[0][0] <= cutoff:
+            _, entry = closed.popleft()
+            del self._entries[entry["id"]]
+            user_entries = self._user_entries[entry["username"]]
+            del user_entries[entry["id"]]
+            if not user_entries:
+                del self._user_entries[entry["username"]]
+                del self._open_count[entry["username"]]
+
+    def _close(
+        self, entry: Dict[str, Any], status: str, expected: Tuple[str, ...]
+    ) -> bool:
+        """Take an entry in an ``expected`` status out of its queue for good."""
+        with self._lock:
+            if entry["status"] not in expected:
+                return False
+            entry["status"] = status
+            self._open_count[entry["username"]] -= 1
+            key = (entry["mall_id"], entry["slot_id"])
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.remove(entry)
+                if not bucket:
+                    del self._buckets[key]
+            self._closed.append((self._clock(), entry))
+            self._expire_closed()
+            return True
+
+    def claim(self, entry: Dict[str, Any]) -> bool:
+        """Take a waiting entry for one booking attempt; False if already taken.
+
+        Booking awaits storage, so without the claim two freed slots could
+        both book the same entry.
+        """
+        with self._lock:
+            if entry["status"] != StatusWaitlist.WAITING.value:
+                return False
+            entry["status"] = StatusWaitlist.BOOKING.value
+            return True
+
+    def release(self, entry: Dict[str, Any]) -> None:
+        """Put a claimed entry back in the queue after a failed booking."""
+        with self._lock:
+            if entry["status"] == StatusWaitlist.BOOKING.value:
+                entry["status"] = StatusWaitlist.WAITING.value
+
+    def fulfil(self, entry: Dict[str, Any], reservation_id: str) -> None:
+        """Mark an entry as booked."""
+        if self._close(entry, StatusWaitlist.FULFILLED.value, OPEN_STATUSES):
+            entry["reservation_id"] = reservation_id
+
+    def cancel(self, entry: Dict[str, Any]) -> None:
+        """Withdraw a waiting entry."""
+        self._close(
+            entry, StatusWaitlist.CANCELLED.value, (StatusWaitlist.WAITING.value,)
+        )
+
+    def candidates(
+        self,
+        mall_id: str,
+        slot_id: str,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Queued entries that may use ``slot_id``, earliest registered first.
+
+        With a freed window only entries overlapping it are returned; without
+        one the whole slot is free and every entry for it qualifies.
+        """
+        window = None
+        if start_time is not None and end_time is not None:
+            window = normalize_interval(
+                time_to_minutes(start_time), time_to_minutes(end_time)
+            )
+        with self._lock:
+            found: List[Dict[str, Any]] = []
+            for key in ((mall_id, slot_id), (mall_id, None)):
+                bucket = self._buckets.get(key)
+                if not bucket:
+                    continue
+                found.extend(
+                    bucket.overlapping(*window) if window else bucket.entries()
+                )
+        return sorted(found, key=lambda e: e["_seq"])
@@ -1,25 +1,37 @@
 """Authentication and authorization utilities."""
 
+import base64
+import binascii
+import calendar
+import hashlib
+import hmac
+import json
+import time
+from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 from typing import Any, Dict, Optional
 
-import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 
 from ..models.enums import PeranUser
 
+# bcrypt and jose (with its cryptography backend) are imported inside the
+# functions and classes that need them, keeping them off the app's import path.
+
 # Configuration
 SECRET_KEY = "your-secret-key-change-in-production-min-32-chars-long"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480  # 8 hours
+REFRESH_TOKEN_EXPIRE_DAYS = 14
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 
 def hash_password(plain: str) -> str:
     """Hash a plain text password."""
+    import bcrypt
+
     password_bytes = plain.encode('utf-8')
     salt = bcrypt.gensalt()
     hashed = bcrypt.hashpw(password_bytes, salt)
@@ -28,6 +40,8 @@ def hash_password(plain: str) -> str:
 
 def verify_password(plain: str, hashed: str) -> bool:
     """Verify a password against its hash."""
+    import bcrypt
+
     try:
         password_bytes = plain.encode('utf-8')
         hashed_bytes = hashed.encode('utf-8')
@@ -36,6 +50,142 @@ def verify_password(plain: str, hashed: str) -> bool:
         return False
 
 
+class TokenError(Exception):
+    """Raised when a token is malformed, forged or expired."""
+
+
+class TokenCodec(ABC):
+    """Interface for encoding and verifying access tokens."""
+
+    @abstractmethod
+    def encode(self, claims: Dict[str, Any]) -> str:
+        """Sign ``claims`` into a token."""
+
+    @abstractmethod
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verify ``token`` and return its claims, raising ``TokenError``."""
+
+
+def _b64encode(data: bytes) -> bytes:
+    """Unpadded base64url encoding used by JWT."""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    """Decode unpadded base64url."""
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _numeric_date(value: Any) -> Any:
+    """Convert datetimes to JWT NumericDate (seconds since epoch, UTC)."""
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    return value
+
+
+class HS256Codec(TokenCodec):
+    """Fast HS256 JWT codec, interoperable with python-jose tokens.
+
+    The HMAC key schedule is computed once and copied per token, the header is
+    a pre-encoded constant and signatures are compared in constant time. Only
+    ``alg: HS256`` is accepted; ``exp`` and ``nbf`` must be numeric when present
+    and are checked without leeway.
+    """
+
+    def __init__(self, secret: str):
+        """Precompute the HMAC state and the encoded header."""
+        self._mac = hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+        self._header = _b64encode(b'{"alg":"HS256","typ":"JWT"}')
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        """HMAC-SHA256 of the signing input."""
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        """Sign ``claims`` into a compact JWT."""
+        payload = {key: _numeric_date(value) for key, value in claims.items()}
+        body = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        signing_input = self._header + b"." + body
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode(
+            "ascii"
+        )
+
+    def _check_header(self, header_b64: bytes) -> None:
+        """Accept the canonical header, or any header declaring HS256."""
+        if header_b64 == self._header:
+            return
+        header = json.loads(_b64decode(header_b64))
+        if not isinstance(header, dict) or header.get("alg") != ALGORITHM:
+            raise TokenError("Algoritma token tidak didukung")
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verify a compact JWT and return its claims."""
+        try:
+            header_b64, payload_b64, signature_b64 = token.encode("ascii").split(b".")
+            self._check_header(header_b64)
+            signature = _b64decode(signature_b64)
+            expected = self._sign(header_b64 + b"." + payload_b64)
+            if not hmac.compare_digest(expected, signature):
+                raise TokenError("Signature token tidak valid")
+            payload = json.loads(_b64decode(payload_b64))
+        except (ValueError, binascii.Error) as e:
+            raise TokenError("Token tidak valid") from e
+        if not isinstance(payload, dict):
+            raise TokenError("Payload token tidak valid")
+
+        now = time.time()
+        for claim in ("exp", "nbf"):
+            value = payload.get(claim)
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise TokenError(f"Klaim '{claim}' harus berupa angka")
+        if "exp" in payload and payload["exp"] <= now:
+            raise TokenError("Token kadaluwarsa")
+        if "nbf" in payload and payload["nbf"] > now:
+            raise TokenError("Token belum berlaku")
+        return payload
+
+
+class JoseCodec(TokenCodec):
+    """Token codec backed by python-jose's generic JWT implementation."""
+
+    def __init__(self, secret: str, algorithm: str = ALGORITHM):
+        self.secret = secret
+        self.algorithm = algorithm
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        """Sign ``claims`` with ``jose.jwt.encode``."""
+        from jose import jwt
+
+        return jwt.encode(claims, self.secret, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verify ``token`` with ``jose.jwt.decode``."""
+        from jose import JWTError, jwt
+
+        try:
+            return jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        except JWTError as e:
+            raise TokenError(str(e)) from e
+
+
+_token_codec: TokenCodec = HS256Codec(SECRET_KEY)
+
+
+def get_token_codec() -> TokenCodec:
+    """Get the codec used for access tokens."""
+    return _token_codec
+
+
+def set_token_codec(codec: TokenCodec) -> None:
+    """Replace the codec used for access tokens."""
+    global _token_codec
+    _token_codec = codec
+
+
 def create_access_token(
     data: dict, expires_delta_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES
 ) -> str:
@@ -43,8 +193,7 @@ def create_access_token(
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=expires_delta_minutes)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return _token_codec.encode(to_encode)
 
 
 def get_user_from_db(username: str, users_db: list) -> Optional[Dict[str, Any]]:
@@ -61,19 +210,19 @@ def get_current_user(
     """Get current authenticated user from token."""
     if users_db is None:
         users_db = []
-    
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token tidak valid atau kadaluwarsa",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _token_codec.decode(token)
         username: str = payload.get("sub")
         role: str = payload.get("role")
         if username is None or role is None:
             raise credentials_exception
-    except JWTError:
+    except TokenError:
         raise credentials_exception
 
     user = get_user_from_db(username, users_db)
@@ -0,0 +1,167 @@
+"""Negotiated gzip/brotli response compression."""
+
+import gzip
+import zlib
+from typing import Dict, Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+
+# Encodings this server can produce, most preferred first
+SUPPORTED_ENCODINGS = ("br", "gzip")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Media types worth compressing; images and archives are already dense
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported encoding acceptable per ``Accept-Encoding``, if any."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Whole ``body`` in ``encoding``."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """Incremental compressor flushing each chunk so clients can decode as it arrives."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31 writes a gzip header and trailer around the deflate stream
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        """Compressed bytes for ``chunk``, flushed to a byte boundary."""
+        if self.encoding == "br":
+            return self._brotli.process(chunk) + self._brotli.flush()
+        return self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """Trailing bytes ending the stream."""
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def is_compressible(content_type: str) -> bool:
+    """Whether responses of ``content_type`` are worth compressing."""
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class _CompressingSend:
+    """``send`` wrapper compressing one response.
+
+    The response start is held back until ``minimum_size`` body bytes have
+    arrived or the body ended. Smaller bodies go out unchanged; larger ones
+    are compressed whole, and streams chunk by chunk as they arrive.
+    """
+
+    def __init__(self, send, encoding: Optional[str], minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: Optional[dict] = None
+        self.buffer = bytearray()
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def __call__(self, message) -> None:
+        kind = message["type"]
+        if kind == "http.response.start":
+            headers = MutableHeaders(raw=list(message.get("headers", [])))
+            if "content-encoding" in headers or not is_compressible(
+                headers.get("content-type", "")
+            ):
+                self.passthrough = True
+            else:
+                if "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                    message["headers"] = headers.raw
+                self.passthrough = self.encoding is None
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start = message
+            return
+        if self.passthrough or kind != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is not None:
+            chunk = self.compressor.compress(body)
+            if not more_body:
+                chunk += self.compressor.finish()
+            await self.send({"type": kind, "body": chunk, "more_body": more_body})
+            return
+
+        self.buffer += body
+        if more_body and len(self.buffer) < self.minimum_size:
+            return
+        if len(self.buffer) < self.minimum_size:
+            self.passthrough = True
+            await self.send(self.start)
+            await self.send({"type": kind, "body": bytes(self.buffer)})
+            return
+        headers = MutableHeaders(raw=list(self.start.get("headers", [])))
+        headers["Content-Encoding"] = self.encoding
+        if more_body:
+            del headers["Content-Length"]
+            self.compressor = StreamCompressor(self.encoding)
+            chunk = self.compressor.compress(bytes(self.buffer))
+        else:
+            chunk = compress(bytes(self.buffer), self.encoding)
+            headers["Content-Length"] = str(len(chunk))
+        self.start["headers"] = headers.raw
+        await self.send(self.start)
+        await self.send({"type": kind, "body": chunk, "more_body": more_body})
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses per the request's ``Accept-Encoding``.
+
+    Responses that already carry a ``Content-Encoding`` (pre-compressed
+    cache entries, gzipped exports) pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = 500):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        await self.app(
+            scope, receive, _CompressingSend(send, encoding, self.minimum_size)
+        )
@@ -0,0 +1,50 @@
+"""Fenwick (binary indexed) tree for prefix and range sums."""
+
+from typing import List, Sequence
+
+
+class FenwickTree:
+    """Prefix sums over a fixed-size array with O(log n) point updates."""
+
+    def __init__(self, size: int):
+        """Create a tree of ``size`` zero-valued positions."""
+        self.size = size
+        self._tree: List[int] = [0] * (size + 1)
+
+    @classmethod
+    def from_values(cls, values: Sequence[int]) -> "FenwickTree":
+        """Build a tree from existing values in O(n)."""
+        tree = cls(len(values))
+        data = tree._tree
+        for i, value in enumerate(values, start=1):
+            data[i] += value
+            parent = i + (i & -i)
+            if parent <= tree.size:
+                data[parent] += data[i]
+        return tree
+
+    def add(self, index: int, delta: int) -> None:
+        """Add ``delta`` at zero-based ``index``."""
+        if not 0 <= index < self.size:
+            raise IndexError(f"Index {index} di luar jangkauan")
+        i = index + 1
+        data = self._tree
+        while i <= self.size:
+            data[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, end: int) -> int:
+        """Sum of positions ``[0, end)``."""
+        i = min(max(end, 0), self.size)
+        total = 0
+        data = self._tree
+        while i > 0:
+            total += data[i]
+            i -= i & -i
+        return total
+
+    def range_sum(self, start: int, end: int) -> int:
+        """Sum of positions ``[start, end)``."""
+        if end <= start:
+            return 0
+        return self.prefix_sum(end) - self.prefix_sum(start)
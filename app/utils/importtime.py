@@ -0,0 +1,125 @@
+"""Startup benchmarks: ``-X importtime`` profiling and time-to-first-request.
+
+Run ``python -m app.utils.importtime`` to print the slowest imports of
+``app.main`` and the time-to-first-request of a fresh process.
+"""
+
+import json
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from ..config import PROJECT_ROOT
+
+# Child script: import the app and serve one request through the raw ASGI
+# interface, so no HTTP client or server is needed.
+_FIRST_REQUEST_SCRIPT = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def request(path):
+    status = {}
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [],
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80),
+    }
+    await app(scope, receive, send)
+    return status["code"]
+
+code = asyncio.run(request(sys.argv[1]))
+done = time.perf_counter()
+print(json.dumps({
+    "status": code,
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (done - imported) * 1000,
+    "time_to_first_request_ms": (done - started) * 1000,
+}))
+"""
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """Parse ``-X importtime`` stderr into a list of per-module records."""
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        records.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self_us": int(fields[0]),
+                "cumulative_us": int(fields[1]),
+            }
+        )
+    return records
+
+
+def measure_imports(module: str = "app.main") -> Dict[str, Any]:
+    """Import ``module`` in a fresh interpreter under ``-X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=PROJECT_ROOT,
+        check=True,
+    )
+    records = parse_importtime(result.stderr)
+    target = next(r for r in reversed(records) if r["module"] == module)
+    return {
+        "module": module,
+        "cumulative_us": target["cumulative_us"],
+        "modules": {r["module"]: r for r in records},
+    }
+
+
+def measure_first_request(path: str = "/health") -> Dict[str, Any]:
+    """Time-to-first-request of a fresh process, including interpreter startup."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", _FIRST_REQUEST_SCRIPT, path],
+        capture_output=True,
+        text=True,
+        cwd=PROJECT_ROOT,
+        check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["process_ms"] = (time.perf_counter() - started) * 1000
+    return report
+
+
+def main(top: int = 15) -> None:
+    """Print the slowest imports and the time-to-first-request."""
+    imports = measure_imports()
+    print(f"import app.main: {imports['cumulative_us'] / 1000:.1f} ms")
+    slowest = sorted(
+        imports["modules"].values(), key=lambda r: r["self_us"], reverse=True
+    )
+    for record in slowest[:top]:
+        print(
+            f"  {record['self_us'] / 1000:8.1f} ms self "
+            f"{record['cumulative_us'] / 1000:8.1f} ms cum  {record['module']}"
+        )
+    first = measure_first_request()
+    print(
+        "time to first request: "
+        f"{first['time_to_first_request_ms']:.1f} ms in-process, "
+        f"{first['process_ms']:.1f} ms including interpreter startup"
+    )
+
+
+if __name__ == "__main__":
+    main()
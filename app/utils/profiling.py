@@ -0,0 +1,421 @@
+"""On-demand request profiler producing flame-graph stacks."""
+
+import asyncio
+import contextvars
+import functools
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
+from .auth import TokenError, get_token_codec
+
+Stack = Tuple[str, ...]
+
+# Sampler of the request being profiled, copied into its threadpool calls
+_active_sampler: contextvars.ContextVar[Optional["StackSampler"]] = (
+    contextvars.ContextVar("active_sampler", default=None)
+)
+# anyio.to_thread.run_sync as found before the hook first replaced it
+_run_sync: Optional[Callable[..., Any]] = None
+# Profiled requests in flight; the hook is installed while any are
+_hook_users = 0
+_hook_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    """``function (file:line)`` label of a frame's code object."""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _builtin_label(function) -> str:
+    """Label of a function implemented in C."""
+    name = getattr(function, "__qualname__", None) or repr(function)
+    return f"{name} (built-in)"
+
+
+def collapse(totals: Dict[Stack, float]) -> str:
+    """Stacks in collapsed format, one ``root;...;leaf microseconds`` per line."""
+    lines = []
+    for stack, seconds in sorted(totals.items(), key=lambda item: -item[1]):
+        micros = round(seconds * 1_000_000)
+        if micros:
+            lines.append(f"{';'.join(stack)} {micros}")
+    return "\n".join(lines)
+
+
+class _LoopHook:
+    """Profile hook of one event-loop thread, routing events to the running task's tracer."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.tracers: Dict[asyncio.Task, RequestTracer] = {}
+        self.current: Optional[RequestTracer] = None
+        self.previous = sys.getprofile()
+
+    def __call__(self, frame, event: str, arg: Any) -> None:
+        tracer = self.tracers.get(asyncio.current_task(self.loop))
+        if tracer is not self.current:
+            if self.current is not None:
+                self.current.pause()
+            self.current = tracer
+        if tracer is not None:
+            tracer.event(frame, event, arg)
+
+
+class RequestTracer:
+    """Deterministic profile of one asyncio task through ``sys.setprofile``.
+
+    Every Python and built-in call the task makes on its event-loop thread
+    is timed, so even a sub-millisecond request yields its full stacks:
+    dependency resolution, validation, auth and the handler. Time while
+    the task is suspended or another task runs is not counted. While any
+    tracer is active, every call on the loop thread goes through the hook.
+    """
+
+    _hooks: Dict[int, _LoopHook] = {}
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.totals: Dict[Stack, float] = defaultdict(float)
+        self._stack: List[Tuple[Any, Stack]] = []
+        self._labels: Dict[Any, str] = {}
+        self._last: Optional[float] = None
+
+    def _label(self, frame) -> str:
+        label = self._labels.get(frame.f_code)
+        if label is None:
+            label = self._labels[frame.f_code] = _frame_label(frame)
+        return label
+
+    def _rebuild(self, frame) -> None:
+        """Reset the stack to the Python frames ending at ``frame``."""
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        self._stack.clear()
+        key: Stack = ()
+        for frame in reversed(frames):
+            key += (self._label(frame),)
+            self._stack.append((frame, key))
+
+    def event(self, frame, event: str, arg: Any) -> None:
+        """Charge the time since the last event to the top stack, then move it."""
+        now = time.perf_counter()
+        stack = self._stack
+        if stack and self._last is not None:
+            self.totals[stack[-1][1]] += now - self._last
+        if event == "call":
+            if not stack or stack[-1][0] is not frame.f_back:
+                self._rebuild(frame.f_back)
+            parent = stack[-1][1] if stack else ()
+            stack.append((frame, parent + (self._label(frame),)))
+        elif event == "return":
+            if stack and stack[-1][0] is frame:
+                stack.pop()
+            else:
+                stack.clear()
+        elif event == "c_call":
+            if not stack or stack[-1][0] is not frame:
+                self._rebuild(frame)
+            stack.append((None, stack[-1][1] + (_builtin_label(arg),)))
+        elif stack and stack[-1][0] is None:
+            stack.pop()
+        self._last = time.perf_counter()
+
+    def pause(self) -> None:
+        """Stop the clock while the task is not running."""
+        self._last = None
+
+    def start(self) -> None:
+        """Install the profile hook on the task's loop thread; call from that thread."""
+        ident = threading.get_ident()
+        hook = self._hooks.get(ident)
+        if hook is None:
+            hook = self._hooks[ident] = _LoopHook(self.task.get_loop())
+            sys.setprofile(hook)
+        hook.tracers[self.task] = self
+
+    def stop(self) -> None:
+        """Stop tracing; the hook is removed with the thread's last tracer."""
+        sys.setprofile(None)
+        ident = threading.get_ident()
+        hook = self._hooks[ident]
+        hook.tracers.pop(self.task, None)
+        if hook.current is self:
+            hook.current = None
+        if hook.tracers:
+            sys.setprofile(hook)
+        else:
+            del self._hooks[ident]
+            sys.setprofile(hook.previous)
+        self.pause()
+
+
+class StackSampler:
+    """Background thread sampling the threadpool calls of one request.
+
+    Calls register their worker thread through ``run`` for as long as they
+    last, which ``install_threadpool_hook`` arranges for every threadpool
+    call made while the sampler is active in the calling context. Each
+    sample is weighted by the time since the previous one.
+
+    The GIL switch interval is left alone unless ``switch_interval`` is
+    given; lowering it makes short calls yield more samples but slows
+    every thread in the process while any such sampler runs.
+    """
+
+    _active = 0
+    _active_lock = threading.Lock()
+    _saved_switch_interval = 0.0
+
+    def __init__(
+        self,
+        request_id: str,
+        interval: float = 0.0005,
+        switch_interval: Optional[float] = None,
+    ):
+        """Sample ``request_id``'s threadpool calls every ``interval`` seconds."""
+        self.request_id = request_id
+        self.interval = interval
+        self.switch_interval = switch_interval
+        self.totals: Dict[Stack, float] = defaultdict(float)
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._workers: Set[int] = set()
+        self._workers_lock = threading.Lock()
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Call ``func`` with the current thread registered for sampling."""
+        ident = threading.get_ident()
+        with self._workers_lock:
+            self._workers.add(ident)
+        try:
+            return func(*args)
+        finally:
+            with self._workers_lock:
+                self._workers.discard(ident)
+
+    def _sample(self, elapsed: float) -> None:
+        """Charge ``elapsed`` to the stack of every thread running the request."""
+        with self._workers_lock:
+            workers = list(self._workers)
+        if not workers:
+            return
+        frames = sys._current_frames()
+        for ident in workers:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.totals[tuple(reversed(stack))] += elapsed
+            self.samples += 1
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(now - last)
+            last = now
+
+    def start(self) -> None:
+        """Start sampling in a daemon thread."""
+        if self.switch_interval is not None:
+            cls = type(self)
+            with cls._active_lock:
+                if cls._active == 0:
+                    cls._saved_switch_interval = sys.getswitchinterval()
+                    sys.setswitchinterval(self.switch_interval)
+                cls._active += 1
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        if self._thread is None:
+            return
+        self._thread.join()
+        self._thread = None
+        if self.switch_interval is not None:
+            cls = type(self)
+            with cls._active_lock:
+                cls._active -= 1
+                if cls._active == 0:
+                    sys.setswitchinterval(cls._saved_switch_interval)
+
+
+async def _run_sync_profiled(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """``anyio.to_thread.run_sync`` registering the call with the active sampler."""
+    sampler = _active_sampler.get()
+    if sampler is not None:
+        func = functools.partial(sampler.run, func)
+    return await _run_sync(func, *args, **kwargs)
+
+
+def install_threadpool_hook() -> None:
+    """Route threadpool calls through ``_run_sync_profiled`` until removed.
+
+    Starlette's ``run_in_threadpool`` and ``iterate_in_threadpool``, which
+    run sync dependencies, endpoints and streamed iterators, look up
+    ``anyio.to_thread.run_sync`` on every call. Calls are counted, so the
+    hook stays until the last matching ``remove_threadpool_hook``.
+    """
+    global _run_sync, _hook_users
+    import anyio.to_thread
+
+    with _hook_lock:
+        if _hook_users == 0:
+            if _run_sync is None:
+                _run_sync = anyio.to_thread.run_sync
+            anyio.to_thread.run_sync = _run_sync_profiled
+        _hook_users += 1
+
+
+def remove_threadpool_hook() -> None:
+    """Undo one ``install_threadpool_hook``, restoring anyio after the last."""
+    global _hook_users
+    import anyio.to_thread
+
+    with _hook_lock:
+        _hook_users -= 1
+        # Leave it alone if someone replaced the hook in the meantime
+        if _hook_users == 0 and anyio.to_thread.run_sync is _run_sync_profiled:
+            anyio.to_thread.run_sync = _run_sync
+
+
+class ProfileStore:
+    """Most recent profiling reports, bounded in number."""
+
+    def __init__(self, max_reports: int = 20):
+        self._reports: deque[Dict[str, Any]] = deque(maxlen=max_reports)
+
+    def add(self, report: Dict[str, Any]) -> None:
+        """Store a report, dropping the oldest when full."""
+        self._reports.append(report)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """Get a report by ID."""
+        for report in self._reports:
+            if report["id"] == profile_id:
+                return report
+        return None
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Reports without their stacks, newest first."""
+        return [
+            {key: value for key, value in report.items() if key != "collapsed"}
+            for report in reversed(self._reports)
+        ]
+
+
+class RequestProfilerMiddleware:
+    """ASGI middleware profiling admin requests that opt in.
+
+    A request is considered when it carries ``X-Profile: <rate>`` or
+    ``?profile=<rate>`` and a bearer token with the admin role; it is then
+    profiled with probability ``rate`` (``1`` profiles every such request).
+    The response gets an ``X-Profile-Id`` header naming the stored report.
+    The request's own task is traced deterministically and its threadpool
+    calls are sampled every ``interval`` seconds; ``switch_interval`` opts
+    in to lowering the GIL switch interval while sampling. While any
+    profiled request runs, every Python call on the event loop thread,
+    including other requests', goes through a profile hook, so keep the
+    rate low on busy servers.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: ProfileStore,
+        interval: float = 0.0005,
+        switch_interval: Optional[float] = None,
+    ):
+        self.app = app
+        self.store = store
+        self.interval = interval
+        self.switch_interval = switch_interval
+
+    @staticmethod
+    def _sample_rate(scope) -> float:
+        """Requested sampling rate from header or query string, else 0."""
+        headers = dict(scope["headers"])
+        raw = headers.get(b"x-profile", b"").decode("latin-1")
+        if not raw:
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            raw = query.get("profile", [""])[0]
+        try:
+            return min(max(float(raw), 0.0), 1.0)
+        except ValueError:
+            return 1.0 if raw.lower() == "true" else 0.0
+
+    @staticmethod
+    def _is_admin(scope) -> bool:
+        """Whether the request carries a valid admin bearer token."""
+        authorization = dict(scope["headers"]).get(b"authorization", b"")
+        if authorization[:7].lower() != b"bearer ":
+            return False
+        try:
+            claims = get_token_codec().decode(authorization[7:].decode("latin-1"))
+        except TokenError:
+            return False
+        return claims.get("role") == "admin"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rate = self._sample_rate(scope)
+        if rate <= 0 or random.random() >= rate or not self._is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode())
+                ]
+            await send(message)
+
+        tracer = RequestTracer(asyncio.current_task())
+        sampler = StackSampler(profile_id, self.interval, self.switch_interval)
+        install_threadpool_hook()
+        token = _active_sampler.set(sampler)
+        started = time.perf_counter()
+        sampler.start()
+        tracer.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            tracer.stop()
+            _active_sampler.reset(token)
+            remove_threadpool_hook()
+            # Joining the sampler thread blocks; keep it off the event loop
+            await asyncio.to_thread(sampler.stop)
+            totals = defaultdict(float, tracer.totals)
+            for stack, seconds in sampler.totals.items():
+                totals[stack] += seconds
+            self.store.add(
+                {
+                    "id": profile_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "traced_ms": round(sum(tracer.totals.values()) * 1000, 3),
+                    "threadpool_samples": sampler.samples,
+                    "collapsed": collapse(totals),
+                }
+            )
@@ -0,0 +1,200 @@
+"""Token-bucket rate limiting per user or client IP."""
+
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .auth import TokenError, get_token_codec
+
+
+class RateLimitPolicy:
+    """Token bucket parameters: ``capacity`` requests refilled over ``per_seconds``."""
+
+    __slots__ = ("name", "capacity", "refill_rate")
+
+    def __init__(self, name: str, capacity: int, per_seconds: float):
+        self.name = name
+        self.capacity = capacity
+        self.refill_rate = capacity / per_seconds
+
+    @property
+    def refill_seconds(self) -> float:
+        """Time for an empty bucket to refill completely."""
+        return self.capacity / self.refill_rate
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by policy and client, with lazy refill.
+
+    Each bucket is a two-item list ``[tokens, last_seen]`` in an LRU-ordered
+    dict. Tokens are refilled from elapsed time when a bucket is touched, so
+    there is no background work. Buckets idle for longer than
+    ``idle_seconds`` are full again and are dropped from the LRU end; the
+    total is capped at ``max_keys`` so memory stays bounded however many
+    distinct clients show up.
+    """
+
+    def __init__(
+        self,
+        max_keys: int = 100_000,
+        idle_seconds: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize an empty limiter."""
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        self._clock = clock
+        self._buckets: OrderedDict[Tuple[str, str], List[float]] = OrderedDict()
+        self.allowed: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+        self.evicted = 0
+
+    def acquire(self, policy: RateLimitPolicy, key: str) -> Tuple[bool, float]:
+        """Take one token; return ``(allowed, retry_after_seconds)``."""
+        now = self._clock()
+        bucket_key = (policy.name, key)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = [float(policy.capacity), now]
+            self._buckets[bucket_key] = bucket
+            self._evict(now)
+        else:
+            bucket[0] = min(
+                policy.capacity, bucket[0] + (now - bucket[1]) * policy.refill_rate
+            )
+            bucket[1] = now
+            self._buckets.move_to_end(bucket_key)
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            self.allowed[policy.name] = self.allowed.get(policy.name, 0) + 1
+            return True, 0.0
+        self.rejected[policy.name] = self.rejected.get(policy.name, 0) + 1
+        return False, (1 - bucket[0]) / policy.refill_rate
+
+    def _evict(self, now: float) -> None:
+        """Drop idle buckets and enforce the key cap, oldest first."""
+        buckets = self._buckets
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if len(buckets) <= self.max_keys and now - oldest[1] < self.idle_seconds:
+                break
+            buckets.popitem(last=False)
+            self.evicted += 1
+
+    def reset(self) -> None:
+        """Forget all buckets and counters."""
+        self._buckets.clear()
+        self.allowed.clear()
+        self.rejected.clear()
+        self.evicted = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters per policy plus bucket table size."""
+        names = sorted(set(self.allowed) | set(self.rejected))
+        return {
+            "policies": {
+                name: {
+                    "allowed": self.allowed.get(name, 0),
+                    "rejected": self.rejected.get(name, 0),
+                }
+                for name in names
+            },
+            "tracked_keys": len(self._buckets),
+            "evicted": self.evicted,
+        }
+
+
+def _route_pattern(path: str) -> "re.Pattern[str]":
+    """Compile a route template such as ``/malls/{mall_id}`` to a regex."""
+    parts = re.split(r"(\{[^/]+\})", path)
+    return re.compile(
+        "^"
+        + "".join("[^/]+" if part.startswith("{") else re.escape(part) for part in parts)
+        + "$"
+    )
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying per-route token-bucket policies.
+
+    Requests are keyed by the verified JWT subject when a bearer token is
+    present, otherwise by client IP. Rejections get ``429`` with
+    ``Retry-After``. ``OPTIONS`` requests, i.e. CORS preflights, are never
+    limited.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiter: TokenBucketLimiter,
+        rules: List[Tuple[str, str, RateLimitPolicy]],
+        default: Optional[RateLimitPolicy] = None,
+        trust_forwarded: bool = False,
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.rules = [
+            (method, _route_pattern(path), policy) for method, path, policy in rules
+        ]
+        self.default = default
+        self.trust_forwarded = trust_forwarded
+        policies = [policy for _, _, policy in rules] + ([default] if default else [])
+        if policies:
+            limiter.idle_seconds = max(p.refill_seconds for p in policies)
+
+    def _policy(self, method: str, path: str) -> Optional[RateLimitPolicy]:
+        """First policy whose method and route match the request."""
+        for rule_method, pattern, policy in self.rules:
+            if rule_method == method and pattern.match(path):
+                return policy
+        return self.default
+
+    def _client_key(self, scope) -> str:
+        """JWT subject if the bearer token verifies, else the client IP."""
+        headers = dict(scope["headers"])
+        authorization = headers.get(b"authorization", b"")
+        if authorization[:7].lower() == b"bearer ":
+            try:
+                subject = get_token_codec().decode(authorization[7:].decode("latin-1"))
+                if subject.get("sub"):
+                    return f"user:{subject['sub']}"
+            except TokenError:
+                pass
+        if self.trust_forwarded and b"x-forwarded-for" in headers:
+            forwarded = headers[b"x-forwarded-for"].decode("latin-1")
+            return f"ip:{forwarded.split(',')[0].strip()}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        policy = self._policy(scope["method"], scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+        allowed, retry_after = self.limiter.acquire(policy, self._client_key(scope))
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps(
+            {"detail": "Terlalu banyak permintaan, coba lagi nanti"}
+        ).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(retry_after)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
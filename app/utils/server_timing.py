@@ -0,0 +1,128 @@
+"""Per-request phase timing reported through the ``Server-Timing`` header."""
+
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+
+_current: ContextVar[Optional["ServerTiming"]] = ContextVar(
+    "server_timing", default=None
+)
+
+
+class ServerTiming:
+    """Monotonic-clock spans collected while one request is handled.
+
+    Explicit spans cover token decoding plus user lookup (``auth``) and the
+    service call (``svc``). Handler entry and exit marks derive the rest:
+    ``validate`` is time spent before the handler runs (body parsing, Pydantic
+    validation, dependencies) minus ``auth``; ``serialize`` is time from
+    handler return to the response start (response model validation and
+    JSON rendering).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, Optional[str], float]] = []
+        self.handler_started: Optional[float] = None
+        self.handler_finished: Optional[float] = None
+
+    def add(self, name: str, seconds: float, description: Optional[str] = None) -> None:
+        """Record a span."""
+        self.spans.append((name, description, seconds))
+
+    def _total(self, name: str) -> float:
+        return sum(seconds for span, _, seconds in self.spans if span == name)
+
+    def header_value(self, now: Optional[float] = None) -> str:
+        """Render the ``Server-Timing`` header value."""
+        now = time.perf_counter() if now is None else now
+        entries = list(self.spans)
+        if self.handler_started is not None:
+            validate = self.handler_started - self.started - self._total("auth")
+            entries.append(("validate", None, max(validate, 0.0)))
+        if self.handler_finished is not None:
+            entries.append(("serialize", None, now - self.handler_finished))
+        entries.append(("total", None, now - self.started))
+        parts = []
+        for name, description, seconds in entries:
+            part = name
+            if description:
+                part += f';desc="{description}"'
+            parts.append(f"{part};dur={seconds * 1000:.3f}")
+        return ", ".join(parts)
+
+
+def current_timing() -> Optional[ServerTiming]:
+    """Timing collector of the request being handled, if any."""
+    return _current.get()
+
+
+@contextmanager
+def timing_span(name: str, description: Optional[str] = None) -> Iterator[None]:
+    """Time the enclosed block as a span of the current request."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started, description)
+
+
+def _timed_endpoint(endpoint):
+    """Wrap an async endpoint to mark handler entry and exit."""
+    if not inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        timing = _current.get()
+        if timing is not None:
+            timing.handler_started = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if timing is not None:
+                timing.handler_finished = time.perf_counter()
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """API route whose endpoint marks handler entry and exit for Server-Timing."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a ``Server-Timing`` header to every response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timing = ServerTiming()
+        token = _current.set(timing)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timing.header_value().encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
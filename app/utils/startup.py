@@ -0,0 +1,75 @@
+"""Cold-start timing report."""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """Breakdown of cold-start cost: import, service construction, first request."""
+
+    def __init__(self):
+        """Initialize an empty report."""
+        self.origin: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.first_request: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Record the duration of a startup phase in seconds."""
+        self.phases[phase] = round(seconds * 1000, 3)
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        """Time the enclosed block as a startup phase."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started)
+
+    def record_first_request(self, path: str, started: float, finished: float) -> None:
+        """Record the first request once; later calls are ignored."""
+        with self._lock:
+            if self.first_request is not None:
+                return
+            self.first_request = {
+                "path": path,
+                "latency_ms": round((finished - started) * 1000, 3),
+            }
+            if self.origin is not None:
+                self.first_request["since_import_ms"] = round(
+                    (finished - self.origin) * 1000, 3
+                )
+        logger.info(f"Cold start report: {self.as_dict()}")
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the report as a JSON-serialisable dict."""
+        return {"phases_ms": dict(self.phases), "first_request": self.first_request}
+
+
+startup_report = StartupReport()
+
+
+class FirstRequestTimer:
+    """ASGI middleware timing the first HTTP request handled by the process."""
+
+    def __init__(self, app, report: StartupReport = startup_report):
+        self.app = app
+        self.report = report
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.report.first_request is not None:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.report.record_first_request(
+                scope["path"], started, time.perf_counter()
+            )
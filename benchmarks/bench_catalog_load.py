@@ -0,0 +1,72 @@
+"""Catalog load and reload time for a large generated catalog.
+
+Usage: python benchmarks/bench_catalog_load.py [slots] [slots_per_mall]
+"""
+
+import csv
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.catalog_service import carry_over, load_catalog
+
+
+def write_files(directory: Path, slots: int, per_mall: int):
+    malls_file = directory / "malls.json"
+    slots_file = directory / "slots.csv"
+    mall_count = -(-slots // per_mall)
+    malls = [
+        {
+            "id": f"mall-{m}",
+            "name": f"Mall {m}",
+            "base_price": 5000,
+            "total_slots": per_mall,
+            "available_slots": per_mall,
+        }
+        for m in range(mall_count)
+    ]
+    malls_file.write_text(json.dumps(malls))
+    with open(slots_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "mall_id", "name", "status", "location", "slot_type"])
+        for n in range(slots):
+            mall = n // per_mall
+            writer.writerow(
+                [f"mall-{mall}-{n}", f"mall-{mall}", f"A-{n % per_mall}", "available",
+                 f"Lantai {n % 5 + 1}", "regular"]
+            )
+    return malls_file, slots_file
+
+
+def bench(slots: int = 500_000, per_mall: int = 100) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        malls_file, slots_file = write_files(Path(tmp), slots, per_mall)
+        size_mb = slots_file.stat().st_size / 1e6
+        print(f"{slots:,} slots in {-(-slots // per_mall):,} malls ({size_mb:.1f} MB CSV)")
+
+        started = time.perf_counter()
+        old = load_catalog(malls_file, slots_file)
+        print(f"load:       {(time.perf_counter() - started) * 1000:8.0f} ms")
+
+        tracemalloc.start()
+        new = load_catalog(malls_file, slots_file)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"memory:     {peak / 1e6:8.0f} MB peak while loading")
+
+        started = time.perf_counter()
+        carry_over(old, new)
+        print(f"carry-over: {(time.perf_counter() - started) * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    bench(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+    )
@@ -0,0 +1,61 @@
+"""Nearest-mall query latency over a large generated catalog.
+
+Usage: python benchmarks/bench_geo_nearest.py [malls] [queries] [k]
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.geo_service import GeoIndex
+
+
+def has_free(mall: dict) -> bool:
+    return mall["available_slots"] > 0
+
+
+def bench(mall_count: int = 10_000, queries: int = 2_000, k: int = 5) -> None:
+    rng = random.Random(42)
+    # Spread over Java, roughly where the malls would be
+    malls = [
+        {
+            "id": f"mall-{n}",
+            "latitude": rng.uniform(-8.5, -6.0),
+            "longitude": rng.uniform(105.5, 114.5),
+            "available_slots": rng.choice([0, 0, 3, 12]),
+        }
+        for n in range(mall_count)
+    ]
+
+    started = time.perf_counter()
+    index = GeoIndex(malls)
+    print(f"{mall_count:,} malls, build: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    points = [(rng.uniform(-8.5, -6.0), rng.uniform(105.5, 114.5)) for _ in range(queries)]
+    started = time.perf_counter()
+    for lat, lon in points:
+        index.nearest(lat, lon, k, has_free)
+    elapsed = time.perf_counter() - started
+    print(f"grid:  {elapsed / queries * 1e6:8.1f} us/query (k={k})")
+
+    started = time.perf_counter()
+    for lat, lon in points[:200]:
+        sorted(
+            (abs(m["latitude"] - lat) + abs(m["longitude"] - lon), m["id"])
+            for m in malls
+            if has_free(m)
+        )[:k]
+    elapsed = time.perf_counter() - started
+    print(f"scan:  {elapsed / 200 * 1e6:8.1f} us/query (full scan, for comparison)")
+
+
+if __name__ == "__main__":
+    bench(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2_000,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 5,
+    )
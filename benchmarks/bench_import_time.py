@@ -0,0 +1,38 @@
+"""App import time and time-to-first-request against the recorded budget.
+
+Wall-clock timings depend on the machine, so they are checked here rather
+than in the unit suite. Exits non-zero when either exceeds the budget in
+tests/unit/import_time_baseline.json (``cumulative_ms`` x ``tolerance``).
+
+Usage: python benchmarks/bench_import_time.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.importtime import measure_first_request, measure_imports
+
+BASELINE = json.loads(
+    (Path(__file__).parent.parent / "tests" / "unit" / "import_time_baseline.json").read_text()
+)
+
+
+def bench() -> int:
+    budget_ms = BASELINE["cumulative_ms"] * BASELINE["tolerance"]
+    import_ms = measure_imports(BASELINE["module"])["cumulative_us"] / 1000
+    first_ms = measure_first_request("/health")["time_to_first_request_ms"]
+    print(f"{'phase':<26}{'ms':>10}{'budget ms':>12}")
+    failed = 0
+    for name, value in (("import app.main", import_ms), ("time to first request", first_ms)):
+        over = value >= budget_ms
+        failed += over
+        print(f"{name:<26}{value:>10.1f}{budget_ms:>12.1f}{'  OVER' if over else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(bench())
@@ -1,21 +1,44 @@
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.services import occupancy_service
 from app.services.auth_service import AuthService
 from app.services.parking_service import ParkingService
 from app.utils.auth import create_access_token
 import app.main as main_module
 
 
+# Fixed "now" inside the sample 09:00-12:00 window, so bookings occupy their slot
+FROZEN_NOW = datetime(2026, 1, 5, 9, 30)
+
+
 @pytest.fixture(autouse=True)
-def setup_services():
-    # Initialize services before each test
+def frozen_clock(monkeypatch):
+    # Pin the occupied-now view's wall clock
+    monkeypatch.setattr(occupancy_service, "_wall_clock", lambda: FROZEN_NOW)
+    return FROZEN_NOW
+
+
+@pytest.fixture(autouse=True)
+def setup_services(frozen_clock, tmp_path, monkeypatch):
+    # Initialize services before each test, auditing into a temporary directory
+    monkeypatch.setattr(main_module, "AUDIT_DIR", tmp_path / "audit")
     main_module.auth_service = AuthService()
     main_module.parking_service = ParkingService()
+    main_module.rate_limiter.reset()
     yield
+    if main_module.audit_log is not None:
+        main_module.audit_log.stop()
     main_module.auth_service = None
     main_module.parking_service = None
+    main_module.audit_log = None
+    main_module.outbox = None
 
 
 @pytest.fixture
@@ -73,3 +96,46 @@ def sample_reservation_data():
         "phone": "08123456789",
         "time_slot": {"start_time": "09:00", "end_time": "12:00"},
     }
+
+
+class StubReceiver:
+    """Local HTTP server recording POSTed batches and answering with queued statuses."""
+
+    def __init__(self):
+        self.batches = []
+        self.statuses = []
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                receiver.batches.append((self.path, json.loads(body)))
+                status = receiver.statuses.pop(0) if receiver.statuses else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def messages(self, path):
+        return [m for p, batch in self.batches if p == path for m in batch["messages"]]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_receiver():
+    # Local HTTP receiver for outbox deliveries
+    stub = StubReceiver()
+    yield stub
+    stub.close()
@@ -1,5 +1,11 @@
+import json
+
+import anyio.to_thread
 import pytest
 
+import app.main as main_module
+from app.services.shard_service import ShardedParkingService
+
 
 class TestHealthEndpoint:
 
@@ -57,6 +63,35 @@ class TestLoginEndpoint:
         response = client.post("/login", json={})
         assert response.status_code == 422
 
+    # Test refresh tokens renew the session and rotate on every use
+    def test_refresh_token(self, client, monkeypatch):
+        login = client.post("/login", json={"username": "admin", "password": "12345"}).json()
+        monkeypatch.setattr(main_module.auth_service, "authenticate_user", None)
+        response = client.post("/token/refresh", json={"refresh_token": login["refresh_token"]})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["user"]["role"] == "admin"
+        assert data["refresh_token"] != login["refresh_token"]
+        headers = {"Authorization": f"Bearer {data['access_token']}"}
+        assert client.get("/admin/stats", headers=headers).status_code == 200
+
+    # Test replaying a rotated refresh token ends the session
+    def test_refresh_token_reuse(self, client):
+        login = client.post("/login", json={"username": "user", "password": "12345"}).json()
+        rotated = client.post("/token/refresh", json={"refresh_token": login["refresh_token"]}).json()
+        replay = client.post("/token/refresh", json={"refresh_token": login["refresh_token"]})
+        assert replay.status_code == 401
+        response = client.post("/token/refresh", json={"refresh_token": rotated["refresh_token"]})
+        assert response.status_code == 401
+
+    # Test logout revokes the refresh token
+    def test_logout(self, client):
+        login = client.post("/login", json={"username": "user", "password": "12345"}).json()
+        body = {"refresh_token": login["refresh_token"]}
+        assert client.post("/logout", json=body).status_code == 200
+        assert client.post("/logout", json=body).status_code == 200
+        assert client.post("/token/refresh", json=body).status_code == 401
+
 
 class TestMallEndpoints:
 
@@ -74,11 +109,58 @@ class TestMallEndpoints:
         data = response.json()
         assert data["id"] == "pvj"
 
+    # Test cached mall bodies follow reservations
+    def test_mall_cache_invalidated(self, client, auth_headers, sample_reservation_data):
+        mall = client.get("/malls/pvj").json()
+        assert client.get("/malls").json()[0] == {**mall, "pricing": None}
+        assert client.get("/malls/pvj/slots").json()[0]["status"] == "available"
+        client.post("/reservations", json=sample_reservation_data, headers=auth_headers)
+        assert client.get("/malls").json()[0]["available_slots"] == mall["available_slots"] - 1
+        assert client.get("/malls/pvj").json()["available_slots"] == mall["available_slots"] - 1
+        slot_id = sample_reservation_data["slot_id"]
+        slots = {s["id"]: s for s in client.get("/malls/pvj/slots").json()}
+        assert slots[slot_id]["status"] == "occupied"
+        assert client.get(f"/malls/pvj/slots/{slot_id}").json()["status"] == "occupied"
+
+    # Test cached catalog bodies are served pre-compressed when negotiated
+    def test_malls_compressed(self, client):
+        plain = client.get("/malls", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert plain.headers["vary"] == "Accept-Encoding"
+        response = client.get("/malls/pvj/slots", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()[0]["id"] == "pvj-1"
+        response = client.get("/malls", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json() == plain.json()
+        small = client.get("/malls/pvj", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
+
     # Test get mall not found
     def test_get_mall_not_found(self, client):
         response = client.get("/malls/nonexistent")
         assert response.status_code == 404
 
+    # Test nearest malls are sorted by distance
+    def test_get_nearest_malls(self, client):
+        response = client.get(
+            "/malls/nearest",
+            params={"lat": -6.9147, "lon": 107.5945, "k": 2,
+                    "start_time": "18:00", "end_time": "20:00"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [m["id"] for m in data] == ["paskal", "pvj"]
+        assert data[0]["distance_km"] == 0
+
+    # Test nearest malls rejects a half-given window
+    def test_get_nearest_malls_invalid(self, client):
+        response = client.get(
+            "/malls/nearest", params={"lat": -6.9, "lon": 107.6, "start_time": "18:00"}
+        )
+        assert response.status_code == 400
+        assert client.get("/malls/nearest", params={"lat": 91, "lon": 0}).status_code == 422
+
     # Test get slots for mall
     def test_get_slots_for_mall(self, client):
         response = client.get("/malls/pvj/slots")
@@ -112,6 +194,7 @@ class TestSlotAvailability:
         data = response.json()
         assert "available" in data
         assert "conflicts" in data
+        assert 'svc;desc="check_availability"' in response.headers["server-timing"]
 
     # Test check availability invalid time
     def test_check_availability_invalid_time(self, client):
@@ -168,6 +251,18 @@ class TestReservationEndpoints:
         assert data["mall_id"] == "pvj"
         assert data["status"] == "confirmed"
 
+    # Test Server-Timing splits the request into phases
+    def test_create_reservation_server_timing(
+        self, client, auth_headers, sample_reservation_data
+    ):
+        response = client.post(
+            "/reservations", json=sample_reservation_data, headers=auth_headers
+        )
+        timing = response.headers["server-timing"]
+        assert 'svc;desc="create_reservation"' in timing
+        for phase in ("auth;", "validate;", "serialize;", "total;"):
+            assert phase in timing
+
     # Test get reservations unauthorized
     def test_get_reservations_unauthorized(self, client):
         response = client.get("/reservations")
@@ -179,6 +274,27 @@ class TestReservationEndpoints:
         assert response.status_code == 200
         assert isinstance(response.json(), list)
 
+    # Test clients sync reservation changes from a sequence number
+    def test_reservation_changes(self, client, auth_headers, sample_reservation_data):
+        assert client.get("/reservations/changes").status_code == 401
+        created = client.post(
+            "/reservations", json=sample_reservation_data, headers=auth_headers
+        ).json()
+        client.put(f"/reservations/{created['id']}/cancel", headers=auth_headers)
+        data = client.get("/reservations/changes?since=0", headers=auth_headers).json()
+        assert [(c["seq"], c["event"]) for c in data["changes"]] == [
+            (1, "created"),
+            (2, "cancelled"),
+        ]
+        assert data["changes"][0]["reservation"]["id"] == created["id"]
+        assert data["next"] == 2 and not data["resync_required"]
+        delta = client.get("/reservations/changes?since=1", headers=auth_headers).json()
+        assert [c["seq"] for c in delta["changes"]] == [2]
+        ahead = client.get("/reservations/changes?since=7", headers=auth_headers).json()
+        assert ahead["resync_required"] and ahead["last_seq"] == 2
+        response = client.get("/reservations/changes?since=-1", headers=auth_headers)
+        assert response.status_code == 422
+
 
 class TestAdminEndpoints:
 
@@ -205,6 +321,292 @@ class TestAdminEndpoints:
         assert isinstance(data["total_reservations"], int)
         assert isinstance(data["total_revenue"], (int, float))
 
+    # Test bookings are audited with the caller's role and counters are exposed
+    def test_audit_log(self, client, auth_headers, admin_headers, sample_reservation_data):
+        main_module.parking_service = None
+        client.post("/reservations", json=sample_reservation_data, headers=auth_headers)
+        assert client.get("/admin/audit", headers=auth_headers).status_code == 403
+        stats = client.get("/admin/audit", headers=admin_headers).json()
+        assert stats["enqueued"] == 1 and stats["dropped"] == 0
+        main_module.audit_log.stop()
+        lines = (main_module.AUDIT_DIR / "audit.ndjson").read_text().splitlines()
+        entry = json.loads(lines[0])
+        assert (entry["event"], entry["actor"], entry["role"]) == ("created", "user", "user")
+
+    # Test bookings notify the mall webhook and SMS gateway through the outbox
+    def test_outbox(
+        self, client, auth_headers, admin_headers, sample_reservation_data,
+        stub_receiver, tmp_path, monkeypatch,
+    ):
+        webhooks = tmp_path / "webhooks.json"
+        webhooks.write_text(json.dumps({"pvj": stub_receiver.url("/pvj")}))
+        monkeypatch.setattr(main_module, "WEBHOOKS_FILE", webhooks)
+        monkeypatch.setattr(main_module, "SMS_GATEWAY_URL", stub_receiver.url("/sms"))
+        monkeypatch.setattr(main_module, "CATALOG_POLL_SECONDS", 0)
+        main_module.parking_service = None
+        with client:
+            client.post("/reservations", json=sample_reservation_data, headers=auth_headers)
+            assert client.get("/admin/outbox", headers=auth_headers).status_code == 403
+            assert client.get("/admin/outbox", headers=admin_headers).json()["recorded"] == 2
+        [webhook] = stub_receiver.messages("/pvj")
+        assert webhook["event"] == "created" and webhook["reservation"]["slot_id"] == "pvj-1"
+        [sms] = stub_receiver.messages("/sms")
+        assert sms["to"] == sample_reservation_data["phone"]
+        stats = client.get("/admin/outbox", headers=admin_headers).json()
+        assert stats["delivered"] == 2 and stats["dead_letter_messages"] == []
+        response = client.post("/admin/outbox/retry", headers=admin_headers)
+        assert response.json() == {"requeued": 0}
+
+    # Test occupancy analytics forbidden for regular user
+    def test_occupancy_analytics_forbidden(self, client, auth_headers):
+        response = client.get("/admin/analytics/occupancy", headers=auth_headers)
+        assert response.status_code == 403
+
+    # Test occupancy analytics success
+    def test_occupancy_analytics_success(
+        self, client, admin_headers, sample_reservation_data
+    ):
+        client.post("/reservations", json=sample_reservation_data, headers=admin_headers)
+        response = client.get(
+            "/admin/analytics/occupancy?mall_id=pvj", headers=admin_headers
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["malls"]["pvj"]["occupied_slots"]) == 7
+        assert len(data["malls"]["pvj"]["occupied_slots"][0]) == 24
+
+    # Test revenue rollup success
+    def test_revenue_rollup_success(
+        self, client, admin_headers, sample_reservation_data
+    ):
+        client.post("/reservations", json=sample_reservation_data, headers=admin_headers)
+        response = client.get("/admin/revenue?mall_id=pvj", headers=admin_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["granularity"] == "hour"
+        assert data["malls"]["pvj"]["total"] == 15000
+
+    # Test revenue rollup validation
+    def test_revenue_rollup_invalid(self, client, admin_headers):
+        response = client.get(
+            "/admin/revenue?granularity=week", headers=admin_headers
+        )
+        assert response.status_code == 400
+        response = client.get(
+            "/admin/revenue?mall_id=nonexistent&start=2025-01-01T00:00:00%2B07:00",
+            headers=admin_headers,
+        )
+        assert response.status_code == 404
+
+    # Test admin request profiled on demand
+    def test_request_profiling(self, client, admin_headers, sample_reservation_data):
+        run_sync = anyio.to_thread.run_sync
+        response = client.post(
+            "/reservations?profile=1",
+            json=sample_reservation_data,
+            headers=admin_headers,
+        )
+        assert response.status_code == 201
+        # The threadpool hook is only in place while a profiled request runs
+        assert anyio.to_thread.run_sync is run_sync
+        profile_id = response.headers["x-profile-id"]
+        listing = client.get("/admin/profiles", headers=admin_headers).json()
+        assert listing[0]["id"] == profile_id
+        assert listing[0]["path"] == "/reservations"
+        report = client.get(f"/admin/profiles/{profile_id}", headers=admin_headers)
+        assert report.status_code == 200
+        assert report.headers["content-type"].startswith("text/plain")
+        # Dependency resolution, auth, validation and the service call
+        for frame in (
+            "solve_dependencies (",
+            "get_current_user_dependency (main.py:",
+            "get_current_user (auth.py:",
+            "validate_python (built-in)",
+            "create_reservation_async (parking_service.py:",
+        ):
+            assert frame in report.text
+
+    # Test profiling ignored for non-admin users
+    def test_request_profiling_requires_admin(self, client, auth_headers):
+        response = client.get(
+            "/reservations", headers={**auth_headers, "X-Profile": "1"}
+        )
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
+        response = client.get("/malls", headers={"X-Profile": "1"})
+        assert "x-profile-id" not in response.headers
+        bad = {"Authorization": "Bearer invalid", "X-Profile": "1"}
+        assert "x-profile-id" not in client.get("/malls", headers=bad).headers
+
+    # Test unknown profile
+    def test_profile_not_found(self, client, admin_headers):
+        response = client.get("/admin/profiles/missing", headers=admin_headers)
+        assert response.status_code == 404
+
+    # Test occupancy analytics unknown mall
+    def test_occupancy_analytics_unknown_mall(self, client, admin_headers):
+        response = client.get(
+            "/admin/analytics/occupancy?mall_id=nonexistent", headers=admin_headers
+        )
+        assert response.status_code == 404
+
+
+class TestReservationExport:
+
+    # Test NDJSON export with filters
+    def test_export_ndjson(self, client, auth_headers, admin_headers, sample_reservation_data):
+        client.post("/reservations", json=sample_reservation_data, headers=auth_headers)
+        response = client.get(
+            "/admin/reservations/export",
+            params={"mall_id": "pvj", "status": "confirmed"},
+            headers=admin_headers,
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = response.text.splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["mall_id"] == "pvj"
+
+    # Test gzipped CSV export
+    def test_export_csv_gzip(self, client, auth_headers, admin_headers, sample_reservation_data):
+        client.post("/reservations", json=sample_reservation_data, headers=auth_headers)
+        response = client.get(
+            "/admin/reservations/export",
+            params={"format": "csv", "gzip": "true"},
+            headers=admin_headers,
+        )
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        # The client decodes Content-Encoding transparently
+        assert response.text.splitlines()[0].startswith("id,mall_id")
+        assert len(response.text.splitlines()) == 2
+
+    # Test export rejects unknown formats and non-admins
+    def test_export_invalid(self, client, auth_headers, admin_headers):
+        response = client.get(
+            "/admin/reservations/export", params={"format": "xml"}, headers=admin_headers
+        )
+        assert response.status_code == 400
+        response = client.get("/admin/reservations/export", headers=auth_headers)
+        assert response.status_code == 403
+
+
+class TestReservationSearch:
+
+    # Test search by plate prefix and status
+    def test_search(self, client, auth_headers, admin_headers, sample_reservation_data):
+        created = client.post(
+            "/reservations", json=sample_reservation_data, headers=auth_headers
+        ).json()
+        response = client.get(
+            "/reservations/search",
+            params={"vehicle_prefix": "b 12", "status": "confirmed"},
+            headers=admin_headers,
+        )
+        assert response.status_code == 200
+        assert [r["id"] for r in response.json()] == [created["id"]]
+
+    # Test search is admin only
+    def test_search_forbidden(self, client, auth_headers):
+        response = client.get(
+            "/reservations/search", params={"phone": "0812"}, headers=auth_headers
+        )
+        assert response.status_code == 403
+
+    # Test search without filters
+    def test_search_without_filters(self, client, admin_headers):
+        response = client.get("/reservations/search", headers=admin_headers)
+        assert response.status_code == 400
+
+
+class TestWaitlistEndpoints:
+
+    # Test waitlist entry is booked when the blocking reservation is cancelled
+    def test_waitlist_flow(self, client, auth_headers, admin_headers, sample_reservation_data):
+        created = client.post(
+            "/reservations", json=sample_reservation_data, headers=auth_headers
+        ).json()
+        response = client.post(
+            "/waitlist", json=sample_reservation_data, headers=admin_headers
+        )
+        assert response.status_code == 201
+        entry = response.json()
+        assert entry["status"] == "waiting"
+
+        client.put(f"/reservations/{created['id']}/cancel", headers=auth_headers)
+        entries = client.get("/waitlist", headers=admin_headers).json()
+        assert entries[0]["status"] == "fulfilled"
+        assert entries[0]["reservation_id"]
+
+    # Test withdrawing a waitlist entry
+    def test_delete_waitlist_entry(self, client, auth_headers, sample_reservation_data):
+        sample_reservation_data["slot_id"] = "pvj-3"
+        entry = client.post(
+            "/waitlist", json=sample_reservation_data, headers=auth_headers
+        ).json()
+        response = client.delete(f"/waitlist/{entry['id']}", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["status"] == "cancelled"
+        response = client.delete(f"/waitlist/{entry['id']}", headers=auth_headers)
+        assert response.status_code == 400
+        response = client.delete("/waitlist/missing", headers=auth_headers)
+        assert response.status_code == 404
+
+    # Test waitlist rejects unknown malls
+    def test_waitlist_unknown_mall(self, client, auth_headers, sample_reservation_data):
+        sample_reservation_data["mall_id"] = "nonexistent"
+        response = client.post(
+            "/waitlist", json=sample_reservation_data, headers=auth_headers
+        )
+        assert response.status_code == 400
+
+
+class TestPriceQuotes:
+
+    # Test batch quotes for every mall and window
+    def test_batch_quotes(self, client):
+        response = client.post(
+            "/pricing/quotes",
+            json={
+                "windows": [
+                    {"start_time": "09:00", "end_time": "12:00"},
+                    {"start_time": "23:00", "end_time": "00:30"},
+                ]
+            },
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["quotes"]["pvj"] == [15000, 10000]
+        assert [w["duration"] for w in data["windows"]] == [3, 2]
+
+    # Test quotes for an unknown mall
+    def test_quotes_unknown_mall(self, client):
+        response = client.post(
+            "/pricing/quotes",
+            json={
+                "mall_ids": ["nonexistent"],
+                "windows": [{"start_time": "09:00", "end_time": "10:00"}],
+            },
+        )
+        assert response.status_code == 404
+
+    # Test requests asking for too many prices are rejected
+    def test_quotes_too_many(self, client):
+        response = client.post(
+            "/pricing/quotes",
+            json={
+                "mall_ids": ["pvj"] * 11,
+                "windows": [{"start_time": "09:00", "end_time": "10:00"}] * 500,
+            },
+        )
+        assert response.status_code == 400
+        assert "5000" in response.json()["detail"]
+
+    # Test quotes require at least one window
+    def test_quotes_empty_windows(self, client):
+        response = client.post("/pricing/quotes", json={"windows": []})
+        assert response.status_code == 422
+
 
 class TestReservationDetails:
 
@@ -223,6 +625,54 @@ class TestReservationDetails:
         data = response.json()
         assert data["id"] == reservation_id
 
+    # Test If-Match guards modify and cancel
+    def test_if_match(self, client, auth_headers, sample_reservation_data):
+        reservation_id = client.post(
+            "/reservations", json=sample_reservation_data, headers=auth_headers
+        ).json()["id"]
+        response = client.get(f"/reservations/{reservation_id}", headers=auth_headers)
+        etag = response.headers["etag"]
+        assert etag == '"1"'
+
+        response = client.patch(
+            f"/reservations/{reservation_id}",
+            json={"vehicle_number": "D 5678 CD"},
+            headers={**auth_headers, "If-Match": etag},
+        )
+        assert response.status_code == 200
+        assert response.json()["vehicle_number"] == "D 5678 CD"
+        assert response.headers["etag"] == '"2"'
+
+        response = client.put(
+            f"/reservations/{reservation_id}/cancel",
+            headers={**auth_headers, "If-Match": etag},
+        )
+        assert response.status_code == 412
+        response = client.patch(
+            f"/reservations/{reservation_id}",
+            json={"phone": "08987654321"},
+            headers={**auth_headers, "If-Match": etag},
+        )
+        assert response.status_code == 412
+        response = client.put(
+            f"/reservations/{reservation_id}/cancel",
+            headers={**auth_headers, "If-Match": "garbage"},
+        )
+        assert response.status_code == 400
+        response = client.put(
+            f"/reservations/{reservation_id}/cancel",
+            headers={**auth_headers, "If-Match": '"2"'},
+        )
+        assert response.status_code == 200
+
+    # Test modify needs at least one field
+    def test_modify_empty(self, client, auth_headers, sample_reservation_data):
+        reservation_id = client.post(
+            "/reservations", json=sample_reservation_data, headers=auth_headers
+        ).json()["id"]
+        response = client.patch(f"/reservations/{reservation_id}", json={}, headers=auth_headers)
+        assert response.status_code == 400
+
     # Test get reservation nonexistent
     def test_get_reservation_nonexistent(self, client, auth_headers):
         response = client.get("/reservations/nonexistent-id", headers=auth_headers)
@@ -232,3 +682,32 @@ class TestReservationDetails:
     def test_get_reservation_unauthorized(self, client):
         response = client.get("/reservations/some-id")
         assert response.status_code == 401
+
+
+class TestShardedService:
+
+    @pytest.fixture(autouse=True)
+    def sharded(self):
+        main_module.parking_service = ShardedParkingService(2)
+
+    # Test the API works unchanged on top of the sharded service
+    def test_reservation_flow(self, client, auth_headers, admin_headers, sample_reservation_data):
+        response = client.post("/reservations", json=sample_reservation_data, headers=auth_headers)
+        assert response.status_code == 201
+        reservation_id = response.json()["id"]
+        assert client.get(f"/reservations/{reservation_id}", headers=auth_headers).status_code == 200
+        stats = client.get("/admin/stats", headers=admin_headers).json()
+        assert stats["total_reservations"] == 1
+        assert stats["total_malls"] == 3
+        assert [m["id"] for m in client.get("/malls").json()] == ["pvj", "paskal", "sumaba"]
+        response = client.put(f"/reservations/{reservation_id}/cancel", headers=auth_headers)
+        assert response.status_code == 200
+        response = client.put(f"/reservations/{reservation_id}/cancel", headers=auth_headers)
+        assert response.status_code == 400
+
+    # Test the shard count setting selects the sharded service
+    def test_init_services(self, monkeypatch):
+        monkeypatch.setattr(main_module, "PARKING_SHARDS", 3)
+        main_module.parking_service = None
+        main_module.init_services()
+        assert len(main_module.parking_service.shards) == 3
@@ -90,6 +90,13 @@ class TestInputValidation:
 
 class TestRateLimiting:
 
+    @pytest.fixture(autouse=True)
+    def frozen_clock(self, monkeypatch):
+        # Slow bcrypt logins must not refill buckets mid-test
+        import app.main as main_module
+
+        monkeypatch.setattr(main_module.rate_limiter, "_clock", lambda: 1000.0)
+
     # Test multiple failed login attempts
     def test_multiple_failed_login_attempts(self, client):
         for _ in range(5):
@@ -98,6 +105,60 @@ class TestRateLimiting:
             )
             assert response.status_code == 401
 
+    # Test login is throttled per client IP
+    def test_login_rate_limited(self, client):
+        statuses = [
+            client.post("/login", json={"username": "user", "password": "wrong"}).status_code
+            for _ in range(11)
+        ]
+        assert statuses[:10] == [401] * 10
+        assert statuses[10] == 429
+
+    # Test rejection carries Retry-After
+    def test_rate_limit_retry_after(self, client):
+        for _ in range(10):
+            client.post("/login", json={"username": "user", "password": "wrong"})
+        response = client.post("/login", json={"username": "user", "password": "wrong"})
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+
+    # Test 429s carry CORS headers and preflights are never limited
+    def test_rate_limit_cors(self, client):
+        origin = {"Origin": "https://app.example"}
+        for _ in range(10):
+            client.post("/login", json={"username": "user", "password": "wrong"})
+        response = client.post(
+            "/login", json={"username": "user", "password": "wrong"}, headers=origin
+        )
+        assert response.status_code == 429
+        assert "access-control-allow-origin" in response.headers
+        preflight = client.options(
+            "/login", headers={**origin, "Access-Control-Request-Method": "POST"}
+        )
+        assert preflight.status_code == 200
+
+    # Test authenticated requests are keyed by token subject
+    def test_rate_limit_keyed_by_subject(self, client, auth_headers, admin_headers):
+        body = {"start_time": "09:00", "end_time": "10:00"}
+        url = "/malls/pvj/slots/pvj-1/check-availability"
+        for _ in range(30):
+            assert client.post(url, json=body, headers=auth_headers).status_code == 200
+        assert client.post(url, json=body, headers=auth_headers).status_code == 429
+        assert client.post(url, json=body, headers=admin_headers).status_code == 200
+        assert client.post(url, json=body).status_code == 200
+        assert client.post(
+            url, json=body, headers={"Authorization": "Bearer bad"}
+        ).status_code == 200
+
+    # Test counters exposed to admins
+    def test_rate_limit_stats(self, client, admin_headers):
+        client.post("/login", json={"username": "user", "password": "wrong"})
+        response = client.get("/admin/rate-limits", headers=admin_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["policies"]["login"]["allowed"] == 1
+        assert data["tracked_keys"] >= 1
+
 
 class TestDataExposure:
 
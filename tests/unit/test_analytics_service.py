@@ -0,0 +1,137 @@
+import pytest
+
+from app.services.analytics_service import (
+    MINUTES_PER_WEEK,
+    OccupancyAnalytics,
+    ReservationColumns,
+)
+
+
+def make_reservation(rid, start, end, created_at="2025-01-06T08:00:00", **extra):
+    # 2025-01-06 is a Monday
+    reservation = {
+        "id": rid,
+        "mall_id": "pvj",
+        "slot_id": "pvj-1",
+        "start_time": start,
+        "end_time": end,
+        "status": "confirmed",
+        "created_at": created_at,
+    }
+    reservation.update(extra)
+    return reservation
+
+
+class TestReservationColumns:
+
+    # Test columns grow beyond initial capacity
+    def test_append_grows_capacity(self):
+        columns = ReservationColumns(capacity=1)
+        for i in range(5):
+            columns.append(f"r{i}", i, i + 1, 0, 0, 0)
+        assert columns.size == 5
+        assert columns.row_by_id["r4"] == 4
+        assert list(columns.start[:5]) == [0, 1, 2, 3, 4]
+
+
+class TestOccupancyAnalytics:
+
+    # Test heatmap averages occupied slots per hour
+    def test_heatmap_hourly_average(self):
+        analytics = OccupancyAnalytics(["pvj"])
+        analytics.record(make_reservation("r1", "09:00", "10:30"))
+        heatmap = analytics.heatmap("pvj", {"pvj": 2})
+        monday = heatmap["malls"]["pvj"]["occupied_slots"][0]
+        assert monday[9] == 1.0
+        assert monday[10] == 0.5
+        assert monday[11] == 0.0
+        assert heatmap["malls"]["pvj"]["occupancy_rate"][0][9] == 0.5
+
+    # Test cancellation removes occupancy incrementally
+    def test_cancel_updates_heatmap(self):
+        analytics = OccupancyAnalytics(["pvj"])
+        analytics.record(make_reservation("r1", "09:00", "10:00"))
+        assert analytics.heatmap("pvj")["malls"]["pvj"]["occupied_slots"][0][9] == 1.0
+        analytics.update_status("r1", "cancelled")
+        assert analytics.heatmap("pvj")["malls"]["pvj"]["occupied_slots"][0][9] == 0.0
+        analytics.update_status("r1", "cancelled")
+        analytics.update_status("r1", "active")
+        assert analytics.heatmap("pvj")["malls"]["pvj"]["occupied_slots"][0][9] == 1.0
+
+    # Test unknown reservation status update is ignored
+    def test_update_status_unknown_id(self):
+        analytics = OccupancyAnalytics(["pvj"])
+        analytics.update_status("missing", "cancelled")
+        assert analytics.columns.size == 0
+
+    # Test interval past midnight on Sunday wraps to Monday
+    def test_week_wraparound(self):
+        analytics = OccupancyAnalytics(["pvj"])
+        analytics.record(
+            make_reservation("r1", "23:00", "01:00", created_at="2025-01-12T20:00:00")
+        )
+        occupied = analytics.heatmap("pvj")["malls"]["pvj"]["occupied_slots"]
+        assert occupied[6][23] == 1.0
+        assert occupied[0][0] == 1.0
+        assert occupied[0][1] == 0.0
+
+    # Test the average over two weeks divides by the number of each weekday
+    def test_average_over_weeks(self):
+        analytics = OccupancyAnalytics(["pvj"])
+        analytics.record(make_reservation("r1", "09:00", "10:00"))
+        analytics.record(
+            make_reservation(
+                "r2", "09:00", "10:00", created_at="2025-01-13T08:00:00", slot_id="pvj-2"
+            )
+        )
+        heatmap = analytics.heatmap("pvj", {"pvj": 1})
+        assert heatmap["malls"]["pvj"]["occupied_slots"][0][9] == 1.0
+        assert heatmap["malls"]["pvj"]["occupancy_rate"][0][9] == 1.0
+        # A booking on Tuesday 21st widens the range to three Mondays and Tuesdays
+        analytics.record(
+            make_reservation("r3", "09:00", "10:00", created_at="2025-01-21T08:00:00")
+        )
+        occupied = analytics.heatmap("pvj")["malls"]["pvj"]["occupied_slots"]
+        assert occupied[0][9] == pytest.approx(2 / 3, abs=0.001)
+        assert occupied[1][9] == pytest.approx(1 / 3, abs=0.001)
+
+    # Test a reservation at an unknown mall adds a row for that mall
+    def test_new_mall_grows_diff(self):
+        analytics = OccupancyAnalytics(["pvj"])
+        analytics.record(make_reservation("r1", "08:00", "12:00"))
+        analytics.record(make_reservation("r2", "10:00", "11:00", mall_id="sumaba"))
+        assert analytics._diff.shape == (2, MINUTES_PER_WEEK + 1)
+        assert analytics.heatmap("sumaba")["malls"]["sumaba"]["occupied_slots"][0][10] == 1.0
+        analytics.record(make_reservation("r3", "10:00", "11:00", mall_id="paskal"))
+        assert analytics._diff.shape == (4, MINUTES_PER_WEEK + 1)
+        assert analytics.heatmap("pvj")["malls"]["pvj"]["occupied_slots"][0][8] == 1.0
+
+    # Test the malls given up front share one allocation
+    def test_preallocated_malls(self):
+        analytics = OccupancyAnalytics([f"m{i}" for i in range(50)] + ["m0"])
+        assert analytics._diff.shape == (50, MINUTES_PER_WEEK + 1)
+        assert analytics.mall_codes["m49"] == 49
+
+    # Test unknown mall returns None
+    def test_heatmap_unknown_mall(self):
+        analytics = OccupancyAnalytics(["pvj"])
+        assert analytics.heatmap("nonexistent") is None
+
+    # Test heatmap for all malls
+    def test_heatmap_all_malls(self):
+        analytics = OccupancyAnalytics(["pvj", "paskal"])
+        heatmap = analytics.heatmap()
+        assert set(heatmap["malls"]) == {"pvj", "paskal"}
+        assert len(heatmap["weekdays"]) == 7
+        assert heatmap["hours"] == list(range(24))
+
+    # Test parking service feeds analytics on create and cancel
+    def test_parking_service_listener(self, parking_service, sample_reservation_data):
+        reservation = parking_service.create_reservation(
+            sample_reservation_data, "user"
+        )
+        heatmap = parking_service.get_occupancy_heatmap("pvj")
+        assert sum(sum(day) for day in heatmap["malls"]["pvj"]["occupied_slots"]) == 3
+        parking_service.cancel_reservation(reservation["id"], "user", "user")
+        heatmap = parking_service.get_occupancy_heatmap("pvj")
+        assert sum(sum(day) for day in heatmap["malls"]["pvj"]["occupied_slots"]) == 0
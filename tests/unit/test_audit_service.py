@@ -0,0 +1,93 @@
+import json
+
+from app.services.audit_service import AuditLog, audit_entry
+from app.services.parking_service import ParkingService
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def _entry(n=0):
+    return {"event": "created", "reservation_id": f"r{n}"}
+
+
+class TestAuditLog:
+
+    # Test entries carry the event, actor and reservation identity
+    def test_audit_entry(self):
+        reservation = {
+            "id": "r1",
+            "mall_id": "pvj",
+            "slot_id": "pvj-1",
+            "status": "confirmed",
+            "version": 1,
+            "created_by": "user",
+        }
+        entry = audit_entry("created", reservation, {"username": "user", "role": "user"})
+        assert entry["reservation_id"] == "r1"
+        assert entry["actor"] == "user" and entry["role"] == "user"
+        assert entry["status"] == "confirmed" and entry["created_by"] == "user"
+        assert entry["ts"].endswith("+00:00")
+
+    # Test the writer thread drains the queue in batches and stop flushes the rest
+    def test_writer_batches(self, tmp_path):
+        audit = AuditLog(tmp_path, batch_size=10, flush_interval=0.01)
+        for n in range(25):
+            audit.record(_entry(n))
+        audit.start()
+        audit.start()
+        audit.stop()
+        assert [e["reservation_id"] for e in _lines(audit.path)] == [
+            f"r{n}" for n in range(25)
+        ]
+        stats = audit.stats()
+        assert stats["written"] == 25 and stats["enqueued"] == 25
+        assert stats["batches"] == 3
+        assert stats["queued"] == 0 and not stats["writer_running"]
+
+    # Test a full queue drops and counts the entry without waiting
+    def test_backpressure(self, tmp_path):
+        audit = AuditLog(tmp_path, max_queue=1)
+        assert audit.record(_entry(1))
+        assert not audit.record(_entry(2))
+        stats = audit.stats()
+        assert stats["dropped"] == 1 and "waited" not in stats
+        assert stats["high_water"] == 1 and stats["capacity"] == 1
+        audit.flush()
+        assert len(_lines(audit.path)) == 1
+
+    # Test files roll over past the size limit and keep a bounded history
+    def test_rotation(self, tmp_path):
+        audit = AuditLog(tmp_path, max_bytes=60, backups=2)
+        for n in range(5):
+            audit.write_batch([_entry(n)])
+        assert audit.rotations == 4
+        assert _lines(audit.path)[0]["reservation_id"] == "r4"
+        assert _lines(tmp_path / "audit.ndjson.2")[0]["reservation_id"] == "r2"
+        assert not (tmp_path / "audit.ndjson.3").exists()
+        audit = AuditLog(tmp_path, max_bytes=60, backups=0)
+        audit.write_batch([_entry(9)])
+        assert len(_lines(audit.path)) == 1
+
+    # Test write failures drop the batch instead of killing the writer
+    def test_write_failure(self, tmp_path):
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        audit = AuditLog(blocker / "audit")
+        audit.record(_entry())
+        audit.flush()
+        assert audit.stats()["dropped"] == 1
+
+    # Test reservation events reach the log with the acting role
+    def test_listener(self, tmp_path, sample_reservation_data):
+        svc = ParkingService()
+        audit = AuditLog(tmp_path)
+        svc.add_listener(audit.on_reservation_event)
+        reservation = svc.create_reservation(sample_reservation_data, "user", "user")
+        svc.cancel_reservation(reservation["id"], "admin", "admin")
+        audit.flush()
+        created, cancelled = _lines(audit.path)
+        assert (created["event"], created["role"]) == ("created", "user")
+        assert (cancelled["event"], cancelled["actor"]) == ("cancelled", "admin")
+        assert cancelled["status"] == "cancelled"
@@ -1,6 +1,7 @@
 
 import pytest
 from app.services.auth_service import AuthService
+from app.utils.auth import TokenError
 
 
 class TestAuthService:
@@ -65,3 +66,34 @@ class TestAuthService:
         assert admin is not None
         assert admin["username"] == "admin"
         assert admin["role"] == "admin"
+
+    # Test users loaded from pre-hashed credentials file
+    def test_users_loaded_from_file(self, tmp_path):
+        users_file = tmp_path / "users.json"
+        users_file.write_text(
+            '[{"username": "kiosk", "password": "$2b$12$x", "role": "user", "name": "Kiosk"}]'
+        )
+        service = AuthService(users_file)
+        assert service.get_user("kiosk")["name"] == "Kiosk"
+        assert service.get_user("user") is None
+
+    # Test fallback to hashing demo users when file is missing
+    def test_users_file_missing_fallback(self, tmp_path):
+        service = AuthService(tmp_path / "missing.json")
+        assert service.authenticate_user("admin", "12345") is not None
+
+    # Test refreshing rotates the token and resolves the current user
+    def test_refresh(self, auth_service):
+        token = auth_service.issue_refresh_token(auth_service.get_user("admin"))
+        user, successor = auth_service.refresh(token)
+        assert user["username"] == "admin" and successor != token
+        assert auth_service.logout(successor)
+        assert not auth_service.logout(successor)
+
+    # Test users removed after login can no longer refresh
+    def test_refresh_removed_user(self, auth_service):
+        token = auth_service.issue_refresh_token(auth_service.get_user("user"))
+        auth_service.users_db = [u for u in auth_service.users_db if u["username"] != "user"]
+        with pytest.raises(TokenError):
+            auth_service.refresh(token)
+        assert auth_service.refresh_tokens._tokens == {}
@@ -1,10 +1,23 @@
 
+import base64
+import time
+from datetime import datetime, timedelta
+
 import pytest
 from fastapi import HTTPException
+from jose import jwt
 
 from app.utils.auth import (
+    SECRET_KEY,
+    HS256Codec,
+    JoseCodec,
+    TokenCodec,
+    TokenError,
     create_access_token,
+    get_current_user,
+    get_token_codec,
     hash_password,
+    set_token_codec,
     verify_password,
     get_user_from_db,
 )
@@ -65,3 +78,96 @@ class TestAuthUtilities:
     def test_get_user_from_db_empty(self):
         user = get_user_from_db("test", [])
         assert user is None
+
+
+class TestTokenCodec:
+
+    # Test fast codec round trip converts exp to a timestamp
+    def test_hs256_round_trip(self):
+        codec = HS256Codec(SECRET_KEY)
+        expire = datetime.utcnow() + timedelta(minutes=5)
+        claims = codec.decode(codec.encode({"sub": "user", "exp": expire}))
+        assert claims["sub"] == "user"
+        assert isinstance(claims["exp"], int)
+
+    # Test fast codec tokens verify with jose and vice versa
+    def test_interoperable_with_jose(self):
+        fast, jose_codec = HS256Codec(SECRET_KEY), JoseCodec(SECRET_KEY)
+        claims = {"sub": "user", "role": "user", "exp": int(time.time()) + 60}
+        assert jose_codec.decode(fast.encode(claims)) == claims
+        assert fast.decode(jose_codec.encode(claims)) == claims
+        assert fast.encode(claims) == jose_codec.encode(claims)
+
+    # Test tampered signature rejected
+    def test_tampered_signature(self):
+        codec = HS256Codec(SECRET_KEY)
+        token = codec.encode({"sub": "user"})
+        forged = HS256Codec("another-secret").encode({"sub": "user"})
+        with pytest.raises(TokenError):
+            codec.decode(token.rsplit(".", 1)[0] + "." + forged.rsplit(".", 1)[1])
+
+    # Test non-HS256 algorithms rejected
+    def test_alg_rejected(self):
+        codec = HS256Codec(SECRET_KEY)
+        hs512_token = jwt.encode({"sub": "user"}, "", algorithm="HS512")
+        with pytest.raises(TokenError):
+            codec.decode(hs512_token)
+        header = base64.urlsafe_b64encode(b'{"alg":"none"}').rstrip(b"=").decode()
+        body = codec.encode({"sub": "user"}).split(".", 1)[1]
+        with pytest.raises(TokenError):
+            codec.decode(f"{header}.{body}")
+
+    # Test non-canonical HS256 header accepted
+    def test_non_canonical_header(self):
+        codec = HS256Codec(SECRET_KEY)
+        token = jwt.encode(
+            {"sub": "user"}, SECRET_KEY, algorithm="HS256", headers={"kid": "1"}
+        )
+        assert codec.decode(token)["sub"] == "user"
+
+    # Test expired and not-yet-valid tokens rejected
+    def test_time_claims(self):
+        codec = HS256Codec(SECRET_KEY)
+        now = int(time.time())
+        with pytest.raises(TokenError, match="kadaluwarsa"):
+            codec.decode(codec.encode({"sub": "user", "exp": now - 1}))
+        with pytest.raises(TokenError, match="belum berlaku"):
+            codec.decode(codec.encode({"sub": "user", "nbf": now + 60}))
+        with pytest.raises(TokenError, match="angka"):
+            codec.decode(codec.encode({"sub": "user", "exp": "tomorrow"}))
+
+    # Test malformed tokens rejected
+    def test_malformed_tokens(self):
+        codec = HS256Codec(SECRET_KEY)
+        for token in ["", "a.b", "a.b.c.d", "ä.b.c", "!!!.e30.x"]:
+            with pytest.raises(TokenError):
+                codec.decode(token)
+        header = codec.encode({}).split(".")[0]
+        payload = base64.urlsafe_b64encode(b"[1]").rstrip(b"=").decode()
+        signing_input = f"{header}.{payload}".encode()
+        signature = base64.urlsafe_b64encode(codec._sign(signing_input)).rstrip(b"=")
+        with pytest.raises(TokenError, match="Payload"):
+            codec.decode(f"{header}.{payload}.{signature.decode()}")
+
+    # Test swapping the active codec
+    def test_set_token_codec(self):
+        original = get_token_codec()
+        try:
+            set_token_codec(JoseCodec(SECRET_KEY))
+            token = create_access_token({"sub": "user", "role": "user"})
+            assert isinstance(get_token_codec(), JoseCodec)
+            user = get_current_user(token, [{"username": "user", "role": "user"}])
+            assert user["username"] == "user"
+        finally:
+            set_token_codec(original)
+
+    # Test codecs missing part of the interface fail at construction
+    def test_base_codec_abstract(self):
+        class EncodeOnly(TokenCodec):
+            def encode(self, claims):
+                return ""
+
+        with pytest.raises(TypeError):
+            TokenCodec()
+        with pytest.raises(TypeError):
+            EncodeOnly()
@@ -0,0 +1,214 @@
+import json
+import os
+
+import pytest
+
+from app.services.catalog_service import (
+    Catalog,
+    CatalogWatcher,
+    carry_over,
+    load_catalog,
+)
+from app.services.parking_service import ParkingService
+
+SLOTS_HEADER = "id,mall_id,name,status,location,slot_type\n"
+
+
+def write_catalog(tmp_path, malls=None, slots=None):
+    malls_file = tmp_path / "malls.json"
+    slots_file = tmp_path / "slots.csv"
+    malls_file.write_text(
+        json.dumps(
+            malls
+            or [
+                {
+                    "id": "m1",
+                    "name": "Mall 1",
+                    "base_price": 5000,
+                    "total_slots": 10,
+                    "available_slots": 5,
+                }
+            ]
+        )
+    )
+    slots_file.write_text(
+        SLOTS_HEADER
+        + (
+            slots
+            or 'm1-1,m1,A-1,available,"Lantai 1, Area A",regular\n'
+            "m1-2,m1,A-2,available,,\n"
+        )
+    )
+    return malls_file, slots_file
+
+
+class TestCatalog:
+
+    # Test the default data files hold the demo catalog
+    def test_default_files(self):
+        catalog = load_catalog()
+        assert [m["id"] for m in catalog.malls] == ["pvj", "paskal", "sumaba"]
+        assert catalog.slot_count == 14
+        assert catalog.slot_by_key[("pvj", "pvj-3")]["status"] == "occupied"
+
+    # Test CSV parsing and indexes
+    def test_load(self, tmp_path):
+        catalog = load_catalog(*write_catalog(tmp_path))
+        slot = catalog.slot_by_key[("m1", "m1-1")]
+        assert slot["location"] == "Lantai 1, Area A"
+        assert catalog.slot_by_key[("m1", "m1-2")]["location"] is None
+        assert [s["id"] for s in catalog.slots_by_mall["m1"]] == ["m1-1", "m1-2"]
+
+    # Test invalid rows are rejected
+    def test_invalid_rows(self):
+        mall = {"id": "m1", "available_slots": 1}
+        with pytest.raises(ValueError):
+            Catalog([mall], [{"id": "x", "mall_id": "m2", "status": "available"}])
+        with pytest.raises(ValueError):
+            Catalog([mall], [{"id": "x", "mall_id": "m1", "status": "broken"}])
+
+    # Test live state survives unless the file changed it
+    def test_carry_over(self, tmp_path):
+        old = load_catalog(*write_catalog(tmp_path))
+        old.slot_by_key[("m1", "m1-1")]["status"] = "occupied"
+        old.slot_by_key[("m1", "m1-2")]["status"] = "occupied"
+        old.mall_by_id["m1"]["available_slots"] = 3
+        new = load_catalog(
+            *write_catalog(
+                tmp_path,
+                malls=[
+                    {
+                        "id": "m1",
+                        "name": "Mall 1",
+                        "base_price": 6000,
+                        "total_slots": 10,
+                        "available_slots": 6,
+                    }
+                ],
+                slots="m1-1,m1,A-1,available,,\nm1-2,m1,A-2,maintenance,,\n",
+            )
+        )
+        carry_over(old, new)
+        assert new.slot_by_key[("m1", "m1-1")]["status"] == "occupied"
+        assert new.slot_by_key[("m1", "m1-2")]["status"] == "maintenance"
+        assert new.mall_by_id["m1"]["available_slots"] == 4
+        assert new.mall_by_id["m1"]["base_price"] == 6000
+
+
+class TestCatalogWatcher:
+
+    # Test changes trigger the callback once and errors are contained
+    def test_poll(self, tmp_path):
+        malls_file, slots_file = write_catalog(tmp_path)
+        calls = []
+        watcher = CatalogWatcher([malls_file, slots_file], lambda: calls.append(1))
+        assert watcher.poll() is False
+        os.utime(slots_file, ns=(0, 0))
+        assert watcher.poll() is False
+        assert watcher.poll() is True
+        assert watcher.poll() is False
+        assert calls == [1]
+
+        def fail():
+            raise ValueError("broken")
+
+        watcher.on_change = fail
+        slots_file.unlink()
+        assert watcher.poll() is False
+        assert watcher.poll() is False
+        assert watcher.poll() is False
+
+    # Test a file still being written is only loaded once it stops changing
+    def test_partially_written(self, tmp_path):
+        malls_file, slots_file = write_catalog(tmp_path)
+        loaded = []
+        watcher = CatalogWatcher(
+            [malls_file, slots_file],
+            lambda: loaded.append(len(load_catalog(malls_file, slots_file).slot_by_key)),
+        )
+        rows = "".join(f"m1-{n},m1,A-{n},available,,\n" for n in range(1, 6))
+        # Cut off at a row boundary, which would parse cleanly
+        slots_file.write_text(SLOTS_HEADER + rows[: rows.index("m1-3")])
+        assert watcher.poll() is False
+        with open(slots_file, "a") as file:
+            file.write(rows[rows.index("m1-3"):])
+        assert watcher.poll() is False
+        assert loaded == []
+        assert watcher.poll() is True
+        assert loaded == [5]
+
+    # Test a change that reverts before the next poll does not reload
+    def test_change_reverted(self, tmp_path):
+        malls_file, slots_file = write_catalog(tmp_path)
+        calls = []
+        watcher = CatalogWatcher([malls_file, slots_file], lambda: calls.append(1))
+        stat = os.stat(slots_file)
+        os.utime(slots_file, ns=(0, 0))
+        assert watcher.poll() is False
+        os.utime(slots_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert watcher.poll() is False
+        assert watcher.poll() is False
+        assert calls == []
+
+    # Test the thread starts and stops
+    def test_start_stop(self, tmp_path):
+        watcher = CatalogWatcher(list(write_catalog(tmp_path)), lambda: None, 0.01)
+        watcher.start()
+        watcher.stop()
+        assert watcher._thread is None
+
+
+class TestServiceReload:
+
+    # Test reload swaps the catalog and keeps bookings
+    def test_reload(self, tmp_path):
+        malls_file, slots_file = write_catalog(tmp_path)
+        svc = ParkingService(catalog=load_catalog(malls_file, slots_file))
+        svc.pricing  # built engines must follow the reload
+        svc.analytics
+        reservation = svc.create_reservation(
+            {
+                "mall_id": "m1",
+                "slot_id": "m1-1",
+                "user_name": "Test",
+                "vehicle_number": "B1",
+                "phone": "08123456789",
+                "time_slot": {"start_time": "09:00", "end_time": "10:00"},
+            },
+            "user",
+        )
+        write_catalog(
+            tmp_path,
+            slots='m1-1,m1,A-1,available,,\nm1-2,m1,A-2,available,,\n'
+            "m1-3,m1,A-3,available,,\n",
+        )
+        svc.reload_catalog(malls_file, slots_file)
+        assert len(svc.get_slots_by_mall("m1")) == 3
+        assert svc.get_slot_by_id("m1", "m1-1")["status"] == "occupied"
+        assert svc.get_mall_by_id("m1")["available_slots"] == 4
+        svc.cancel_reservation(reservation["id"], "user", "user")
+        assert svc.get_slot_by_id("m1", "m1-1")["status"] == "available"
+        assert svc.get_mall_by_id("m1")["available_slots"] == 5
+
+    # Test writes during the carry-over are applied to the new catalog
+    def test_touched_slots_carried(self, tmp_path, monkeypatch):
+        malls_file, slots_file = write_catalog(tmp_path)
+        svc = ParkingService(catalog=load_catalog(malls_file, slots_file))
+        new = load_catalog(malls_file, slots_file)
+        import app.services.parking_service as module
+
+        original = module.carry_over
+
+        def carry_over_with_write(old, new_catalog, keys=None):
+            if keys is None:
+                original(old, new_catalog)
+                monkeypatch.setattr(svc.occupancy, "occupied_count", lambda mall_id: 1)
+                svc._set_slot_state("m1", "m1-2", "occupied")
+            else:
+                original(old, new_catalog, keys)
+
+        monkeypatch.setattr(module, "carry_over", carry_over_with_write)
+        svc.replace_catalog(new)
+        assert svc.catalog is new
+        assert new.slot_by_key[("m1", "m1-2")]["status"] == "occupied"
+        assert new.mall_by_id["m1"]["available_slots"] == 4
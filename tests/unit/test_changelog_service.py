@@ -0,0 +1,81 @@
+import pytest
+
+from app.services.changelog_service import Changelog
+from app.services.parking_service import ParkingService
+from app.services.shard_service import ShardedParkingService
+
+
+def _reservation(n):
+    return {"id": f"r{n}", "status": "confirmed", "version": 1}
+
+
+class TestChangelog:
+
+    # Test changes are numbered from 1 and read back after a position
+    def test_since(self):
+        log = Changelog(capacity=10)
+        for n in range(5):
+            assert log.record("created", _reservation(n)) == n + 1
+        result = log.since(2)
+        assert [c["seq"] for c in result["changes"]] == [3, 4, 5]
+        assert result["next"] == 5 and result["last_seq"] == 5
+        assert not result["resync_required"]
+        assert log.since(5)["changes"] == []
+
+    # Test reads are capped and resume from the returned position
+    def test_limit(self):
+        log = Changelog(capacity=10)
+        for n in range(5):
+            log.record("created", _reservation(n))
+        first = log.since(0, limit=2)
+        assert [c["seq"] for c in first["changes"]] == [1, 2]
+        second = log.since(first["next"], limit=10)
+        assert [c["seq"] for c in second["changes"]] == [3, 4, 5]
+
+    # Test clients behind the overwritten changes, or ahead of the log, must resync
+    def test_resync_required(self):
+        log = Changelog(capacity=3)
+        for n in range(5):
+            log.record("created", _reservation(n))
+        assert log.since(1)["resync_required"]
+        assert [c["seq"] for c in log.since(2)["changes"]] == [3, 4, 5]
+        ahead = log.since(9)
+        assert ahead["resync_required"] and ahead["next"] == 5
+        with pytest.raises(ValueError):
+            Changelog(capacity=0)
+
+    # Test entries keep the reservation as it was when it changed
+    def test_entries_are_copies(self):
+        log = Changelog()
+        reservation = _reservation(0)
+        log.record("created", reservation)
+        reservation["status"] = "cancelled"
+        log.record("cancelled", reservation)
+        created, cancelled = log.since(0)["changes"]
+        assert created["reservation"]["status"] == "confirmed"
+        assert (cancelled["event"], cancelled["reservation"]["status"]) == (
+            "cancelled",
+            "cancelled",
+        )
+
+    # Test every service mutation is stamped
+    def test_parking_service(self, sample_reservation_data):
+        svc = ParkingService()
+        reservation = svc.create_reservation(sample_reservation_data, "user", "user")
+        svc.modify_reservation(reservation["id"], {"user_name": "Baru"}, "user", "user")
+        svc.cancel_reservation(reservation["id"], "user", "user")
+        changes = svc.get_changes(0)["changes"]
+        assert [c["event"] for c in changes] == ["created", "modified", "cancelled"]
+        assert [c["reservation"]["version"] for c in changes] == [1, 2, 3]
+
+    # Test shards share one sequence
+    def test_sharded(self, sample_reservation_data):
+        svc = ShardedParkingService(shards=3)
+        svc.create_reservation(sample_reservation_data, "user", "user")
+        other = {**sample_reservation_data, "mall_id": "sumaba", "slot_id": "sumaba-1"}
+        svc.create_reservation(other, "user", "user")
+        changes = svc.get_changes(0)["changes"]
+        assert [(c["seq"], c["reservation"]["mall_id"]) for c in changes] == [
+            (1, "pvj"),
+            (2, "sumaba"),
+        ]
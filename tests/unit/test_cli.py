@@ -0,0 +1,81 @@
+import argparse
+
+import pytest
+import uvicorn
+
+import app.main as main_module
+from app import cli
+
+
+class TestServeArguments:
+
+    # Test worker counts accept numbers and "auto"
+    def test_worker_count(self, monkeypatch):
+        monkeypatch.setattr(cli, "cpu_count", lambda: 6)
+        assert cli.worker_count("auto") == 6
+        assert cli.worker_count("3") == 3
+        with pytest.raises(argparse.ArgumentTypeError):
+            cli.worker_count("0")
+        with pytest.raises(argparse.ArgumentTypeError):
+            cli.worker_count("many")
+
+    # Test the CPU count honours the scheduler affinity when available
+    def test_cpu_count(self, monkeypatch):
+        assert cli.cpu_count() >= 1
+        monkeypatch.delattr(cli.os, "sched_getaffinity", raising=False)
+        monkeypatch.setattr(cli.os, "cpu_count", lambda: None)
+        assert cli.cpu_count() == 1
+
+    # Test uvloop and httptools are used only when installed
+    def test_detection(self, monkeypatch):
+        monkeypatch.setattr(cli, "_installed", lambda module: False)
+        assert (cli.event_loop(), cli.http_protocol()) == ("asyncio", "h11")
+        monkeypatch.setattr(cli, "_installed", lambda module: True)
+        assert (cli.event_loop(), cli.http_protocol()) == ("uvloop", "httptools")
+
+    # Test parsed arguments become uvicorn options
+    def test_server_options(self):
+        args = cli.build_parser().parse_args(
+            ["serve", "--port", "9000", "--workers", "2", "--limit-concurrency", "50"]
+        )
+        options = cli.server_options(args)
+        assert options["port"] == 9000
+        assert options["workers"] == 2
+        assert options["limit_concurrency"] == 50
+        assert options["backlog"] == 2048
+        assert options["timeout_graceful_shutdown"] == 30
+        defaults = cli.server_options(cli.build_parser().parse_args(["serve"]))
+        assert defaults["workers"] == 1
+        assert defaults["limit_concurrency"] is None
+
+    # Test a command is required
+    def test_command_required(self):
+        with pytest.raises(SystemExit):
+            cli.main([])
+
+    # Test serve hands the app path and options to uvicorn
+    def test_main_serve(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(uvicorn, "run", lambda app, **kw: calls.append((app, kw)))
+        assert cli.main(["serve", "--workers", "2", "--keep-alive", "10"]) == 0
+        app, options = calls[0]
+        assert app == "app.main:app"
+        assert options["workers"] == 2
+        assert options["timeout_keep_alive"] == 10
+
+
+class TestPrewarm:
+
+    # Test pre-warming fills the catalog caches with every encoding
+    def test_prewarm(self):
+        main_module.prewarm()
+        snapshot = main_module.parking_service.snapshot()
+        assert {"gzip", "br"} <= set(snapshot._cache[("malls",)])
+        assert set(snapshot._cache) >= {("slots", "pvj"), ("slots", "sumaba")}
+
+    # Test the lifespan pre-warms and stops its background tasks on shutdown
+    def test_lifespan(self, client, monkeypatch):
+        monkeypatch.setattr(main_module, "CATALOG_POLL_SECONDS", 0)
+        with client:
+            assert client.get("/health").status_code == 200
+        assert main_module.startup_report.as_dict()["phases_ms"]["prewarm"] >= 0
@@ -0,0 +1,157 @@
+import gzip
+import zlib
+
+import brotli
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.services.catalog_service import load_catalog
+from app.services.snapshot_service import CatalogSnapshot
+from app.utils.compression import (
+    CompressionMiddleware,
+    StreamCompressor,
+    compress,
+    negotiate,
+)
+
+BIG = b'{"status":"available"}' * 100
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/big")
+    async def big():
+        return Response(BIG, media_type="application/json")
+
+    @app.get("/small")
+    async def small():
+        return Response(b"{}", media_type="application/json")
+
+    @app.get("/binary")
+    async def binary():
+        return Response(BIG, media_type="image/png")
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(
+            gzip.compress(BIG),
+            media_type="application/json",
+            headers={"Content-Encoding": "gzip"},
+        )
+
+    @app.get("/stream")
+    async def stream(chunks: int = 5):
+        return StreamingResponse(
+            iter([b'{"row":1}\n' * 20] * chunks), media_type="application/x-ndjson"
+        )
+
+    return app
+
+
+@pytest.fixture
+def raw_client():
+    # Client for a bare app behind the middleware
+    client = TestClient(_app())
+    yield client
+    client.close()
+
+
+class TestNegotiate:
+
+    # Test quality values and wildcards pick a supported encoding
+    def test_negotiate(self):
+        assert negotiate("gzip, deflate") == "gzip"
+        assert negotiate("br;q=0.5, gzip") == "gzip"
+        assert negotiate("*") == "br"
+        assert negotiate("br;q=0, gzip;q=0, *;q=1") is None
+        assert negotiate("gzip;q=oops") is None
+        assert negotiate("identity") is None
+        assert negotiate("") is None and negotiate(None) is None
+
+    # Test brotli is preferred at equal quality
+    def test_negotiate_brotli(self):
+        assert negotiate("gzip, br") == "br"
+        assert negotiate("gzip, br;q=0.5") == "gzip"
+
+    # Test whole-body and streaming gzip decode to the input
+    def test_gzip_round_trip(self):
+        assert gzip.decompress(compress(BIG, "gzip")) == BIG
+        assert compress(BIG, "gzip") == compress(BIG, "gzip")
+        stream = StreamCompressor("gzip")
+        first = stream.compress(BIG[:100])
+        decoder = zlib.decompressobj(31)
+        assert decoder.decompress(first) == BIG[:100]
+        rest = stream.compress(BIG[100:]) + stream.finish()
+        assert decoder.decompress(rest) == BIG[100:]
+
+    # Test whole-body and streaming brotli decode to the input
+    def test_brotli_round_trip(self):
+        assert brotli.decompress(compress(BIG, "br")) == BIG
+        stream = StreamCompressor("br")
+        body = stream.compress(BIG) + stream.finish()
+        assert brotli.decompress(body) == BIG
+
+
+class TestCompressionMiddleware:
+
+    # Test large bodies are compressed and small ones sent as-is
+    def test_threshold(self, raw_client):
+        response = raw_client.get("/big", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(BIG)
+        assert response.content == BIG
+        response = raw_client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.content == b"{}"
+
+    # Test clients without gzip and non-text bodies get identity
+    def test_identity(self, raw_client):
+        response = raw_client.get("/big", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+        response = raw_client.get("/binary", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert "vary" not in response.headers
+
+    # Test already-encoded responses pass through untouched
+    def test_encoded_passthrough(self, raw_client):
+        response = raw_client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.content == BIG
+
+    # Test streams are compressed chunk by chunk and short streams are not
+    def test_stream(self, raw_client):
+        response = raw_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert response.content == b'{"row":1}\n' * 100
+        response = raw_client.get(
+            "/stream", params={"chunks": 1}, headers={"Accept-Encoding": "gzip"}
+        )
+        assert "content-encoding" not in response.headers
+        assert response.content == b'{"row":1}\n' * 20
+
+
+class TestCachedVariants:
+
+    # Test compressed variants are stored next to the identity body
+    def test_variants(self):
+        snapshot = CatalogSnapshot.build(load_catalog())
+        calls = []
+
+        def render():
+            calls.append(1)
+            return BIG
+
+        assert snapshot.cached(("malls",), render) == BIG
+        body = snapshot.cached(("malls",), render, "gzip")
+        assert gzip.decompress(body) == BIG
+        assert snapshot.cached(("malls",), render, "gzip") is body
+        assert len(calls) == 1
+        successor = snapshot.with_records(dict(snapshot.mall("pvj")), None)
+        assert successor.cached(("malls",), lambda: b"new", "gzip") != body
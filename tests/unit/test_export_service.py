@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date
+
+import pytest
+
+from app.services.export_service import (
+    EXPORT_FIELDS,
+    csv_chunks,
+    export_chunks,
+    ndjson_chunks,
+)
+
+
+def _rows(count):
+    for n in range(count):
+        yield {
+            "id": f"r{n}",
+            "mall_id": "pvj",
+            "slot_id": "pvj-1",
+            "user_name": "Test, User",
+            "vehicle_number": "B1234XYZ",
+            "phone": "08123456789",
+            "start_time": "09:00",
+            "end_time": "10:00",
+            "duration": 1,
+            "total_price": 5000,
+            "status": "confirmed",
+            "created_at": "2025-01-01T09:00:00",
+            "created_by": "user",
+        }
+
+
+class TestExportEncoding:
+
+    # Test NDJSON is chunked and lossless
+    def test_ndjson_chunks(self):
+        chunks = list(ndjson_chunks(_rows(100), chunk_size=1024))
+        assert len(chunks) > 1
+        lines = b"".join(chunks).decode().splitlines()
+        assert len(lines) == 100
+        assert json.loads(lines[42])["id"] == "r42"
+
+    # Test CSV has a header and quotes commas
+    def test_csv_chunks(self):
+        chunks = list(csv_chunks(_rows(100), chunk_size=1024))
+        assert len(chunks) > 1
+        rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+        assert list(rows[0]) == EXPORT_FIELDS
+        assert rows[99]["user_name"] == "Test, User"
+
+    # Test gzip output decompresses to the plain stream
+    def test_gzip(self):
+        plain = b"".join(export_chunks(_rows(50), "ndjson"))
+        compressed = b"".join(export_chunks(_rows(50), "ndjson", gzip=True))
+        assert compressed[:2] == b"\x1f\x8b"
+        assert zlib.decompress(compressed, 31) == plain
+
+    # Test empty exports still produce valid output
+    def test_empty(self):
+        assert b"".join(export_chunks([], "ndjson")) == b""
+        assert b"".join(export_chunks([], "csv")).startswith(b"id,")
+
+    # Test unknown formats are rejected
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            export_chunks([], "xml")
+
+
+class TestIterReservations:
+
+    # Test filters by date, mall and status
+    def test_filters(self, parking_service):
+        for slot_id in ("pvj-1", "pvj-2"):
+            parking_service.create_reservation(
+                {
+                    "mall_id": "pvj",
+                    "slot_id": slot_id,
+                    "user_name": "Test",
+                    "vehicle_number": "B1",
+                    "phone": "08123456789",
+                    "time_slot": {"start_time": "09:00", "end_time": "10:00"},
+                },
+                "user",
+            )
+        first = parking_service.reservations_db[0]
+        first["created_at"] = "2024-12-31T23:00:00"
+        parking_service.cancel_reservation(first["id"], "user", "user")
+        first = parking_service.get_reservation_by_id(first["id"])
+
+        assert len(list(parking_service.iter_reservations(mall_id="pvj"))) == 2
+        assert list(parking_service.iter_reservations(mall_id="paskal")) == []
+        assert list(parking_service.iter_reservations(status="cancelled")) == [first]
+        assert list(
+            parking_service.iter_reservations(date_to=date(2024, 12, 31))
+        ) == [first]
+        assert first not in parking_service.iter_reservations(
+            date_from=date(2025, 1, 1)
+        )
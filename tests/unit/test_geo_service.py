@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+from app.services.geo_service import GeoIndex, haversine_km
+from app.services.parking_service import ParkingService
+
+
+def _malls(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"m{n}",
+            "latitude": rng.uniform(-8.0, -6.0),
+            "longitude": rng.uniform(106.0, 109.0),
+            "available_slots": n % 3,
+        }
+        for n in range(count)
+    ]
+
+
+def _brute_force(malls, lat, lon, k, accept):
+    ranked = sorted(
+        (haversine_km(lat, lon, m["latitude"], m["longitude"]), m["id"])
+        for m in malls
+        if accept(m)
+    )
+    return [mall_id for _, mall_id in ranked[:k]]
+
+
+class TestGeoIndex:
+
+    # Test distances match known values
+    def test_haversine(self):
+        assert haversine_km(0, 0, 0, 1) == pytest.approx(111.19, abs=0.01)
+        assert haversine_km(-6.9, 107.6, -6.9, 107.6) == 0
+
+    # Test the grid search agrees with a full scan
+    def test_matches_brute_force(self):
+        malls = _malls(2000)
+        index = GeoIndex(malls)
+        rng = random.Random(1)
+
+        def accept(m):
+            return m["available_slots"] > 0
+
+        for _ in range(50):
+            lat, lon = rng.uniform(-9.0, -5.0), rng.uniform(105.0, 110.0)
+            found = [m["id"] for _, m in index.nearest(lat, lon, 5, accept)]
+            assert found == _brute_force(malls, lat, lon, 5, accept)
+
+    # Test the predicate only runs on the nearest candidates
+    def test_prunes_by_distance(self):
+        malls = _malls(2000)
+        checked = []
+        GeoIndex(malls).nearest(-7.0, 107.5, 3, lambda m: checked.append(m) or True)
+        assert len(checked) == 3
+
+    # Test the radius limit and malls without coordinates
+    def test_max_km_and_missing_coordinates(self):
+        malls = [
+            {"id": "near", "latitude": -6.9, "longitude": 107.6},
+            {"id": "far", "latitude": -6.2, "longitude": 106.8},
+            {"id": "nowhere"},
+        ]
+        index = GeoIndex(malls)
+        assert len(index) == 2
+        assert [m["id"] for _, m in index.nearest(-6.9, 107.6, 5, max_km=20)] == ["near"]
+        assert [m["id"] for _, m in index.nearest(-6.9, 107.6, 5)] == ["near", "far"]
+        assert GeoIndex([]).nearest(0, 0) == []
+
+    # Test queries far from every mall only visit cells inside the occupied extent
+    def test_far_query(self):
+        malls = _malls(2000)
+        index = GeoIndex(malls)
+        min_i, max_i, min_j, max_j = index._extent
+        extent_cells = (max_i - min_i + 1) * (max_j - min_j + 1)
+        ring = index._ring
+        visited = []
+        index._ring = lambda ci, cj, r: (visited.append(cell) or cell for cell in ring(ci, cj, r))
+        for lat, lon in ((0, 0), (60, -120), (-80, 179)):
+            visited.clear()
+            found = [m["id"] for _, m in index.nearest(lat, lon, 3)]
+            assert found == _brute_force(malls, lat, lon, 3, lambda m: True)
+            assert len(visited) <= extent_cells
+        svc = ParkingService()
+        assert svc.find_nearest_malls(60, -120, k=1)[0]["id"] == min(
+            svc.malls_db,
+            key=lambda m: haversine_km(60, -120, m["latitude"], m["longitude"]),
+        )["id"]
+
+
+class TestNearestMalls:
+
+    # Test full malls are skipped and distances are reported
+    def test_current_availability(self):
+        svc = ParkingService()
+        svc.get_mall_by_id("pvj")["available_slots"] = 0
+        result = svc.find_nearest_malls(-6.89, 107.60, k=2)
+        assert [m["id"] for m in result] == ["paskal", "sumaba"]
+        assert result[0]["distance_km"] > 0
+
+    # Test window availability looks at reservations on each slot
+    def test_window_availability(self):
+        svc = ParkingService()
+        for slot_id in ("paskal-1", "paskal-3", "paskal-4"):
+            svc.create_reservation(
+                {
+                    "mall_id": "paskal",
+                    "slot_id": slot_id,
+                    "user_name": "Test",
+                    "vehicle_number": "B1",
+                    "phone": "0812",
+                    "time_slot": {"start_time": "17:00", "end_time": "21:00"},
+                },
+                "user",
+            )
+        result = svc.find_nearest_malls(-6.915, 107.594, 2, "18:00", "20:00")
+        assert [m["id"] for m in result] == ["pvj", "sumaba"]
+
+    # Test invalid windows are rejected
+    def test_invalid_window(self):
+        svc = ParkingService()
+        with pytest.raises(ValueError):
+            svc.find_nearest_malls(-6.9, 107.6, start_time="18:00")
+        with pytest.raises(ValueError):
+            svc.find_nearest_malls(-6.9, 107.6, start_time="25:00", end_time="26:00")
+
+    # Test the index follows catalog reloads
+    def test_rebuilt_on_reload(self):
+        svc = ParkingService()
+        index = svc.geo
+        svc.reload_catalog()
+        assert svc.geo is not index
@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from app.utils.importtime import (
+    measure_first_request,
+    measure_imports,
+    parse_importtime,
+)
+
+BASELINE = json.loads(
+    (Path(__file__).parent / "import_time_baseline.json").read_text()
+)
+
+
+@pytest.fixture(scope="module")
+def app_imports():
+    return measure_imports(BASELINE["module"])
+
+
+class TestParseImporttime:
+
+    # Test parsing of -X importtime output
+    def test_parse_records(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     json.decoder\n"
+            "import time:       300 |        420 |   json\n"
+            "unrelated line\n"
+        )
+        records = parse_importtime(output)
+        assert records == [
+            {"module": "json.decoder", "depth": 2, "self_us": 120, "cumulative_us": 120},
+            {"module": "json", "depth": 1, "self_us": 300, "cumulative_us": 420},
+        ]
+
+
+class TestStartupRegression:
+
+    # Test heavy modules stay off the app import path
+    def test_lazy_modules_not_imported(self, app_imports):
+        imported = {name.split(".")[0] for name in app_imports["modules"]}
+        assert imported.isdisjoint(BASELINE["lazy_modules"])
+
+    # Test time to first request of a fresh process
+    def test_time_to_first_request(self):
+        report = measure_first_request("/health")
+        assert report["status"] == 200
+        assert report["time_to_first_request_ms"] > report["first_request_ms"]
@@ -0,0 +1,224 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.main as main_module
+from app.services import occupancy_service
+from app.services.catalog_service import Catalog
+from app.services.occupancy_service import OccupancyNowView
+from app.services.parking_service import ParkingService
+from app.services.shard_service import ShardedParkingService
+
+
+def _reservation(rid, start, end, slot_id="s1", status="confirmed"):
+    return {
+        "id": rid,
+        "mall_id": "m1",
+        "slot_id": slot_id,
+        "start_time": start,
+        "end_time": end,
+        "status": status,
+    }
+
+
+def _request(slot_id, start, end, mall_id="m1"):
+    return {
+        "mall_id": mall_id,
+        "slot_id": slot_id,
+        "user_name": "Test",
+        "vehicle_number": "D 1234 AB",
+        "phone": "08123456789",
+        "time_slot": {"start_time": start, "end_time": end},
+    }
+
+
+def _catalog(second_status="available"):
+    malls = [
+        {
+            "id": "m1",
+            "name": "Mall 1",
+            "base_price": 5000,
+            "total_slots": 2,
+            "available_slots": 2,
+        }
+    ]
+    slots = [
+        {"id": "m1-1", "mall_id": "m1", "name": "A-1", "status": "available"},
+        {"id": "m1-2", "mall_id": "m1", "name": "A-2", "status": second_status},
+    ]
+    return Catalog(malls, slots)
+
+
+class TestOccupancyNowView:
+
+    # Test windows covering now apply at once and later ones wait for their minute
+    def test_add_and_advance(self):
+        changes = []
+        view = OccupancyNowView(lambda *change: changes.append(change))
+        assert view.minute == 9 * 60 + 30
+        view.add(_reservation("a", "09:00", "10:00"))
+        view.add(_reservation("b", "11:00", "12:00", slot_id="s2"))
+        view.add(_reservation("c", "09:00", "10:00", status="cancelled"))
+        assert changes == [("m1", "s1", True)]
+        assert view.occupied("m1") == {"s1"}
+        view.advance(11 * 60)
+        assert changes[1:] == [("m1", "s1", False), ("m1", "s2", True)]
+        assert view.occupied("m1") == {"s2"}
+
+    # Test back-to-back windows on one slot keep it occupied
+    def test_back_to_back(self):
+        changes = []
+        view = OccupancyNowView(lambda *change: changes.append(change))
+        view.add(_reservation("a", "09:00", "10:00"))
+        view.add(_reservation("b", "10:00", "11:00"))
+        view.add(_reservation("b", "10:00", "11:00"))
+        view.advance(10 * 60 + 30)
+        assert changes == [("m1", "s1", True)]
+        view.advance(11 * 60)
+        assert changes[-1] == ("m1", "s1", False)
+
+    # Test overnight windows wrap past midnight and recur daily
+    def test_overnight(self):
+        view = OccupancyNowView()
+        view.add(_reservation("a", "23:00", "01:00"))
+        assert view.occupied("m1") == set()
+        view.advance(23 * 60)
+        assert view.occupied("m1") == {"s1"}
+        view.advance(30)
+        assert view.occupied("m1") == {"s1"}
+        view.advance(60)
+        assert view.occupied("m1") == set()
+
+    # Test removing a covering reservation frees its slot
+    def test_remove(self):
+        changes = []
+        view = OccupancyNowView(lambda *change: changes.append(change))
+        view.add(_reservation("a", "09:00", "10:00"))
+        view.add(_reservation("b", "09:15", "10:00"))
+        view.remove("a")
+        assert view.occupied("m1") == {"s1"}
+        view.remove("b")
+        view.remove("missing")
+        assert changes == [("m1", "s1", True), ("m1", "s1", False)]
+        view.advance(10 * 60)
+        assert len(changes) == 2
+
+    # Test the clock decides the current minute
+    def test_clock(self):
+        minutes = iter([0, 90])
+        start = datetime(2026, 1, 1)
+        view = OccupancyNowView(clock=lambda: start + timedelta(minutes=next(minutes)))
+        view.add(_reservation("a", "01:00", "02:00"))
+        view.advance()
+        assert view.minute == 90
+        assert view.occupied("m1") == {"s1"}
+
+
+class TestServiceOccupancy:
+
+    # Test bookings change status and counts only while their window covers now
+    def test_booking_follows_clock(self):
+        svc = ParkingService(catalog=_catalog())
+        svc.create_reservation(_request("m1-1", "11:00", "12:00"), "user")
+        assert svc.get_slot_by_id("m1", "m1-1")["status"] == "available"
+        assert svc.get_mall_by_id("m1")["available_slots"] == 2
+        svc.occupancy.advance(11 * 60)
+        assert svc.snapshot().slot("m1", "m1-1")["status"] == "occupied"
+        assert svc.snapshot().mall("m1")["available_slots"] == 1
+        svc.occupancy.advance(12 * 60)
+        assert svc.get_slot_by_id("m1", "m1-1")["status"] == "available"
+        assert svc.get_mall_by_id("m1")["available_slots"] == 2
+
+    # Test the available count is recounted, so a clamp never leaves it off
+    def test_available_recounted(self):
+        # One of the two slots is offered, so a clamp at zero comes early
+        catalog = _catalog()
+        mall = {**catalog.malls[0], "available_slots": 1}
+        svc = ParkingService(catalog=Catalog([mall], catalog.slots_by_mall["m1"]))
+        svc.create_reservation(_request("m1-1", "11:00", "12:00"), "user")
+        svc.create_reservation(_request("m1-2", "11:00", "13:00"), "user")
+        svc.occupancy.advance(11 * 60)
+        assert svc.occupancy.occupied_count("m1") == 2
+        assert svc.get_mall_by_id("m1")["available_slots"] == 0
+        svc.occupancy.advance(12 * 60)
+        assert svc.get_mall_by_id("m1")["available_slots"] == 0
+        svc.occupancy.advance(13 * 60)
+        assert svc.occupancy.occupied_count("m1") == 0
+        assert svc.get_mall_by_id("m1")["available_slots"] == 1
+
+    # Test a lost slot update neither fails the booking nor skips listeners
+    def test_conflict_left_for_tick(self, monkeypatch):
+        import app.services.parking_service as module
+
+        svc = ParkingService(catalog=_catalog())
+        svc.occupancy.advance(11 * 60)
+        original = module.try_commit
+        monkeypatch.setattr(module, "try_commit", lambda updates: None)
+        reservation = svc.create_reservation(_request("m1-1", "11:00", "12:00"), "user")
+        assert svc.search_reservations(mall_id="m1") == [reservation]
+        assert svc.get_slot_by_id("m1", "m1-1")["status"] == "available"
+        monkeypatch.setattr(module, "try_commit", original)
+        monkeypatch.setattr(svc.occupancy, "_now_minute", lambda: 11 * 60)
+        svc.tick_occupancy()
+        assert svc.get_slot_by_id("m1", "m1-1")["status"] == "occupied"
+        assert svc.get_mall_by_id("m1")["available_slots"] == 1
+
+    # Test a booked slot takes other windows and conflicts only on overlap
+    def test_other_windows_bookable(self):
+        svc = ParkingService(catalog=_catalog())
+        svc.create_reservation(_request("m1-1", "09:00", "10:00"), "user")
+        assert svc.get_slot_by_id("m1", "m1-1")["status"] == "occupied"
+        svc.create_reservation(_request("m1-1", "14:00", "15:00"), "user")
+        with pytest.raises(ValueError, match="Slot bentrok"):
+            svc.create_reservation(_request("m1-1", "09:30", "11:00"), "user")
+
+    # Test slots the catalog takes out of service keep their status
+    def test_out_of_service_slot(self):
+        svc = ParkingService(catalog=_catalog())
+        reservation = svc.create_reservation(_request("m1-2", "09:00", "10:00"), "user")
+        svc.replace_catalog(_catalog("maintenance"))
+        assert not svc.is_slot_bookable("m1", "m1-2")
+        with pytest.raises(ValueError, match="Slot saat ini tidak tersedia"):
+            svc.create_reservation(_request("m1-2", "14:00", "15:00"), "user")
+        svc.cancel_reservation(reservation["id"], "user", "user")
+        assert svc.get_slot_by_id("m1", "m1-2")["status"] == "maintenance"
+        assert svc.get_mall_by_id("m1")["available_slots"] == 2
+
+    # Test surge pricing sees occupancy changes from ticks
+    def test_refreshes_pricing(self):
+        svc = ParkingService()
+        svc.get_mall_by_id("pvj")["pricing"] = {"surge": {"threshold": 0.0}}
+        code = svc.pricing.mall_codes["pvj"]
+        svc.create_reservation(_request("pvj-1", "11:00", "12:00", "pvj"), "user")
+        before = float(svc.pricing._surge[code])
+        svc.occupancy.advance(11 * 60)
+        assert float(svc.pricing._surge[code]) > before
+
+    # Test sharded ticks reach every shard
+    def test_sharded_tick(self, frozen_clock, monkeypatch):
+        svc = ShardedParkingService(shards=2)
+        svc.create_reservation(_request("sumaba-1", "11:00", "12:00", "sumaba"), "user")
+        assert svc.is_slot_bookable("sumaba", "sumaba-1")
+        monkeypatch.setattr(
+            occupancy_service, "_wall_clock", lambda: frozen_clock.replace(hour=11)
+        )
+        svc.tick_occupancy()
+        assert svc.get_slot_by_id("sumaba", "sumaba-1")["status"] == "occupied"
+
+    # Test the lifespan ticker keeps going after a failed tick
+    @pytest.mark.asyncio
+    async def test_ticker(self, monkeypatch):
+        calls = []
+
+        def tick():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+
+        monkeypatch.setattr(main_module.parking_service, "tick_occupancy", tick)
+        task = asyncio.create_task(main_module.tick_occupancy_forever(0.001))
+        while len(calls) < 2:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        assert len(calls) >= 2
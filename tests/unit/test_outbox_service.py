@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+
+from app.services.outbox_service import Outbox, OutboxDispatcher, load_webhooks
+from app.services.parking_service import ParkingService
+
+
+def _reservation(n=0, mall_id="pvj"):
+    return {
+        "id": f"r{n}",
+        "mall_id": mall_id,
+        "slot_id": f"{mall_id}-1",
+        "vehicle_number": "D 1234 AB",
+        "phone": "081234567890",
+        "start_time": "09:00",
+        "end_time": "12:00",
+        "status": "confirmed",
+        "version": 1,
+        "created_at": "2026-01-05T09:00:00",
+    }
+
+
+class TestOutbox:
+
+    # Test webhook files are optional and must map malls to URLs
+    def test_load_webhooks(self, tmp_path):
+        assert load_webhooks(tmp_path / "missing.json") == {}
+        path = tmp_path / "webhooks.json"
+        path.write_text('{"pvj": "http://example.test/hook"}')
+        assert load_webhooks(path) == {"pvj": "http://example.test/hook"}
+        path.write_text("[]")
+        with pytest.raises(ValueError):
+            load_webhooks(path)
+
+    # Test events become a mall webhook without the phone and an SMS for the guest
+    def test_messages_for(self):
+        outbox = Outbox({"pvj": "http://hook"}, "http://sms")
+        webhook, sms = outbox.messages_for("created", _reservation())
+        assert webhook["destination"] == "http://hook"
+        assert webhook["payload"]["event"] == "created"
+        assert "phone" not in webhook["payload"]["reservation"]
+        assert sms["payload"]["to"] == "081234567890"
+        assert "dikonfirmasi" in sms["payload"]["message"]
+        assert [m["destination"] for m in outbox.messages_for("modified", _reservation())] == [
+            "http://hook"
+        ]
+        assert [m["destination"] for m in outbox.messages_for("created", _reservation(mall_id="sumaba"))] == [
+            "http://sms"
+        ]
+        assert Outbox().messages_for("created", _reservation()) == []
+
+    # Test reservation changes are recorded as they happen
+    def test_listener(self, sample_reservation_data):
+        svc = ParkingService()
+        outbox = Outbox({"pvj": "http://hook"}, "http://sms")
+        svc.add_listener(outbox.on_reservation_event)
+        reservation = svc.create_reservation(sample_reservation_data, "user", "user")
+        svc.cancel_reservation(reservation["id"], "user", "user")
+        stats = outbox.stats()
+        assert stats["recorded"] == 4
+        assert stats["pending"] == {"http://hook": 2, "http://sms": 2}
+
+
+class TestOutboxDispatcher:
+
+    # Test messages go out batched per destination, in order, over the pool
+    @pytest.mark.asyncio
+    async def test_delivers_batches(self, stub_receiver):
+        outbox = Outbox({"pvj": stub_receiver.url("/pvj")}, stub_receiver.url("/sms"))
+        for n in range(5):
+            outbox.on_reservation_event("created", _reservation(n), {})
+        dispatcher = OutboxDispatcher(outbox, workers=2, batch_size=2)
+        await dispatcher.start()
+        outbox.on_reservation_event("cancelled", _reservation(5), {})
+        assert await dispatcher.drain(5)
+        await dispatcher.stop()
+        webhooks = stub_receiver.messages("/pvj")
+        assert [m["reservation"]["id"] for m in webhooks] == [f"r{n}" for n in range(6)]
+        assert len(stub_receiver.messages("/sms")) == 6
+        assert all(len(batch["messages"]) <= 2 for _, batch in stub_receiver.batches)
+        stats = outbox.stats()
+        assert stats["delivered"] == 12 and stats["pending"] == {}
+
+    # Test failed batches retry after a backoff without reordering
+    @pytest.mark.asyncio
+    async def test_retries(self, stub_receiver):
+        stub_receiver.statuses = [503, 500]
+        outbox = Outbox({"pvj": stub_receiver.url("/pvj")})
+        for n in range(3):
+            outbox.on_reservation_event("created", _reservation(n), {})
+        dispatcher = OutboxDispatcher(outbox, batch_size=2, base_delay=0.01)
+        await dispatcher.start()
+        assert await dispatcher.drain(5)
+        await dispatcher.stop()
+        ids = [[m["reservation"]["id"] for m in batch["messages"]] for _, batch in stub_receiver.batches]
+        assert ids == [["r0", "r1"], ["r0", "r1"], ["r0", "r1"], ["r2"]]
+        assert outbox.stats()["retried"] == 2 and outbox.stats()["delivered"] == 3
+
+    # Test messages out of attempts land in the dead-letter queue and can be requeued
+    @pytest.mark.asyncio
+    async def test_dead_letters(self, stub_receiver):
+        stub_receiver.statuses = [500, 500]
+        outbox = Outbox({"pvj": stub_receiver.url("/pvj")})
+        outbox.on_reservation_event("created", _reservation(), {})
+        dispatcher = OutboxDispatcher(outbox, max_attempts=2, base_delay=0.01)
+        await dispatcher.start()
+        assert await dispatcher.drain(5)
+        assert outbox.stats()["dead_letters"] == 1
+        dead = outbox.dead_letters[0]
+        assert dead["attempts"] == 2 and dead["last_error"] == "HTTP 500"
+        assert outbox.requeue_dead_letters() == 1
+        assert await dispatcher.drain(5)
+        await dispatcher.stop()
+        assert outbox.stats()["dead_letters"] == 0
+        assert outbox.stats()["delivered"] == 1
+
+    # Test a full destination dead-letters new messages, requeued in recording order
+    def test_max_pending(self):
+        outbox = Outbox({"pvj": "http://hook"}, max_pending=2)
+        for n in range(4):
+            outbox.on_reservation_event("created", _reservation(n), {})
+        assert outbox.stats()["pending"] == {"http://hook": 2}
+        assert outbox.stats()["dead_letters"] == 2
+        destination = outbox.take_ready(0)[0]
+        assert [m["payload"]["reservation"]["id"] for m in outbox.batch(destination, 1)] == ["r0"]
+        outbox.on_reservation_event("created", _reservation(4), {})
+        assert outbox.requeue_dead_letters() == 3
+        pending = [m["payload"]["reservation"]["id"] for m in destination.pending]
+        assert pending == ["r0", "r1", "r2", "r3", "r4"]
+        outbox.acknowledge(destination, 1)
+        assert outbox.stats()["pending"] == {"http://hook": 4}
+        assert outbox.stats()["recorded"] == 5
+
+    # Test unreachable receivers count as failures rather than crashing workers
+    @pytest.mark.asyncio
+    async def test_connection_error(self, stub_receiver):
+        url = stub_receiver.url("/pvj")
+        stub_receiver.close()
+        outbox = Outbox({"pvj": url})
+        outbox.on_reservation_event("created", _reservation(), {})
+        dispatcher = OutboxDispatcher(outbox, max_attempts=1)
+        await dispatcher.start()
+        assert await dispatcher.drain(5)
+        await dispatcher.stop()
+        assert "ConnectError" in outbox.dead_letters[0]["last_error"]
+
+    # Test stop gives up on a destination that keeps failing after the timeout
+    @pytest.mark.asyncio
+    async def test_stop_timeout(self, stub_receiver):
+        stub_receiver.statuses = [500] * 10
+        outbox = Outbox({"pvj": stub_receiver.url("/pvj")})
+        outbox.on_reservation_event("created", _reservation(), {})
+        dispatcher = OutboxDispatcher(outbox, base_delay=10)
+        await dispatcher.start()
+        assert not await dispatcher.drain(0.2)
+        await dispatcher.stop(timeout=0)
+        assert outbox.stats()["pending"] == {stub_receiver.url("/pvj"): 1}
+        assert outbox._wakeup is None
+
+    # Test the backoff doubles per attempt up to the cap, with jitter below it
+    def test_backoff(self):
+        dispatcher = OutboxDispatcher(Outbox(), base_delay=1, max_delay=8)
+        assert 0.5 <= dispatcher.backoff(1) <= 1
+        assert 2 <= dispatcher.backoff(3) <= 4
+        assert 4 <= dispatcher.backoff(10) <= 8
+        asyncio.run(dispatcher.stop())
@@ -143,7 +143,7 @@ class TestParkingService:
             "phone": "08222222222",
             "time_slot": {"start_time": "10:00", "end_time": "12:00"},
         }
-        with pytest.raises(ValueError, match="Slot saat ini tidak tersedia"):
+        with pytest.raises(ValueError, match="Slot bentrok dengan reservasi"):
             parking_service.create_reservation(reservation_data2, "user2")
 
     # Test check slot availability
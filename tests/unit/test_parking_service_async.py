@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from app.services.parking_service import ParkingService
+from app.services.storage import ReservationStorage
+
+
+class RecordingStorage(ReservationStorage):
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.saved = []
+        self.updated = []
+
+    async def save_reservation(self, reservation):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise OSError("storage unavailable")
+        self.saved.append(reservation["id"])
+
+    async def update_reservation(self, reservation):
+        await asyncio.sleep(self.delay)
+        self.updated.append((reservation["id"], reservation["status"]))
+
+
+class FailingUpdateStorage(RecordingStorage):
+    """Saves succeed, updates fail."""
+
+    async def update_reservation(self, reservation):
+        raise OSError("storage unavailable")
+
+
+class BarrierStorage(RecordingStorage):
+    """Saves that only complete once ``parties`` of them are in flight."""
+
+    def __init__(self, parties):
+        super().__init__()
+        self.barrier = asyncio.Barrier(parties)
+
+    async def save_reservation(self, reservation):
+        await self.barrier.wait()
+        self.saved.append(reservation["id"])
+
+
+def reservation_data(slot_id="pvj-1", start="09:00", end="12:00"):
+    return {
+        "mall_id": "pvj",
+        "slot_id": slot_id,
+        "user_name": "Test User",
+        "vehicle_number": "B1234XYZ",
+        "phone": "08123456789",
+        "time_slot": {"start_time": start, "end_time": end},
+    }
+
+
+class TestAsyncParkingService:
+
+    # Test async create and cancel call storage hooks
+    @pytest.mark.asyncio
+    async def test_storage_hooks_called(self):
+        storage = RecordingStorage()
+        svc = ParkingService(storage=storage)
+        reservation = await svc.create_reservation_async(reservation_data(), "user")
+        assert storage.saved == [reservation["id"]]
+        result = await svc.cancel_reservation_async(reservation["id"], "user", "user")
+        assert result["message"] == "Reservasi berhasil dibatalkan"
+        assert storage.updated == [(reservation["id"], "cancelled")]
+        assert svc.get_reservation_by_id(reservation["id"])["status"] == "cancelled"
+
+    # Test storage failure aborts the mutation
+    @pytest.mark.asyncio
+    async def test_storage_failure_aborts(self):
+        svc = ParkingService(storage=RecordingStorage(fail=True))
+        with pytest.raises(IOError):
+            await svc.create_reservation_async(reservation_data(), "user")
+        assert svc.get_all_reservations() == []
+        assert svc.get_slot_by_id("pvj", "pvj-1")["status"] == "available"
+
+    # Test a failing update hook leaves cancel and modify unapplied and unannounced
+    @pytest.mark.asyncio
+    async def test_update_failure_aborts(self):
+        svc = ParkingService(storage=FailingUpdateStorage())
+        reservation = await svc.create_reservation_async(reservation_data(), "user")
+        with pytest.raises(IOError):
+            await svc.cancel_reservation_async(reservation["id"], "user", "user")
+        with pytest.raises(IOError):
+            await svc.modify_reservation_async(
+                reservation["id"], {"phone": "08111111111"}, "user", "user"
+            )
+        assert svc.get_reservation_by_id(reservation["id"]) is reservation
+        assert (reservation["status"], reservation["version"]) == ("confirmed", 1)
+        assert reservation["phone"] == "08123456789"
+        events = [change["event"] for change in svc.get_changes(0)["changes"]]
+        assert events == ["created"]
+        assert svc.get_mall_by_id("pvj")["available_slots"] == 11
+
+    # Test concurrent writers of the same slot are serialised
+    @pytest.mark.asyncio
+    async def test_same_slot_serialised(self):
+        svc = ParkingService(storage=RecordingStorage(delay=0.01))
+        results = await asyncio.gather(
+            svc.create_reservation_async(reservation_data(), "user1"),
+            svc.create_reservation_async(reservation_data(), "user2"),
+            return_exceptions=True,
+        )
+        assert sum(isinstance(r, ValueError) for r in results) == 1
+        assert len(svc.get_all_reservations()) == 1
+
+    # Test writers of different slots run concurrently
+    @pytest.mark.asyncio
+    async def test_different_slots_concurrent(self):
+        slots = ("pvj-1", "pvj-2", "pvj-4", "pvj-5")
+        storage = BarrierStorage(len(slots))
+        svc = ParkingService(storage=storage)
+        # Every save must be inside its slot lock at once for the barrier to
+        # open; the timeout only turns a deadlock into a failure
+        await asyncio.wait_for(
+            asyncio.gather(
+                *(svc.create_reservation_async(reservation_data(slot), "user") for slot in slots)
+            ),
+            timeout=5,
+        )
+        assert len(storage.saved) == 4
+        assert len(svc.get_all_reservations()) == 4
+
+    # Test concurrent cancels apply only once
+    @pytest.mark.asyncio
+    async def test_concurrent_cancel(self):
+        svc = ParkingService(storage=RecordingStorage(delay=0.01))
+        reservation = await svc.create_reservation_async(reservation_data(), "user")
+        results = await asyncio.gather(
+            svc.cancel_reservation_async(reservation["id"], "user", "user"),
+            svc.cancel_reservation_async(reservation["id"], "user", "user"),
+            return_exceptions=True,
+        )
+        assert sum(isinstance(r, ValueError) for r in results) == 1
+        assert svc.get_mall_by_id("pvj")["available_slots"] == 12
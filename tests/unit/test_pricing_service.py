@@ -0,0 +1,124 @@
+import pytest
+
+from app.services import parking_service
+from app.services.parking_service import ParkingService
+from app.services.pricing_service import PricingEngine
+from app.services.shard_service import ShardedParkingService
+
+
+def _mall(mall_id="m1", **pricing):
+    return {
+        "id": mall_id,
+        "base_price": 6000,
+        "total_slots": 10,
+        "available_slots": 10,
+        "pricing": pricing or None,
+    }
+
+
+class TestPricingEngine:
+
+    # Test flat malls cost base price per hour
+    def test_flat_quote(self):
+        engine = PricingEngine([_mall()])
+        assert engine.quote("m1", 9 * 60, 180) == 18000
+
+    # Test hourly multipliers apply per minute of the window
+    def test_hourly_multipliers(self):
+        hourly = [1.0] * 24
+        hourly[10] = 2.0
+        engine = PricingEngine([_mall(hourly_multipliers=hourly)])
+        # 09:30-11:30: 30 min at 1x, 60 min at 2x, 30 min at 1x
+        assert engine.quote("m1", 9 * 60 + 30, 120) == 18000
+
+    # Test windows wrapping past midnight use the next day's prices
+    def test_quote_wraps_midnight(self):
+        hourly = [1.0] * 24
+        hourly[0] = 3.0
+        engine = PricingEngine([_mall(hourly_multipliers=hourly)])
+        assert engine.quote("m1", 23 * 60, 120) == 6000 + 18000
+
+    # Test surge ramps with occupancy and refreshes incrementally
+    def test_surge_refresh(self):
+        mall = _mall(surge={"threshold": 0.5, "max_multiplier": 2.0})
+        engine = PricingEngine([mall])
+        assert engine.quote("m1", 0, 60) == 6000
+        mall["available_slots"] = 2  # 80% occupied: 60% along the ramp
+        engine.on_reservation_event("created", {"mall_id": "m1"}, {})
+        assert engine.quote("m1", 0, 60) == 9600
+        assert engine.surge_factors() == {"m1": 1.6}
+
+    # Test batch quotes match single quotes
+    def test_quote_batch(self):
+        hourly = [1.0 + h / 24 for h in range(24)]
+        engine = PricingEngine([_mall("a"), _mall("b", hourly_multipliers=hourly)])
+        starts, minutes = [0, 600, 1380], [60, 180, 120]
+        prices = engine.quote_batch(["b", "a"], starts, minutes)
+        assert prices.shape == (2, 3)
+        for row, mall_id in enumerate(["b", "a"]):
+            for col in range(3):
+                assert prices[row, col] == engine.quote(mall_id, starts[col], minutes[col])
+
+    # Test re-registering a mall rebuilds its table
+    def test_register_mall_rebuilds(self):
+        mall = _mall()
+        engine = PricingEngine([mall])
+        assert engine.register_mall({**mall, "base_price": 1200}) == 0
+        assert engine.quote("m1", 0, 60) == 1200
+
+    # Test malls added later grow the tables and keep earlier rows
+    def test_register_mall_grows(self):
+        engine = PricingEngine([_mall("a"), _mall("b")])
+        assert engine._cumulative.shape[0] == 2
+        for index, mall_id in enumerate("cde"):
+            assert engine.register_mall({**_mall(mall_id), "base_price": 1200}) == index + 2
+        assert engine._cumulative.shape[0] == 8
+        assert engine.quote("a", 0, 60) == 6000
+        assert engine.quote("e", 0, 60) == 1200
+
+    # Test invalid multipliers and windows are rejected
+    def test_invalid_input(self):
+        with pytest.raises(ValueError):
+            PricingEngine([_mall(hourly_multipliers=[1.0] * 23)])
+        engine = PricingEngine([_mall()])
+        with pytest.raises(ValueError):
+            engine.quote_batch(["m1"], [1439], [2000])
+
+
+class TestDynamicReservationPricing:
+
+    # Test reservations at opted-in malls use the price table
+    def test_reservation_uses_dynamic_price(self, parking_service):
+        mall = parking_service.get_mall_by_id("pvj")
+        hourly = [1.0] * 24
+        hourly[9] = 2.0
+        mall["pricing"] = {"hourly_multipliers": hourly}
+        reservation = parking_service.create_reservation(
+            {
+                "mall_id": "pvj",
+                "slot_id": "pvj-1",
+                "user_name": "Test",
+                "vehicle_number": "D 1234 ABC",
+                "phone": "081234567890",
+                "time_slot": {"start_time": "09:00", "end_time": "11:00"},
+            },
+            "user",
+        )
+        assert reservation["total_price"] == 15000
+
+    # Test quotes reject unknown malls
+    def test_quotes_unknown_mall(self):
+        service = ParkingService()
+        windows = [{"start_time": "09:00", "end_time": "10:00"}]
+        assert service.get_price_quotes(["nope"], windows) is None
+        assert service.get_price_quotes(None, windows)["quotes"]["pvj"] == [5000]
+
+    # Test omitting mall_ids still respects the quote cap
+    def test_quotes_capped(self, monkeypatch):
+        monkeypatch.setattr(parking_service, "MAX_PRICE_QUOTES", 2)
+        windows = [{"start_time": "09:00", "end_time": "10:00"}]
+        with pytest.raises(ValueError):
+            ParkingService().get_price_quotes(None, windows)
+        with pytest.raises(ValueError):
+            ShardedParkingService(2).get_price_quotes(None, windows)
+        assert ParkingService().get_price_quotes(["pvj", "paskal"], windows)
@@ -0,0 +1,155 @@
+import asyncio
+import sys
+
+import anyio.to_thread
+import pytest
+
+from app.utils.profiling import (
+    ProfileStore,
+    RequestProfilerMiddleware,
+    RequestTracer,
+    StackSampler,
+    _active_sampler,
+    collapse,
+    install_threadpool_hook,
+    remove_threadpool_hook,
+)
+
+
+def own_work():
+    return sum(range(1000))
+
+
+def other_work():
+    return sum(range(1000))
+
+
+def threadpool_work(sampler):
+    while sampler.samples < 3:
+        sum(range(1000))
+
+
+class TestRequestTracer:
+
+    # Test only the traced task's calls are recorded, with built-ins
+    @pytest.mark.asyncio
+    async def test_traces_own_task(self):
+        async def other_request():
+            other_work()
+
+        tracer = RequestTracer(asyncio.current_task())
+        tracer.start()
+        own_work()
+        await asyncio.create_task(other_request())
+        tracer.stop()
+        collapsed = collapse(tracer.totals)
+        assert "test_traces_own_task (test_profiling.py:" in collapsed
+        assert "own_work (test_profiling.py:" in collapsed
+        line = own_work.__code__.co_firstlineno
+        assert f"own_work (test_profiling.py:{line});sum (built-in)" in collapsed
+        assert "other_work" not in collapsed
+
+    # Test the profile hook is restored after the last of several tracers
+    @pytest.mark.asyncio
+    async def test_restores_hook(self):
+        assert sys.getprofile() is None
+        first = RequestTracer(asyncio.current_task())
+        first.start()
+
+        async def second_request():
+            second = RequestTracer(asyncio.current_task())
+            second.start()
+            own_work()
+            second.stop()
+            return second
+
+        second = await asyncio.create_task(second_request())
+        assert sys.getprofile() is not None
+        first.stop()
+        assert sys.getprofile() is None
+        assert "own_work" in collapse(second.totals)
+        assert "second_request" not in collapse(first.totals)
+
+
+class TestStackSampler:
+
+    # Test threadpool calls of the profiled request are sampled, others not
+    @pytest.mark.asyncio
+    async def test_samples_request_threadpool(self):
+        original = anyio.to_thread.run_sync
+        install_threadpool_hook()
+        sampler = StackSampler("r1", interval=0.001)
+        token = _active_sampler.set(sampler)
+        sampler.start()
+        try:
+            await anyio.to_thread.run_sync(threadpool_work, sampler)
+        finally:
+            _active_sampler.reset(token)
+        other = StackSampler("r2", interval=0.001)
+        other.start()
+        await anyio.to_thread.run_sync(threadpool_work, sampler)
+        remove_threadpool_hook()
+        assert anyio.to_thread.run_sync is original
+        sampler.stop()
+        other.stop()
+        collapsed = collapse(sampler.totals)
+        assert "threadpool_work (test_profiling.py:" in collapsed
+        assert other.samples == 0
+        assert not sampler._workers
+
+    # Test the GIL switch interval only changes when asked, and is restored
+    def test_switch_interval_opt_in(self):
+        original = sys.getswitchinterval()
+        sampler = StackSampler("r")
+        sampler.start()
+        assert sys.getswitchinterval() == original
+        sampler.stop()
+        first = StackSampler("r", switch_interval=0.0001)
+        second = StackSampler("r", switch_interval=0.0001)
+        first.start()
+        second.start()
+        assert sys.getswitchinterval() == pytest.approx(0.0001)
+        first.stop()
+        assert sys.getswitchinterval() == pytest.approx(0.0001)
+        second.stop()
+        assert sys.getswitchinterval() == original
+
+
+class TestCollapse:
+
+    # Test stacks are written heaviest first in microseconds, dropping empty ones
+    def test_collapse(self):
+        totals = {("a", "b"): 0.000002, ("a",): 0.001, ("c",): 0.0000001}
+        assert collapse(totals) == "a 1000\na;b 2"
+
+
+class TestProfileStore:
+
+    # Test store is bounded and lists newest first
+    def test_bounded_store(self):
+        store = ProfileStore(max_reports=2)
+        for i in range(3):
+            store.add({"id": str(i), "collapsed": "a 1"})
+        assert store.get("0") is None
+        assert store.get("2")["collapsed"] == "a 1"
+        assert [r["id"] for r in store.summaries()] == ["2", "1"]
+        assert "collapsed" not in store.summaries()[0]
+
+
+class TestSampleRate:
+
+    # Test sampling rate parsed from header or query string
+    @pytest.mark.parametrize(
+        "headers,query,rate",
+        [
+            ([(b"x-profile", b"0.25")], b"", 0.25),
+            ([], b"profile=1", 1.0),
+            ([], b"profile=true", 1.0),
+            ([], b"profile=5", 1.0),
+            ([], b"profile=nope", 0.0),
+            ([], b"", 0.0),
+        ],
+    )
+    def test_sample_rate(self, headers, query, rate):
+        scope = {"headers": headers, "query_string": query}
+        assert RequestProfilerMiddleware._sample_rate(scope) == rate
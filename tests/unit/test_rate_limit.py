@@ -0,0 +1,115 @@
+import pytest
+
+from app.utils.rate_limit import (
+    RateLimitMiddleware,
+    RateLimitPolicy,
+    TokenBucketLimiter,
+)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucketLimiter:
+
+    # Test burst capacity then rejection with retry hint
+    def test_burst_then_reject(self):
+        clock = FakeClock()
+        limiter = TokenBucketLimiter(clock=clock)
+        policy = RateLimitPolicy("login", 3, 60)
+        assert [limiter.acquire(policy, "ip:1")[0] for _ in range(3)] == [True] * 3
+        allowed, retry_after = limiter.acquire(policy, "ip:1")
+        assert allowed is False
+        assert retry_after == pytest.approx(20.0)
+        assert limiter.acquire(policy, "ip:2")[0] is True
+
+    # Test lazy refill from elapsed time
+    def test_lazy_refill(self):
+        clock = FakeClock()
+        limiter = TokenBucketLimiter(clock=clock)
+        policy = RateLimitPolicy("login", 2, 10)
+        limiter.acquire(policy, "k")
+        limiter.acquire(policy, "k")
+        assert limiter.acquire(policy, "k")[0] is False
+        clock.now = 5.0
+        assert limiter.acquire(policy, "k")[0] is True
+        assert limiter.acquire(policy, "k")[0] is False
+
+    # Test key cap evicts least recently used buckets
+    def test_max_keys_eviction(self):
+        limiter = TokenBucketLimiter(max_keys=2, clock=FakeClock())
+        policy = RateLimitPolicy("default", 5, 60)
+        for key in ("a", "b", "c"):
+            limiter.acquire(policy, key)
+        assert limiter.stats()["tracked_keys"] == 2
+        assert limiter.evicted == 1
+        assert ("default", "a") not in limiter._buckets
+
+    # Test idle buckets are evicted
+    def test_idle_eviction(self):
+        clock = FakeClock()
+        limiter = TokenBucketLimiter(idle_seconds=60, clock=clock)
+        policy = RateLimitPolicy("default", 5, 60)
+        limiter.acquire(policy, "a")
+        clock.now = 61
+        limiter.acquire(policy, "b")
+        assert limiter.stats()["tracked_keys"] == 1
+
+    # Test counters and reset
+    def test_stats_and_reset(self):
+        limiter = TokenBucketLimiter(clock=FakeClock())
+        policy = RateLimitPolicy("login", 1, 60)
+        limiter.acquire(policy, "a")
+        limiter.acquire(policy, "a")
+        assert limiter.stats()["policies"] == {"login": {"allowed": 1, "rejected": 1}}
+        limiter.reset()
+        assert limiter.stats() == {"policies": {}, "tracked_keys": 0, "evicted": 0}
+
+
+class TestRateLimitMiddleware:
+
+    # Test route templates and default policy selection
+    def test_policy_matching(self):
+        login = RateLimitPolicy("login", 5, 60)
+        middleware = RateLimitMiddleware(
+            None, TokenBucketLimiter(), rules=[("POST", "/login", login)]
+        )
+        assert middleware._policy("POST", "/login") is login
+        assert middleware._policy("GET", "/login") is None
+        assert middleware.limiter.idle_seconds == 60
+
+    # Test forwarded client IP used only when trusted
+    def test_forwarded_client_key(self):
+        scope = {
+            "headers": [(b"x-forwarded-for", b"10.0.0.1, 172.16.0.1")],
+            "client": ("127.0.0.1", 5000),
+        }
+        trusted = RateLimitMiddleware(None, TokenBucketLimiter(), [], trust_forwarded=True)
+        untrusted = RateLimitMiddleware(None, TokenBucketLimiter(), [])
+        assert trusted._client_key(scope) == "ip:10.0.0.1"
+        assert untrusted._client_key(scope) == "ip:127.0.0.1"
+        assert untrusted._client_key({"headers": []}) == "ip:unknown"
+
+    # Test OPTIONS requests bypass the limiter
+    @pytest.mark.asyncio
+    async def test_options_exempt(self):
+        calls = []
+
+        async def app(scope, receive, send):
+            calls.append(scope["method"])
+
+        limiter = TokenBucketLimiter()
+        middleware = RateLimitMiddleware(
+            app, limiter, [], default=RateLimitPolicy("default", 1, 60)
+        )
+        scope = {"type": "http", "method": "OPTIONS", "path": "/", "headers": []}
+        for _ in range(3):
+            await middleware(scope, None, None)
+        assert calls == ["OPTIONS"] * 3
+        assert limiter.stats()["tracked_keys"] == 0
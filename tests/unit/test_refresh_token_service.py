@@ -0,0 +1,78 @@
+import pytest
+
+from app.services import refresh_token_service
+from app.services.refresh_token_service import RefreshTokenStore
+from app.utils.auth import TokenError
+
+
+class TestRefreshTokenStore:
+
+    # Test only keyed digests of the opaque tokens are stored
+    def test_stores_digests(self):
+        store = RefreshTokenStore(secret="s")
+        token = store.issue("user")
+        assert len(token) >= 43
+        assert token not in store._tokens
+        assert store._digest(token) in store._tokens
+        assert RefreshTokenStore(secret="t")._digest(token) != store._digest(token)
+
+    # Test each refresh spends the token and hands out its successor
+    def test_rotation(self):
+        store = RefreshTokenStore()
+        first = store.issue("user")
+        second, username = store.rotate(first)
+        third, _ = store.rotate(second)
+        assert username == "user"
+        assert len({first, second, third}) == 3
+        assert len(store._families) == 1
+
+    # Test replaying a spent token revokes the whole family
+    def test_reuse_detection(self):
+        store = RefreshTokenStore()
+        first = store.issue("user")
+        second, _ = store.rotate(first)
+        other = store.issue("user")
+        with pytest.raises(TokenError):
+            store.rotate(first)
+        with pytest.raises(TokenError):
+            store.rotate(second)
+        assert store.reuse_detected == 1
+        store.rotate(other)
+
+    # Test unknown and revoked tokens are rejected
+    def test_revoke(self):
+        store = RefreshTokenStore()
+        token = store.issue("user")
+        with pytest.raises(TokenError):
+            store.rotate("not-a-token")
+        assert store.revoke(token)
+        assert not store.revoke(token)
+        with pytest.raises(TokenError):
+            store.rotate(token)
+
+    # Test families expire a fixed time after login, even when refreshed
+    def test_expiry(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(refresh_token_service.time, "time", lambda: now[0])
+        store = RefreshTokenStore(ttl=60)
+        token = store.issue("user")
+        now[0] += 50
+        token, _ = store.rotate(token)
+        now[0] += 10
+        with pytest.raises(TokenError):
+            store.rotate(token)
+        assert store._tokens == {}
+
+    # Test expired families are swept once the store grows
+    def test_purge(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(refresh_token_service.time, "time", lambda: now[0])
+        store = RefreshTokenStore(ttl=60)
+        store._next_purge = 3
+        store.issue("a")
+        store.issue("b")
+        now[0] += 60
+        store.issue("c")
+        store.issue("d")
+        assert {r["username"] for r in store._tokens.values()} == {"c", "d"}
+        assert store._next_purge == 1024
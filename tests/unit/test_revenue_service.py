@@ -0,0 +1,104 @@
+from datetime import datetime
+
+import pytest
+
+from app.services import revenue_service
+from app.services.parking_service import ParkingService
+from app.services.revenue_service import RevenueRollup
+from app.services.shard_service import ShardedParkingService
+from app.utils.fenwick import FenwickTree
+
+
+class TestFenwickTree:
+
+    # Test prefix and range sums
+    def test_range_sum(self):
+        tree = FenwickTree.from_values([1, 2, 3, 4, 5])
+        assert tree.prefix_sum(5) == 15
+        assert tree.range_sum(1, 4) == 9
+        assert tree.range_sum(3, 3) == 0
+        tree.add(2, 10)
+        assert tree.range_sum(0, 3) == 16
+
+    # Test out of range update rejected
+    def test_add_out_of_range(self):
+        tree = FenwickTree(3)
+        with pytest.raises(IndexError):
+            tree.add(3, 1)
+
+
+class TestRevenueRollup:
+
+    # Test hourly buckets with cancellation
+    def test_hourly_buckets(self):
+        rollup = RevenueRollup()
+        rollup.add("pvj", datetime(2025, 1, 6, 9, 15), 15000)
+        rollup.add("pvj", datetime(2025, 1, 6, 9, 45), 5000)
+        rollup.add("pvj", datetime(2025, 1, 6, 11, 0), 10000)
+        rollup.add("pvj", datetime(2025, 1, 6, 9, 15), -15000)
+        result = rollup.query(datetime(2025, 1, 6, 9, 30), datetime(2025, 1, 6, 12))
+        buckets = result["malls"]["pvj"]["buckets"]
+        assert [b["revenue"] for b in buckets] == [5000, 0, 10000]
+        assert result["total"] == 15000
+        assert result["start"] == "2025-01-06T09:00:00"
+
+    # Test daily buckets across tree growth and rebasing
+    def test_daily_buckets_grow_and_rebase(self):
+        rollup = RevenueRollup()
+        rollup.add("pvj", datetime(2025, 3, 1, 10), 1000)
+        rollup.add("pvj", datetime(2025, 6, 1, 10), 2000)
+        rollup.add("paskal", datetime(2025, 1, 1, 10), 3000)
+        result = rollup.query(
+            datetime(2025, 1, 1), datetime(2025, 6, 2), granularity="day"
+        )
+        assert result["malls"]["pvj"]["total"] == 3000
+        assert result["malls"]["paskal"]["buckets"][0]["revenue"] == 3000
+        assert result["total"] == 6000
+
+    # Test query validation
+    def test_query_validation(self):
+        rollup = RevenueRollup()
+        with pytest.raises(ValueError):
+            rollup.query(datetime(2025, 1, 2), datetime(2025, 1, 1))
+        with pytest.raises(ValueError):
+            rollup.query(datetime(2025, 1, 1), datetime(2025, 1, 2), "week")
+        with pytest.raises(ValueError):
+            rollup.query(datetime(2000, 1, 1), datetime(2025, 1, 1))
+
+    # Test queries over every mall respect the total bucket cap
+    def test_query_capped(self, monkeypatch):
+        monkeypatch.setattr(revenue_service, "MAX_REVENUE_CELLS", 4)
+        start = datetime(2025, 1, 1)
+        with pytest.raises(ValueError):
+            ParkingService().get_revenue_rollup(start, datetime(2025, 1, 1, 2))
+        with pytest.raises(ValueError):
+            ShardedParkingService(2).get_revenue_rollup(start, datetime(2025, 1, 1, 2))
+        rollup = ParkingService().get_revenue_rollup(start, datetime(2025, 1, 1, 4), mall_id="pvj")
+        assert len(rollup["malls"]["pvj"]["buckets"]) == 4
+
+    # Test empty rollup returns zeros
+    def test_query_empty(self):
+        rollup = RevenueRollup()
+        result = rollup.query(
+            datetime(2025, 1, 1), datetime(2025, 1, 1, 2), mall_ids=["pvj"]
+        )
+        assert result["malls"]["pvj"]["total"] == 0
+
+    # Test parking service maintains rollups
+    def test_parking_service_rollup(self, parking_service, sample_reservation_data):
+        reservation = parking_service.create_reservation(
+            sample_reservation_data, "user"
+        )
+        created = datetime.fromisoformat(reservation["created_at"])
+        result = parking_service.get_revenue_rollup(
+            created.replace(hour=0, minute=0), created.replace(hour=23, minute=59)
+        )
+        assert result["malls"]["pvj"]["total"] == 15000
+        assert result["malls"]["paskal"]["total"] == 0
+        parking_service.cancel_reservation(reservation["id"], "user", "user")
+        result = parking_service.get_revenue_rollup(
+            created.replace(hour=0, minute=0), created.replace(hour=23, minute=59),
+            "day", "pvj",
+        )
+        assert result["total"] == 0
+        assert parking_service.get_revenue_rollup(created, created, mall_id="x") is None
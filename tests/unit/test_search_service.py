@@ -0,0 +1,122 @@
+import pytest
+
+from app.services.search_service import (
+    ReservationIndex,
+    normalize_phone,
+    normalize_plate,
+)
+
+
+def _reservation(n, **overrides):
+    reservation = {
+        "id": f"r{n}",
+        "mall_id": "pvj",
+        "slot_id": "pvj-1",
+        "user_name": "Budi Santoso",
+        "vehicle_number": "D 1234 ABC",
+        "phone": "081234567890",
+        "start_time": "09:00",
+        "end_time": "11:00",
+        "status": "confirmed",
+    }
+    reservation.update(overrides)
+    return reservation
+
+
+@pytest.fixture
+def index():
+    index = ReservationIndex()
+    index.add(_reservation(1))
+    index.add(_reservation(2, vehicle_number="D-1299-XY", user_name="budi  Hartono"))
+    index.add(
+        _reservation(
+            3,
+            mall_id="paskal",
+            vehicle_number="B 777 ZZ",
+            user_name="Siti",
+            phone="+62 812 0000 1111",
+            start_time="22:00",
+            end_time="01:00",
+        )
+    )
+    return index
+
+
+def _ids(results):
+    return [r["id"] for r in results]
+
+
+class TestNormalization:
+
+    # Test plates and phones are normalised
+    def test_normalize(self):
+        assert normalize_plate("d 1234-abc") == "D1234ABC"
+        assert normalize_phone("+62 812-0000") == "08120000"
+        assert normalize_phone("0812 0000") == "08120000"
+
+
+class TestReservationIndex:
+
+    # Test exact plate lookup ignores formatting
+    def test_exact_plate(self, index):
+        assert _ids(index.search(vehicle_number="d1234abc")) == ["r1"]
+
+    # Test plate and name prefixes
+    def test_prefixes(self, index):
+        assert _ids(index.search(vehicle_prefix="D 12")) == ["r1", "r2"]
+        assert _ids(index.search(name_prefix="BUDI")) == ["r1", "r2"]
+        assert _ids(index.search(name_prefix="budi h")) == ["r2"]
+
+    # Test phone lookup accepts the country code
+    def test_phone(self, index):
+        assert _ids(index.search(phone="0812-0000-1111")) == ["r3"]
+
+    # Test combined filters intersect
+    def test_combined_filters(self, index):
+        assert _ids(index.search(name_prefix="budi", vehicle_prefix="D129")) == ["r2"]
+        assert index.search(mall_id="paskal", name_prefix="budi") == []
+
+    # Test status sets follow cancellations
+    def test_status_update(self, index):
+        cancelled = {**_reservation(1), "status": "cancelled"}
+        index.on_reservation_event("cancelled", cancelled, {})
+        assert _ids(index.search(status="cancelled")) == ["r1"]
+        assert _ids(index.search(status="confirmed")) == ["r2", "r3"]
+
+    # Test time window overlap, including windows past midnight
+    def test_time_window(self, index):
+        assert _ids(index.search(start_time="10:30", end_time="12:00")) == ["r1", "r2"]
+        assert _ids(index.search(start_time="23:00", end_time="23:30")) == ["r3"]
+
+    # Test limit caps results
+    def test_limit(self, index):
+        assert _ids(index.search(mall_id="pvj", limit=1)) == ["r1"]
+
+    # Test invalid filter combinations
+    def test_invalid_filters(self, index):
+        with pytest.raises(ValueError):
+            index.search()
+        with pytest.raises(ValueError):
+            index.search(start_time="09:00")
+
+
+class TestParkingServiceIndexes:
+
+    # Test lookups go through the ID and per-slot indexes
+    def test_service_indexes(self, parking_service):
+        data = {
+            "mall_id": "pvj",
+            "slot_id": "pvj-1",
+            "user_name": "Test",
+            "vehicle_number": "D 1 AB",
+            "phone": "081234567890",
+            "time_slot": {"start_time": "09:00", "end_time": "10:00"},
+        }
+        reservation = parking_service.create_reservation(data, "user")
+        assert parking_service.get_reservation_by_id(reservation["id"]) is reservation
+        assert parking_service.check_availability("pvj", "pvj-1", "09:30", "10:30") == (
+            False,
+            [reservation["id"]],
+        )
+        assert parking_service.check_availability("pvj", "pvj-2", "09:30", "10:30")[0]
+        assert parking_service.search_reservations(vehicle_number="d1ab") == [reservation]
@@ -0,0 +1,59 @@
+import asyncio
+
+from app.utils.server_timing import (
+    ServerTiming,
+    ServerTimingMiddleware,
+    current_timing,
+    timing_span,
+)
+
+
+def _metrics(header):
+    return {entry.split(";")[0]: entry for entry in header.split(", ")}
+
+
+class TestServerTiming:
+
+    # Test header lists spans and derived phases in milliseconds
+    def test_header_value(self):
+        timing = ServerTiming()
+        timing.started = 10.0
+        timing.add("auth", 0.002)
+        timing.add("svc", 0.004, "create_reservation")
+        timing.handler_started = 10.005
+        timing.handler_finished = 10.010
+        metrics = _metrics(timing.header_value(now=10.012))
+        assert metrics["auth"] == "auth;dur=2.000"
+        assert metrics["svc"] == 'svc;desc="create_reservation";dur=4.000'
+        assert metrics["validate"] == "validate;dur=3.000"
+        assert metrics["serialize"] == "serialize;dur=2.000"
+        assert metrics["total"] == "total;dur=12.000"
+
+    # Test only total is reported when no handler ran
+    def test_header_without_handler(self):
+        timing = ServerTiming()
+        assert list(_metrics(timing.header_value())) == ["total"]
+
+    # Test spans outside a request are no-ops
+    def test_span_without_request(self):
+        assert current_timing() is None
+        with timing_span("svc", "noop"):
+            pass
+
+    # Test middleware adds the header and clears the collector
+    def test_middleware_adds_header(self):
+        messages = []
+
+        async def app(scope, receive, send):
+            with timing_span("svc", "inner"):
+                pass
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(ServerTimingMiddleware(app)({"type": "http"}, None, send))
+        headers = dict(messages[0]["headers"])
+        assert b'svc;desc="inner"' in headers[b"server-timing"]
+        assert current_timing() is None
@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.catalog_service import Catalog
+from app.services.shard_service import HashRing, ShardedParkingService
+
+
+def _catalog(malls=12, slots_per_mall=2):
+    return Catalog(
+        [
+            {
+                "id": f"m{n}",
+                "name": f"Mall {n}",
+                "latitude": -6.9 + n * 0.01,
+                "longitude": 107.6,
+                "base_price": 5000,
+                "total_slots": slots_per_mall,
+                "available_slots": slots_per_mall,
+            }
+            for n in range(malls)
+        ],
+        [
+            {"id": f"m{n}-{s}", "mall_id": f"m{n}", "name": f"A-{s}", "status": "available"}
+            for n in range(malls)
+            for s in range(slots_per_mall)
+        ],
+    )
+
+
+def _request(mall_id, slot_id, start="09:00", end="10:00"):
+    return {
+        "mall_id": mall_id,
+        "slot_id": slot_id,
+        "user_name": "Test",
+        "vehicle_number": f"D {mall_id}",
+        "phone": "08123456789",
+        "time_slot": {"start_time": start, "end_time": end},
+    }
+
+
+@pytest.fixture
+def sharded():
+    svc = ShardedParkingService(3, catalog=_catalog())
+    for n in range(12):
+        svc.create_reservation(_request(f"m{n}", f"m{n}-0"), "user")
+    return svc
+
+
+class TestHashRing:
+
+    # Test keys map deterministically and spread over shards
+    def test_distribution(self):
+        ring = HashRing(4)
+        owners = [ring.shard_for(f"mall-{n}") for n in range(1000)]
+        assert owners == [HashRing(4).shard_for(f"mall-{n}") for n in range(1000)]
+        assert all(150 < owners.count(shard) < 350 for shard in range(4))
+
+    # Test adding a shard moves only a fraction of the keys
+    def test_minimal_movement(self):
+        before, after = HashRing(4), HashRing(5)
+        moved = sum(
+            before.shard_for(f"mall-{n}") != after.shard_for(f"mall-{n}")
+            for n in range(1000)
+        )
+        assert moved < 350
+
+    # Test at least one shard is required
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            HashRing(0)
+
+
+class TestShardedParkingService:
+
+    # Test malls and slots live only in their own shard
+    def test_partitioned(self, sharded):
+        for mall in sharded.get_all_malls():
+            owner = sharded.shard_for(mall["id"])
+            assert [s for s in sharded.shards if s.get_mall_by_id(mall["id"])] == [owner]
+        assert [m["id"] for m in sharded.get_all_malls()] == [f"m{n}" for n in range(12)]
+        assert sharded.get_slot_by_id("m3", "m3-0")["status"] == "occupied"
+        assert sharded.get_mall_by_id("m3")["available_slots"] == 1
+        assert len(sharded.get_slots_by_mall("m3")) == 2
+
+    # Test reservations are found and cancelled through the router
+    def test_reservation_routing(self, sharded):
+        reservation = sharded.create_reservation(_request("m5", "m5-1"), "user")
+        assert sharded.get_reservation_by_id(reservation["id"]) is reservation
+        assert sharded.check_slot_availability("m5", "m5-1", "09:30", "10:30") is False
+        assert sharded.check_availability("m5", "m5-1", "11:00", "12:00")[0] is True
+        sharded.modify_reservation(reservation["id"], {"phone": "08111111111"}, "user", "user")
+        sharded.cancel_reservation(reservation["id"], "user", "user", expected_version=2)
+        assert sharded.get_slot_by_id("m5", "m5-1")["status"] == "available"
+        assert sharded.get_reservation_by_id("missing") is None
+        with pytest.raises(ValueError):
+            sharded.cancel_reservation("missing", "user", "user")
+
+    # Test async writes route the same way
+    @pytest.mark.asyncio
+    async def test_async_routing(self, sharded):
+        reservation = await sharded.create_reservation_async(
+            _request("m7", "m7-1"), "user"
+        )
+        await sharded.modify_reservation_async(
+            reservation["id"], {"user_name": "Baru"}, "user", "user"
+        )
+        await sharded.cancel_reservation_async(reservation["id"], "user", "user", 2)
+        assert sharded.get_reservation_by_id(reservation["id"])["status"] == "cancelled"
+
+    # Test scatter-gather queries merge every shard
+    def test_scatter_gather(self, sharded):
+        stats = sharded.get_admin_stats()
+        assert stats["total_reservations"] == 12
+        assert stats["total_revenue"] == 60000
+        assert stats["total_malls"] == 12
+        assert stats["total_slots"] == 24
+        everything = sharded.get_all_reservations()
+        assert [r["created_at"] for r in everything] == sorted(r["created_at"] for r in everything)
+        assert len(list(sharded.iter_reservations(status="confirmed"))) == 12
+        assert len(list(sharded.iter_reservations(mall_id="m4"))) == 1
+        found = sharded.search_reservations(status="confirmed", limit=5)
+        assert found == everything[:5]
+        assert len(sharded.search_reservations(mall_id="m2")) == 1
+
+    # Test admin analytics merge in catalog order
+    def test_admin_reports(self, sharded):
+        heatmap = sharded.get_occupancy_heatmap()
+        assert list(heatmap["malls"]) == [f"m{n}" for n in range(12)]
+        assert list(sharded.get_occupancy_heatmap("m1")["malls"]) == ["m1"]
+        start = datetime.now() - timedelta(hours=1)
+        rollup = sharded.get_revenue_rollup(start, start + timedelta(hours=3))
+        assert rollup["total"] == 60000
+        assert list(rollup["malls"]) == [f"m{n}" for n in range(12)]
+        assert sharded.get_revenue_rollup(start, start + timedelta(hours=3), mall_id="m1")["total"] == 5000
+
+    # Test price quotes keep the requested mall order
+    def test_price_quotes(self, sharded):
+        windows = [{"start_time": "09:00", "end_time": "11:00"}]
+        quotes = sharded.get_price_quotes(["m9", "m0", "m4"], windows)
+        assert list(quotes["quotes"]) == ["m9", "m0", "m4"]
+        assert quotes["quotes"]["m0"] == [10000]
+        assert len(sharded.get_price_quotes(None, windows)["quotes"]) == 12
+        assert sharded.get_price_quotes(["m0", "nope"], windows) is None
+        assert sharded.get_price_quotes([], windows)["quotes"] == {}
+
+    # Test nearest malls merge by distance
+    def test_nearest(self, sharded):
+        found = sharded.find_nearest_malls(-6.9, 107.6, k=4)
+        assert [m["id"] for m in found] == ["m0", "m1", "m2", "m3"]
+
+    # Test waitlists route by mall and merge for admins
+    def test_waitlist(self, sharded):
+        sharded.create_reservation(_request("m2", "m2-1"), "user")
+        entry = sharded.join_waitlist(_request("m2", "m2-1"), "other")
+        assert entry["status"] == "waiting"
+        assert sharded.get_waitlist("admin", "admin") == [entry]
+        assert sharded.cancel_waitlist_entry(entry["id"], "other", "user") is entry
+        assert sharded.cancel_waitlist_entry("missing", "other", "user") is None
+
+    # Test async waitlist joins book straight into a free slot
+    @pytest.mark.asyncio
+    async def test_waitlist_async(self, sharded):
+        entry = await sharded.join_waitlist_async(_request("m6", "m6-1"), "other")
+        assert entry["status"] == "fulfilled"
+
+    # Test reloads split the new catalog and keep live state
+    def test_reload(self, sharded):
+        calls = []
+        sharded.add_listener(lambda event, reservation, actor: calls.append(event))
+        new = _catalog()
+        sharded.replace_catalog(new)
+        assert sharded.mall_ids == [m["id"] for m in new.malls]
+        assert sharded.malls_db == new.malls
+        assert sharded.slots_db == new.slots_by_mall
+        assert sharded.get_slot_by_id("m3", "m3-0") is new.slot_by_key[("m3", "m3-0")]
+        assert sharded.get_slot_by_id("m3", "m3-0")["status"] == "occupied"
+        sharded.create_reservation(_request("m3", "m3-1"), "user")
+        assert calls == ["created"]
+        # Listings follow the shards' copy-on-write records
+        m3 = sharded.malls_db[3]
+        assert m3 is sharded.get_mall_by_id("m3")
+        assert m3["available_slots"] == new.mall_by_id["m3"]["available_slots"] - 1
+        assert sharded.slots_db["m3"][1]["status"] == "occupied"
+        reloaded = sharded.reload_catalog()
+        assert sharded.mall_ids == [m["id"] for m in reloaded.malls]
+        assert len(sharded.get_all_malls()) == 3
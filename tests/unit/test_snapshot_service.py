@@ -0,0 +1,106 @@
+import pytest
+
+from app.services.catalog_service import load_catalog
+from app.services.parking_service import ParkingService
+from app.services.shard_service import ShardedParkingService
+from app.services.snapshot_service import CatalogSnapshot
+
+
+def _request(slot_id="pvj-1"):
+    return {
+        "mall_id": "pvj",
+        "slot_id": slot_id,
+        "user_name": "Test",
+        "vehicle_number": "D 1234 AB",
+        "phone": "08123456789",
+        "time_slot": {"start_time": "09:00", "end_time": "10:00"},
+    }
+
+
+class TestCatalogSnapshot:
+
+    # Test snapshots are read-only copies of the catalog
+    def test_build(self):
+        catalog = load_catalog()
+        snapshot = CatalogSnapshot.build(catalog)
+        assert [m["id"] for m in snapshot.malls] == ["pvj", "paskal", "sumaba"]
+        assert snapshot.mall("pvj") == catalog.mall_by_id["pvj"]
+        assert snapshot.slot("pvj", "pvj-3")["status"] == "occupied"
+        assert snapshot.mall("nope") is None and snapshot.slot("pvj", "nope") is None
+        assert snapshot.slots("nope") == ()
+        with pytest.raises(TypeError):
+            snapshot.mall("pvj")["available_slots"] = 0
+        catalog.mall_by_id["pvj"]["available_slots"] = 0
+        assert snapshot.mall("pvj")["available_slots"] == 12
+
+    # Test successors copy only the changed records and keep untouched cache entries
+    def test_with_records(self):
+        catalog = load_catalog()
+        snapshot = CatalogSnapshot.build(catalog)
+        for key in [("malls",), ("mall", "pvj"), ("slots", "pvj"), ("slots", "paskal")]:
+            snapshot.cached(key, lambda: b"old")
+        catalog.slot_by_key[("pvj", "pvj-1")]["status"] = "occupied"
+        successor = snapshot.with_records(
+            catalog.mall_by_id["pvj"], catalog.slot_by_key[("pvj", "pvj-1")]
+        )
+        assert successor.version == snapshot.version + 1
+        assert successor.slot("pvj", "pvj-1")["status"] == "occupied"
+        assert snapshot.slot("pvj", "pvj-1")["status"] == "available"
+        assert successor.slot("pvj", "pvj-2") is snapshot.slot("pvj", "pvj-2")
+        assert successor.mall("paskal") is snapshot.mall("paskal")
+        assert successor.slots("paskal") is snapshot.slots("paskal")
+        assert successor.cached(("slots", "paskal"), lambda: b"new") == b"old"
+        for key in [("malls",), ("mall", "pvj"), ("slots", "pvj")]:
+            assert successor.cached(key, lambda: b"new") == b"new"
+        assert snapshot.cached(("malls",), lambda: b"new") == b"old"
+
+
+class TestPublishedSnapshots:
+
+    # Test writes publish a new snapshot and leave old ones untouched
+    def test_publish_on_write(self):
+        svc = ParkingService()
+        before = svc.snapshot()
+        svc.create_reservation(_request(), "user")
+        after = svc.snapshot()
+        assert after is not before
+        assert before.mall("pvj")["available_slots"] == 12
+        assert after.mall("pvj")["available_slots"] == 11
+        assert svc.get_all_malls() is after.malls
+        assert svc.get_slots_by_mall("pvj") is after.slots("pvj")
+
+    # Test a catalog reload publishes a fresh snapshot
+    def test_publish_on_reload(self):
+        svc = ParkingService()
+        svc.create_reservation(_request(), "user")
+        version = svc.snapshot().version
+        svc.reload_catalog()
+        assert svc.snapshot().version > version
+        assert svc.snapshot().slot("pvj", "pvj-1")["status"] == "occupied"
+
+    # Test the sharded service merges shard snapshots only when one changed
+    def test_sharded_merge(self):
+        svc = ShardedParkingService(2)
+        merged = svc.snapshot()
+        assert svc.snapshot() is merged
+        assert [m["id"] for m in merged.malls] == ["pvj", "paskal", "sumaba"]
+        svc.create_reservation(_request(), "user")
+        assert svc.snapshot() is not merged
+        assert svc.snapshot().mall("pvj")["available_slots"] == 11
+        assert svc.snapshot().slot("pvj", "pvj-1")["status"] == "occupied"
+
+    # Test a merge keeps cached bodies of malls the write did not touch
+    def test_sharded_merge_keeps_cache(self):
+        svc = ShardedParkingService(2)
+        merged = svc.snapshot()
+        for mall in merged.malls:
+            merged.cached(("mall", mall["id"]), lambda: b"old")
+            merged.cached(("slots", mall["id"]), lambda: b"old")
+        merged.cached(("malls",), lambda: b"old")
+        svc.create_reservation(_request(), "user")
+        after = svc.snapshot()
+        assert after.cached(("mall", "sumaba"), lambda: b"new") == b"old"
+        assert after.cached(("slots", "paskal"), lambda: b"new") == b"old"
+        assert after.cached(("mall", "pvj"), lambda: b"new") == b"new"
+        assert after.cached(("slots", "pvj"), lambda: b"new") == b"new"
+        assert after.cached(("malls",), lambda: b"new") == b"new"
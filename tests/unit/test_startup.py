@@ -0,0 +1,62 @@
+import app.main as main_module
+from app.main import get_auth_service, get_parking_service
+from app.services.auth_service import AuthService
+from app.utils.startup import StartupReport
+
+
+class TestStartupReport:
+
+    # Test phases are recorded in milliseconds
+    def test_measure_phase(self):
+        report = StartupReport()
+        with report.measure("services"):
+            pass
+        report.record("import", 0.25)
+        data = report.as_dict()
+        assert data["phases_ms"]["import"] == 250.0
+        assert "services" in data["phases_ms"]
+        assert data["first_request"] is None
+
+    # Test only the first request is recorded
+    def test_first_request_recorded_once(self):
+        report = StartupReport()
+        report.origin = 1.0
+        report.record_first_request("/health", 2.0, 2.5)
+        report.record_first_request("/malls", 3.0, 4.0)
+        assert report.first_request == {
+            "path": "/health",
+            "latency_ms": 500.0,
+            "since_import_ms": 1500.0,
+        }
+
+
+class TestLazyServices:
+
+    # Test services are constructed on first use
+    def test_services_constructed_lazily(self):
+        main_module.auth_service = None
+        main_module.parking_service = None
+        assert isinstance(get_auth_service(), AuthService)
+        assert get_parking_service() is main_module.parking_service
+
+    # Test lazy services serve requests without lifespan
+    def test_request_without_initialized_services(self, client):
+        main_module.auth_service = None
+        main_module.parking_service = None
+        response = client.post(
+            "/login", json={"username": "admin", "password": "12345"}
+        )
+        assert response.status_code == 200
+
+    # Test startup report endpoint
+    def test_startup_report_endpoint(self, client, admin_headers):
+        response = client.get("/admin/startup", headers=admin_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert "import" in data["phases_ms"]
+        assert data["first_request"] is not None
+
+    # Test startup report endpoint forbidden for regular user
+    def test_startup_report_forbidden(self, client, auth_headers):
+        response = client.get("/admin/startup", headers=auth_headers)
+        assert response.status_code == 403
@@ -0,0 +1,185 @@
+import threading
+
+import pytest
+
+from app.services.parking_service import ParkingService
+from app.services.versioning import (
+    VersionConflictError,
+    format_etag,
+    parse_if_match,
+    try_commit,
+)
+
+
+def _request(slot_id="pvj-1"):
+    return {
+        "mall_id": "pvj",
+        "slot_id": slot_id,
+        "user_name": "Test",
+        "vehicle_number": "D 1234 AB",
+        "phone": "08123456789",
+        "time_slot": {"start_time": "09:00", "end_time": "10:00"},
+    }
+
+
+class TestVersioning:
+
+    # Test commits apply only when every version still matches
+    def test_try_commit(self):
+        a, b = {"x": 1, "version": 1}, {"y": 1, "version": 4}
+        committed = try_commit([(a, 1, {"x": 2}), (b, 4, {"y": 2})])
+        assert committed == [{"x": 2, "version": 2}, {"y": 2, "version": 5}]
+        assert (a, b) == ({"x": 1, "version": 1}, {"y": 1, "version": 4})
+        assert try_commit([(a, 2, {"x": 3}), (b, 4, {"y": 3})]) is None
+
+    # Test If-Match parsing
+    def test_if_match(self):
+        assert parse_if_match(None) is None
+        assert parse_if_match("*") is None
+        assert parse_if_match(format_etag(3)) == 3
+        assert parse_if_match('W/"7"') == 7
+        with pytest.raises(ValueError):
+            parse_if_match('"abc"')
+
+
+class TestVersionedService:
+
+    # Test catalog records and reservations start at version 1 and move on each write
+    def test_versions_bump(self):
+        svc = ParkingService()
+        reservation = svc.create_reservation(_request(), "user")
+        assert reservation["version"] == 1
+        assert svc.get_slot_by_id("pvj", "pvj-1")["version"] == 2
+        assert svc.get_mall_by_id("pvj")["version"] == 2
+        svc.cancel_reservation(reservation["id"], "user", "user", expected_version=1)
+        assert svc.get_reservation_by_id(reservation["id"])["version"] == 2
+        assert svc.get_slot_by_id("pvj", "pvj-1")["version"] == 3
+
+    # Test writes swap in a new record and leave the one readers hold untouched
+    def test_copy_on_write(self):
+        svc = ParkingService()
+        reservation = svc.create_reservation(_request(), "user")
+        updated = svc.modify_reservation(reservation["id"], {"phone": "08111111111"}, "user", "user")
+        assert reservation["version"] == 1
+        assert reservation["phone"] != "08111111111"
+        assert updated["version"] == 2
+        assert svc.get_reservation_by_id(reservation["id"]) is updated
+        assert svc.get_all_reservations() == [updated]
+        assert next(svc.iter_reservations()) is updated
+        assert svc._reservations_by_slot[("pvj", "pvj-1")] == [updated]
+        svc.cancel_reservation(reservation["id"], "user", "user")
+        assert updated["status"] == "confirmed"
+        assert svc.get_reservation_by_id(reservation["id"])["version"] == 3
+
+    # Test slot writes swap in new catalog records as well
+    def test_catalog_copy_on_write(self):
+        svc = ParkingService()
+        slot = svc.get_slot_by_id("pvj", "pvj-1")
+        mall = svc.get_mall_by_id("pvj")
+        svc.create_reservation(_request(), "user")
+        assert (slot["version"], mall["version"]) == (1, 1)
+        assert svc.get_slot_by_id("pvj", "pvj-1")["version"] == 2
+        assert svc.get_mall_by_id("pvj")["available_slots"] == mall["available_slots"] - 1
+        assert svc.catalog.slots_by_mall["pvj"][0] is svc.get_slot_by_id("pvj", "pvj-1")
+
+    # Test a stale expected version is rejected without changes
+    def test_stale_version(self):
+        svc = ParkingService()
+        reservation = svc.create_reservation(_request(), "user")
+        svc.modify_reservation(reservation["id"], {"phone": "08111111111"}, "user", "user")
+        with pytest.raises(VersionConflictError) as info:
+            svc.cancel_reservation(reservation["id"], "user", "user", expected_version=1)
+        assert info.value.current == 2
+        assert reservation["status"] == "confirmed"
+
+    # Test modify changes contact fields and keeps the search index in sync
+    def test_modify(self):
+        svc = ParkingService()
+        reservation = svc.create_reservation(_request(), "user")
+        updated = svc.modify_reservation(
+            reservation["id"], {"vehicle_number": "B 99 XY", "user_name": None}, "user", "user", 1
+        )
+        assert updated["vehicle_number"] == "B 99 XY"
+        assert updated["version"] == 2
+        assert svc.search_reservations(vehicle_number="B99XY") == [updated]
+        assert svc.search_reservations(vehicle_number="D1234AB") == []
+        assert svc.search_reservations(vehicle_prefix="D12") == []
+        with pytest.raises(ValueError):
+            svc.modify_reservation(reservation["id"], {}, "user", "user")
+        with pytest.raises(ValueError):
+            svc.modify_reservation(reservation["id"], {"phone": "0812345678"}, "other", "user")
+        svc.cancel_reservation(reservation["id"], "user", "user")
+        with pytest.raises(ValueError):
+            svc.modify_reservation(reservation["id"], {"phone": "0812345678"}, "user", "user")
+
+    # Test a writer that loses the race re-reads and retries
+    def test_cas_retry(self, monkeypatch):
+        svc = ParkingService()
+        reservation = svc.create_reservation(_request(), "user")
+        original = svc._replace_reservation
+        raced = []
+
+        def racing_replace(record, version, changes):
+            if not raced:
+                raced.append(1)
+                # another writer committed first
+                original(record, version, {"user_name": "Lain"})
+            return original(record, version, changes)
+
+        monkeypatch.setattr(svc, "_replace_reservation", racing_replace)
+        updated = svc.modify_reservation(reservation["id"], {"phone": "08111111111"}, "user", "user")
+        assert updated["version"] == 3
+        assert updated["phone"] == "08111111111"
+        assert updated["user_name"] == "Lain"
+
+    # Test writers that keep losing give up with a conflict
+    def test_cas_gives_up(self, monkeypatch):
+        svc = ParkingService()
+        reservation = svc.create_reservation(_request(), "user")
+        import app.services.parking_service as module
+
+        monkeypatch.setattr(module, "try_commit", lambda updates: None)
+        monkeypatch.setattr(svc, "_replace_reservation", lambda *args: None)
+        with pytest.raises(VersionConflictError):
+            svc.cancel_reservation(reservation["id"], "user", "user")
+        with pytest.raises(VersionConflictError):
+            svc.modify_reservation(reservation["id"], {"phone": "08111111111"}, "user", "user")
+        with pytest.raises(VersionConflictError):
+            svc._set_slot_state("pvj", "pvj-2", "occupied")
+
+    # Test concurrent slot updates all commit and settle on the recount
+    def test_concurrent_slot_updates(self):
+        svc = ParkingService()
+        svc.catalog.replace_mall({**svc.get_mall_by_id("sumaba"), "available_slots": 0})
+
+        def flip():
+            for _ in range(200):
+                svc._set_slot_state("sumaba", "sumaba-1", "available")
+
+        threads = [threading.Thread(target=flip) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        mall = svc.get_mall_by_id("sumaba")
+        assert mall["available_slots"] == svc.catalog.configured_available["sumaba"]
+        assert mall["version"] == 801
+
+    # Test async cancel and modify honour the expected version
+    @pytest.mark.asyncio
+    async def test_async(self):
+        svc = ParkingService()
+        reservation = await svc.create_reservation_async(_request(), "user")
+        await svc.modify_reservation_async(
+            reservation["id"], {"user_name": "Baru"}, "user", "user", expected_version=1
+        )
+        with pytest.raises(VersionConflictError):
+            await svc.modify_reservation_async(
+                reservation["id"], {"user_name": "Lagi"}, "user", "user", expected_version=1
+            )
+        with pytest.raises(VersionConflictError):
+            await svc.cancel_reservation_async(reservation["id"], "user", "user", 1)
+        await svc.cancel_reservation_async(reservation["id"], "user", "user", 2)
+        reservation = svc.get_reservation_by_id(reservation["id"])
+        assert reservation["status"] == "cancelled"
+        assert reservation["version"] == 3
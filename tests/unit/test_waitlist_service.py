@@ -0,0 +1,210 @@
+import asyncio
+
+import pytest
+
+from app.services.parking_service import ParkingService
+from app.services.storage import ReservationStorage
+from app.services.waitlist_service import MAX_WAITING_PER_USER, Waitlist
+
+
+class SlowStorage(ReservationStorage):
+
+    async def save_reservation(self, reservation):
+        await asyncio.sleep(0.01)
+
+    async def update_reservation(self, reservation):
+        await asyncio.sleep(0.01)
+
+
+def waitlist_request(slot_id="pvj-1", start="09:00", end="11:00", mall_id="pvj"):
+    return {
+        "mall_id": mall_id,
+        "slot_id": slot_id,
+        "user_name": "Test User",
+        "vehicle_number": "B1234XYZ",
+        "phone": "08123456789",
+        "time_slot": {"start_time": start, "end_time": end},
+    }
+
+
+class TestWaitlist:
+
+    # Test only entries overlapping the freed window are candidates
+    def test_candidates_overlap(self):
+        waitlist = Waitlist()
+        early = waitlist.add(waitlist_request(start="07:00", end="08:00"), "a")
+        long = waitlist.add(waitlist_request(start="06:00", end="12:00"), "b")
+        late = waitlist.add(waitlist_request(start="10:30", end="11:00"), "c")
+        waitlist.add(waitlist_request(start="13:00", end="14:00"), "d")
+        found = waitlist.candidates("pvj", "pvj-1", "09:00", "11:00")
+        assert found == [long, late]
+        assert early not in found
+
+    # Test windows past midnight match freed windows on either side of it
+    def test_candidates_wrap_midnight(self):
+        waitlist = Waitlist()
+        overnight = waitlist.add(waitlist_request(start="23:00", end="01:00"), "a")
+        early = waitlist.add(waitlist_request(start="00:30", end="02:00"), "b")
+        waitlist.add(waitlist_request(start="02:00", end="03:00"), "c")
+        assert waitlist.candidates("pvj", "pvj-1", "00:00", "01:00") == [overnight, early]
+        assert waitlist.candidates("pvj", "pvj-1", "23:30", "00:45") == [overnight, early]
+        assert waitlist.candidates("pvj", "pvj-1", "22:00", "23:00") == []
+
+    # Test slot and any-slot entries merge by registration order
+    def test_candidates_priority(self):
+        waitlist = Waitlist()
+        anywhere = waitlist.add(waitlist_request(slot_id=None), "a")
+        specific = waitlist.add(waitlist_request(), "b")
+        waitlist.add(waitlist_request(slot_id="pvj-2"), "c")
+        assert waitlist.candidates("pvj", "pvj-1") == [anywhere, specific]
+
+    # Test closed entries leave the queue
+    def test_fulfil_and_cancel(self):
+        waitlist = Waitlist()
+        first = waitlist.add(waitlist_request(), "a")
+        second = waitlist.add(waitlist_request(), "b")
+        waitlist.fulfil(first, "r1")
+        waitlist.cancel(second)
+        assert first["status"] == "fulfilled"
+        assert first["reservation_id"] == "r1"
+        assert second["status"] == "cancelled"
+        assert waitlist.candidates("pvj", "pvj-1") == []
+
+    # Test a claimed entry is skipped until released, and can then be booked
+    def test_claim_and_release(self):
+        waitlist = Waitlist()
+        entry = waitlist.add(waitlist_request(), "a")
+        assert waitlist.claim(entry)
+        assert entry["status"] == "booking"
+        assert not waitlist.claim(entry)
+        waitlist.cancel(entry)
+        assert entry["status"] == "booking"
+        waitlist.release(entry)
+        assert entry["status"] == "waiting"
+        assert waitlist.claim(entry)
+        waitlist.fulfil(entry, "r1")
+        waitlist.fulfil(entry, "r2")
+        assert entry["reservation_id"] == "r1"
+        waitlist.release(entry)
+        assert entry["status"] == "fulfilled"
+
+    # Test waiting entries per user are capped
+    def test_max_waiting_per_user(self):
+        waitlist = Waitlist()
+        for _ in range(MAX_WAITING_PER_USER):
+            waitlist.add(waitlist_request(), "a")
+        with pytest.raises(ValueError):
+            waitlist.add(waitlist_request(), "a")
+        waitlist.add(waitlist_request(), "b")
+        # Closing an entry frees a place; claiming one does not
+        first, second = waitlist.entries("a")[:2]
+        waitlist.cancel(first)
+        waitlist.claim(second)
+        waitlist.add(waitlist_request(), "a")
+        with pytest.raises(ValueError):
+            waitlist.add(waitlist_request(), "a")
+        assert len(waitlist.entries("a")) == MAX_WAITING_PER_USER + 1
+
+    # Test closed entries are listed for the retention period, then dropped
+    def test_closed_entries_expire(self):
+        now = [0.0]
+        waitlist = Waitlist(closed_retention=60, clock=lambda: now[0])
+        first = waitlist.add(waitlist_request(), "a")
+        second = waitlist.add(waitlist_request(), "a")
+        waitlist.fulfil(first, "r1")
+        now[0] = 30
+        waitlist.cancel(second)
+        assert waitlist.entries("a") == [first, second]
+        assert waitlist._buckets == {}
+        now[0] = 60
+        assert waitlist.entries("a") == [second]
+        assert waitlist.get(first["id"]) is None
+        now[0] = 90
+        assert waitlist.entries() == []
+        assert waitlist._user_entries == {}
+        assert waitlist._open_count == {}
+
+
+class TestWaitlistMatching:
+
+    # Test joining books immediately when the slot is free
+    def test_join_books_free_slot(self, parking_service):
+        entry = parking_service.join_waitlist(waitlist_request(), "user")
+        assert entry["status"] == "fulfilled"
+        reservation = parking_service.get_reservation_by_id(entry["reservation_id"])
+        assert reservation["created_by"] == "user"
+
+    # Test cancellation books the earliest waiting entry
+    def test_cancel_fills_waitlist(self, parking_service):
+        first = parking_service.join_waitlist(waitlist_request(), "user")
+        waiting = parking_service.join_waitlist(
+            waitlist_request(start="10:00", end="12:00"), "other"
+        )
+        later = parking_service.join_waitlist(waitlist_request(slot_id=None), "third")
+        assert waiting["status"] == "waiting"
+        parking_service.cancel_reservation(first["reservation_id"], "user", "user")
+        assert waiting["status"] == "fulfilled"
+        reservation = parking_service.get_reservation_by_id(waiting["reservation_id"])
+        assert reservation["start_time"] == "10:00"
+        assert reservation["created_by"] == "other"
+        assert later["status"] == "fulfilled"
+        assert later["reservation_id"] != waiting["reservation_id"]
+
+    # Test any-slot entries take the first free slot of the mall
+    def test_any_slot(self, parking_service):
+        entry = parking_service.join_waitlist(waitlist_request(slot_id=None), "user")
+        reservation = parking_service.get_reservation_by_id(entry["reservation_id"])
+        assert reservation["slot_id"] == "pvj-1"
+
+    # Test unknown mall or slot is rejected
+    def test_join_invalid(self, parking_service):
+        with pytest.raises(ValueError, match="Mall tidak ditemukan"):
+            parking_service.join_waitlist(waitlist_request(mall_id="x"), "user")
+        with pytest.raises(ValueError, match="Slot parkir tidak ditemukan"):
+            parking_service.join_waitlist(waitlist_request(slot_id="x"), "user")
+
+    # Test withdrawing entries
+    def test_cancel_entry(self, parking_service):
+        entry = parking_service.join_waitlist(waitlist_request(slot_id="pvj-3"), "user")
+        assert parking_service.cancel_waitlist_entry("missing", "user", "user") is None
+        with pytest.raises(ValueError):
+            parking_service.cancel_waitlist_entry(entry["id"], "other", "user")
+        assert parking_service.cancel_waitlist_entry(entry["id"], "user", "user") is entry
+        with pytest.raises(ValueError):
+            parking_service.cancel_waitlist_entry(entry["id"], "admin", "admin")
+        assert parking_service.get_waitlist("other", "user") == []
+        assert parking_service.get_waitlist("admin", "admin") == [entry]
+
+    # Test async cancellation fills the waitlist through the storage path
+    @pytest.mark.asyncio
+    async def test_async_cancel_fills_waitlist(self):
+        svc = ParkingService()
+        first = await svc.join_waitlist_async(waitlist_request(), "user")
+        waiting = await svc.join_waitlist_async(waitlist_request(), "other")
+        assert waiting["status"] == "waiting"
+        await svc.cancel_reservation_async(first["reservation_id"], "user", "user")
+        assert waiting["status"] == "fulfilled"
+
+    # Test two slots freed at once book an any-slot entry only once
+    @pytest.mark.asyncio
+    async def test_concurrent_fills_book_once(self):
+        svc = ParkingService(storage=SlowStorage())
+        held = [
+            await svc.join_waitlist_async(waitlist_request(slot_id=slot), "owner")
+            for slot in ("pvj-1", "pvj-2", "pvj-4", "pvj-5")
+        ]
+        entry = await svc.join_waitlist_async(waitlist_request(slot_id=None), "waiter")
+        assert entry["status"] == "waiting"
+        await asyncio.gather(
+            *(
+                svc.cancel_reservation_async(h["reservation_id"], "owner", "owner")
+                for h in held[:2]
+            )
+        )
+        bookings = [
+            r for r in svc.get_all_reservations()
+            if r["created_by"] == "waiter" and r["status"] == "confirmed"
+        ]
+        assert len(bookings) == 1
+        assert entry["status"] == "fulfilled"
+        assert entry["reservation_id"] == bookings[0]["id"]